@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.recommendations import flush_cooccurrence
+
+
+class Command(BaseCommand):
+    help = "Apply queued orders to the dish co-occurrence matrix and top-K recommendations (RF-03); schedule every minute"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Orders applied per database transaction",
+        )
+
+    def handle(self, *args, **options):
+        count = flush_cooccurrence(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Applied {count} queued orders to recommendations"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.recommendations import rebuild_cooccurrence
+
+
+class Command(BaseCommand):
+    help = "Rebuild the dish co-occurrence matrix and top-K recommendations (RF-03) from order items"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per fetch and bulk insert",
+        )
+
+    def handle(self, *args, **options):
+        pairs = rebuild_cooccurrence(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {pairs} dish co-occurrence pairs"))
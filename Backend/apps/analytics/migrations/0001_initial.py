@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('platos', '0003_dish_is_in_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DishCooccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0, help_text='Orders containing both dishes (RF-03)')),
+                ('dish', models.ForeignKey(help_text='Row dish', on_delete=django.db.models.deletion.CASCADE, related_name='cooccurrences', to='platos.dish')),
+                ('other', models.ForeignKey(help_text='Column dish (same dish = orders containing it)', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='platos.dish')),
+            ],
+            options={
+                'verbose_name': 'Dish Co-occurrence',
+                'verbose_name_plural': 'Dish Co-occurrences',
+                'db_table': 'dish_cooccurrences',
+                'unique_together': {('dish', 'other')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DishRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Cosine similarity of order co-occurrence')),
+                ('rank', models.PositiveSmallIntegerField(help_text='1 = most similar')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('dish', models.ForeignKey(help_text='Source dish', on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='platos.dish')),
+                ('recommended', models.ForeignKey(help_text='Recommended dish', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='platos.dish')),
+            ],
+            options={
+                'verbose_name': 'Dish Recommendation',
+                'verbose_name_plural': 'Dish Recommendations',
+                'db_table': 'dish_recommendations',
+                'ordering': ['dish', 'rank'],
+                'indexes': [models.Index(fields=['dish', 'rank'], name='dish_recomm_dish_id_4ac4c5_idx')],
+                'unique_together': {('dish', 'recommended')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 20:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('pedidos', '0003_order_keyset_indexes'),
+        ('platos', '0005_popularity_increments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CooccurrenceIncrement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dish', models.ForeignKey(help_text='Ordered dish', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='platos.dish')),
+                ('order', models.ForeignKey(help_text='Placed order', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='pedidos.order')),
+            ],
+            options={
+                'verbose_name': 'Co-occurrence Increment',
+                'verbose_name_plural': 'Co-occurrence Increments',
+                'db_table': 'dish_cooccurrence_increments',
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+"""
+Modelos de Analítica
+====================
+RF-03: Recomendaciones "otros clientes también pidieron"
+
+Matriz dispersa plato × plato de co-ocurrencia en pedidos (solo pares que
+alguna vez aparecieron juntos) y tabla precalculada con los K platos más
+similares de cada plato, que es lo único que se lee al recomendar. Los
+pedidos nuevos se encolan en CooccurrenceIncrement y se suman en lote.
+"""
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class DishCooccurrence(models.Model):
+    dish = models.ForeignKey('platos.Dish', on_delete=models.CASCADE, related_name='cooccurrences', help_text=_("Row dish"))
+    other = models.ForeignKey('platos.Dish', on_delete=models.CASCADE, related_name='+', help_text=_("Column dish (same dish = orders containing it)"))
+    count = models.IntegerField(default=0, help_text=_("Orders containing both dishes (RF-03)"))
+
+    class Meta:
+        db_table = 'dish_cooccurrences'
+        verbose_name = _('Dish Co-occurrence')
+        verbose_name_plural = _('Dish Co-occurrences')
+        unique_together = ['dish', 'other']
+
+    def __str__(self):
+        return f"{self.dish_id} × {self.other_id}: {self.count}"
+
+
+class DishRecommendation(models.Model):
+    dish = models.ForeignKey('platos.Dish', on_delete=models.CASCADE, related_name='recommendations', help_text=_("Source dish"))
+    recommended = models.ForeignKey('platos.Dish', on_delete=models.CASCADE, related_name='+', help_text=_("Recommended dish"))
+    score = models.FloatField(help_text=_("Cosine similarity of order co-occurrence"))
+    rank = models.PositiveSmallIntegerField(help_text=_("1 = most similar"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dish_recommendations'
+        verbose_name = _('Dish Recommendation')
+        verbose_name_plural = _('Dish Recommendations')
+        ordering = ['dish', 'rank']
+        unique_together = ['dish', 'recommended']
+        indexes = [
+            models.Index(fields=['dish', 'rank']),
+        ]
+
+    def __str__(self):
+        return f"{self.dish_id} → {self.recommended_id} (#{self.rank}, {self.score:.3f})"
+
+
+class CooccurrenceIncrement(models.Model):
+    """Platos de un pedido pendientes de sumar a la matriz (recommendations.py)."""
+    order = models.ForeignKey('pedidos.Order', on_delete=models.CASCADE, related_name='+', help_text=_("Placed order"))
+    dish = models.ForeignKey('platos.Dish', on_delete=models.CASCADE, related_name='+', help_text=_("Ordered dish"))
+
+    class Meta:
+        db_table = 'dish_cooccurrence_increments'
+        verbose_name = _('Co-occurrence Increment')
+        verbose_name_plural = _('Co-occurrence Increments')
+
+    def __str__(self):
+        return f"#{self.order_id}: {self.dish_id}"
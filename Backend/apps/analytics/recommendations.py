@@ -0,0 +1,221 @@
+"""
+Motor de Recomendaciones por Co-ocurrencia
+==========================================
+RF-03: Recomendaciones item-a-item
+
+Cada pedido con el conjunto de platos S suma 1 a C[a, b] para todo a, b en S
+(incluido a = b, que cuenta los pedidos que contienen a). La similitud es el
+coseno C[a, b] / sqrt(C[a, a] · C[b, b]).
+
+Actualización en lote, fuera de las peticiones:
+1. Al crear un pedido, record_order inserta una fila por plato en
+   `dish_cooccurrence_increments` dentro de la transacción del pedido (solo
+   INSERT, sin filas compartidas entre pedidos).
+2. El comando flush_recommendations (programado cada minuto) toma los
+   pedidos encolados por lotes y suma sus pares con UPDATE count = count + n
+   sobre las filas bloqueadas en orden (dish, other), de modo que dos
+   ejecuciones concurrentes no pierden incrementos.
+3. Recalcula una vez por lote el top-K de los platos afectados: los de los
+   pedidos y los que co-ocurren con alguno de ellos (sus puntajes dependen
+   de C[b, b]). Los platos se bloquean en orden de id antes de reescribir
+   su top-K, el mismo orden que usa flush_popularity.
+Un error de la BD se registra en el log y deja el lote para la siguiente
+ejecución.
+
+Las lecturas (recommend_for_dish, recommend_for_basket) solo consultan la
+tabla top-K: O(k) filas por plato consultado.
+"""
+
+import logging
+import math
+import operator
+from collections import Counter, defaultdict
+from functools import reduce
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F, Max, Q
+
+from apps.pedidos.models import OrderItem
+from apps.platos.models import Dish
+from .models import CooccurrenceIncrement, DishCooccurrence, DishRecommendation
+
+
+logger = logging.getLogger(__name__)
+
+
+def top_k():
+    return int(getattr(settings, 'RECOMMENDATIONS_TOP_K', 10))
+
+
+def record_order(order_id, dish_ids):
+    """Encola los platos de un pedido (dentro de la transacción del pedido)."""
+    CooccurrenceIncrement.objects.bulk_create([
+        CooccurrenceIncrement(order_id=order_id, dish_id=dish_id) for dish_id in sorted(set(dish_ids))
+    ])
+
+
+def _pair_counts(baskets):
+    return Counter((a, b) for basket in baskets for a in basket for b in basket)
+
+
+def _apply_pairs(counts):
+    """
+    Suma los pares a la matriz de forma aditiva (count = count + n, nunca un
+    total leído antes): crea los pares nuevos en 0, bloquea las filas en orden
+    (dish, other) y aplica un UPDATE por cada incremento distinto. Devuelve
+    los platos cuyo top-K cambia.
+    """
+    dishes = {a for a, _ in counts}
+    DishCooccurrence.objects.bulk_create(
+        [DishCooccurrence(dish_id=a, other_id=b) for a, b in sorted(counts)],
+        ignore_conflicts=True,
+    )
+    list(
+        DishCooccurrence.objects.select_for_update()
+        .filter(dish_id__in=dishes, other_id__in=dishes)
+        .order_by('dish_id', 'other_id')
+        .values_list('pk', flat=True)
+    )
+    pairs_by_increment = defaultdict(list)
+    for pair, count in sorted(counts.items()):
+        pairs_by_increment[count].append(pair)
+    for increment, pairs in sorted(pairs_by_increment.items()):
+        DishCooccurrence.objects.filter(
+            reduce(operator.or_, (Q(dish_id=a, other_id=b) for a, b in pairs))
+        ).update(count=F('count') + increment)
+    return set(DishCooccurrence.objects.filter(other_id__in=dishes).values_list('dish_id', flat=True))
+
+
+def flush_cooccurrence(batch_size=500):
+    """
+    Suma a la matriz los pedidos encolados, hasta `batch_size` pedidos por
+    transacción, y refresca los top-K afectados. Devuelve cuántos pedidos aplicó.
+    """
+    flushed = 0
+    while True:
+        try:
+            with transaction.atomic():
+                orders = list(
+                    CooccurrenceIncrement.objects.order_by('order_id')
+                    .values_list('order_id', flat=True).distinct()[:batch_size]
+                )
+                if not orders:
+                    break
+                baskets = defaultdict(set)
+                for order_id, dish_id in (
+                    CooccurrenceIncrement.objects.select_for_update()
+                    .filter(order_id__in=orders).order_by('id')
+                    .values_list('order_id', 'dish_id')
+                ):
+                    baskets[order_id].add(dish_id)
+                refresh_top_k(_apply_pairs(_pair_counts(baskets.values())))
+                CooccurrenceIncrement.objects.filter(order_id__in=orders).delete()
+        except DatabaseError:
+            logger.exception('No se pudo actualizar la matriz de recomendaciones; se reintentará')
+            break
+        flushed += len(orders)
+    return flushed
+
+
+def refresh_top_k(dish_ids, k=None):
+    """
+    Recalcula la tabla top-K de los platos dados: una lectura de sus filas de
+    co-ocurrencia, una de las diagonales necesarias y, con los platos
+    bloqueados en orden de id, un DELETE y un INSERT.
+    """
+    dish_ids = set(dish_ids)
+    if not dish_ids:
+        return 0
+    k = k or top_k()
+
+    rows = defaultdict(dict)
+    for dish_id, other_id, count in (
+        DishCooccurrence.objects.filter(dish_id__in=dish_ids, count__gt=0)
+        .values_list('dish_id', 'other_id', 'count')
+    ):
+        rows[dish_id][other_id] = count
+    involved = {other_id for row in rows.values() for other_id in row} | dish_ids
+    diagonal = dict(
+        DishCooccurrence.objects.filter(dish_id__in=involved, other_id=F('dish_id'))
+        .values_list('dish_id', 'count')
+    )
+
+    recommendations = []
+    for dish_id, row in rows.items():
+        scored = sorted(
+            (
+                (count / math.sqrt(diagonal[dish_id] * diagonal[other_id]), other_id)
+                for other_id, count in row.items()
+                if other_id != dish_id
+            ),
+            key=lambda pair: (-pair[0], pair[1]),
+        )[:k]
+        recommendations.extend(
+            DishRecommendation(dish_id=dish_id, recommended_id=other_id, score=round(score, 6), rank=rank)
+            for rank, (score, other_id) in enumerate(scored, start=1)
+        )
+
+    with transaction.atomic():
+        # Serializa las reescrituras del mismo plato (unique dish, recommended)
+        list(Dish.objects.select_for_update().filter(pk__in=dish_ids).order_by('pk').values_list('pk', flat=True))
+        DishRecommendation.objects.filter(dish_id__in=dish_ids).delete()
+        DishRecommendation.objects.bulk_create(recommendations)
+    return len(recommendations)
+
+
+def rebuild_cooccurrence(batch_size=1000):
+    """
+    Reconstruye la matriz y todos los top-K desde order_items (comando
+    rebuild_recommendations); descarta los incrementos encolados antes de leer.
+    """
+    queued = CooccurrenceIncrement.objects.aggregate(last=Max('id'))['last']
+    counts = Counter()
+    current_order, basket = None, []
+    items = (
+        OrderItem.objects.order_by('order_id', 'dish_id')
+        .values_list('order_id', 'dish_id')
+        .distinct()
+        .iterator(chunk_size=batch_size)
+    )
+    for order_id, dish_id in items:
+        if order_id != current_order:
+            counts.update((a, b) for a in basket for b in basket)
+            current_order, basket = order_id, []
+        basket.append(dish_id)
+    counts.update((a, b) for a in basket for b in basket)
+
+    with transaction.atomic():
+        DishCooccurrence.objects.all().delete()
+        DishCooccurrence.objects.bulk_create(
+            [DishCooccurrence(dish_id=a, other_id=b, count=count) for (a, b), count in counts.items()],
+            batch_size=batch_size,
+        )
+        DishRecommendation.objects.all().delete()
+        refresh_top_k({a for a, _ in counts})
+        if queued is not None:
+            CooccurrenceIncrement.objects.filter(id__lte=queued).delete()
+    return len(counts)
+
+
+def recommend_for_dish(dish_id, limit=None):
+    """[(dish_id, score)] de la tabla top-K, en orden de similitud."""
+    rows = DishRecommendation.objects.filter(dish_id=dish_id).order_by('rank')
+    return list(rows.values_list('recommended_id', 'score')[:limit or top_k()])
+
+
+def recommend_for_basket(dish_ids, limit=None):
+    """
+    Suma los puntajes top-K de cada plato de la canasta y excluye los que ya
+    están en ella: O(|canasta| · k) filas.
+    """
+    basket = set(dish_ids)
+    scores = defaultdict(float)
+    for recommended_id, score in (
+        DishRecommendation.objects.filter(dish_id__in=basket)
+        .exclude(recommended_id__in=basket)
+        .values_list('recommended_id', 'score')
+    ):
+        scores[recommended_id] += score
+    ranked = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+    return [(dish_id, round(score, 6)) for dish_id, score in ranked[:limit or top_k()]]
@@ -0,0 +1,24 @@
+"""
+Señales de Analítica
+====================
+"""
+
+from django.dispatch import receiver
+
+from apps.pedidos.models import Order
+from apps.pedidos.signals import order_placed
+from .recommendations import record_order
+
+
+@receiver(order_placed, sender=Order)
+def update_cooccurrence(sender, instance, created=True, items=None, **kwargs):
+    """
+    RF-03: Encola los platos del pedido en su transacción (solo INSERT);
+    flush_recommendations los suma a la matriz de co-ocurrencia.
+    """
+    if created:
+        if items is None:
+            dish_ids = list(instance.items.values_list('dish_id', flat=True))
+        else:
+            dish_ids = [item.dish_id for item in items]
+        record_order(instance.pk, dish_ids)
@@ -0,0 +1,174 @@
+import math
+import pytest
+from collections import Counter
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models import F
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.platos.models import Dish
+from apps.pedidos.models import Order, OrderItem
+from apps.analytics.models import CooccurrenceIncrement, DishCooccurrence, DishRecommendation
+from apps.analytics.recommendations import (
+    _apply_pairs, flush_cooccurrence, record_order, refresh_top_k, recommend_for_dish, recommend_for_basket
+)
+
+
+@pytest.fixture
+def customer_user():
+    return User.objects.create_user(username='rec_customer', password='p', role='CUSTOMER')
+
+
+@pytest.fixture
+def dishes():
+    names = ['Hamburguesa', 'Papas', 'Gaseosa', 'Ensalada']
+    return [Dish.objects.create(name=name, description='d', price=Decimal('5.00')) for name in names]
+
+
+def matrix():
+    return sorted(DishCooccurrence.objects.values_list('dish_id', 'other_id', 'count'))
+
+
+def recommendations():
+    return sorted(DishRecommendation.objects.values_list('dish_id', 'recommended_id', 'rank', 'score'))
+
+
+def place(customer, *dish_list):
+    order = Order.objects.create(customer=customer, order_type='TAKEOUT')
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, dish=dish, quantity=1, unit_price=dish.price) for dish in dish_list
+    ])
+    record_order(order.id, [dish.id for dish in dish_list])
+    return order
+
+
+@pytest.mark.django_db
+def test_incremental_updates_match_rebuild(customer_user, dishes, django_assert_num_queries):
+    burger, fries, soda, salad = dishes
+    baskets = [(burger, fries, soda), (burger, fries), (burger, soda), (salad,), (fries, fries)]
+    for basket in baskets[:2]:
+        place(customer_user, *basket)
+    assert flush_cooccurrence(batch_size=1) == 2
+    for basket in baskets[2:]:
+        place(customer_user, *basket)
+    assert not DishCooccurrence.objects.filter(dish=salad).exists()
+    assert flush_cooccurrence() == 3
+    assert not CooccurrenceIncrement.objects.exists()
+
+    counts = {(a, b): c for a, b, c in matrix()}
+    assert counts[(burger.id, burger.id)] == 3
+    assert counts[(fries.id, fries.id)] == 3  # duplicated lines count once per order
+    assert counts[(burger.id, fries.id)] == counts[(fries.id, burger.id)] == 2
+    assert (burger.id, salad.id) not in counts
+
+    top = recommend_for_dish(burger.id)
+    # soda: 2 / sqrt(3 * 2) beats fries: 2 / sqrt(3 * 3)
+    assert [dish_id for dish_id, _ in top] == [soda.id, fries.id]
+    assert top[0][1] == pytest.approx(2 / math.sqrt(3 * 2))
+    assert recommend_for_dish(salad.id) == []
+
+    incremental = (matrix(), recommendations())
+    out = StringIO()
+    call_command('rebuild_recommendations', stdout=out)
+    assert 'Rebuilt' in out.getvalue()
+    assert (matrix(), recommendations()) == incremental
+
+    # Queued orders already in order_items are not counted twice by a rebuild
+    place(customer_user, burger, salad)
+    call_command('rebuild_recommendations', stdout=out)
+    assert not CooccurrenceIncrement.objects.exists()
+    assert flush_cooccurrence() == 0
+
+    # A constant number of queries per batch regardless of history: savepoint,
+    # queued orders, their dishes, locked pairs, upsert, affected dishes, top-K
+    # rows, diagonals, locked dishes, delete, insert, dequeue, release, then
+    # savepoint, empty read and release
+    order = place(customer_user, burger, salad)
+    with django_assert_num_queries(19):
+        assert flush_cooccurrence() == 1
+    assert refresh_top_k([]) == 0
+    assert str(CooccurrenceIncrement(order=order, dish=burger)) == f'#{order.id}: {burger.id}'
+
+
+@pytest.mark.django_db
+def test_pairs_are_added_to_the_stored_counts(dishes):
+    burger, fries, _, _ = dishes
+    DishCooccurrence.objects.create(dish=burger, other=burger, count=5)
+    counts = Counter({(burger.id, burger.id): 2, (burger.id, fries.id): 1, (fries.id, burger.id): 1})
+    assert _apply_pairs(counts) == {burger.id, fries.id}
+    # Increments stack on top of counts written by other flushes
+    DishCooccurrence.objects.filter(dish=burger, other=burger).update(count=F('count') + 10)
+    _apply_pairs(counts)
+    assert matrix() == sorted([(burger.id, burger.id, 19), (burger.id, fries.id, 2), (fries.id, burger.id, 2)])
+
+
+@pytest.mark.django_db
+def test_flush_keeps_queued_orders_when_the_database_fails(customer_user, dishes, monkeypatch):
+    place(customer_user, *dishes[:2])
+
+    def fail(*args, **kwargs):
+        raise DatabaseError('boom')
+
+    monkeypatch.setattr(DishRecommendation.objects, 'bulk_create', fail)
+    assert flush_cooccurrence() == 0
+    assert CooccurrenceIncrement.objects.count() == 2
+    assert not DishCooccurrence.objects.exists()
+
+    monkeypatch.undo()
+    out = StringIO()
+    call_command('flush_recommendations', stdout=out)
+    assert 'Applied 1 queued orders' in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_basket_recommendations(customer_user, dishes):
+    burger, fries, soda, salad = dishes
+    for basket in [(burger, fries), (burger, soda), (fries, soda), (soda, salad)]:
+        place(customer_user, *basket)
+    flush_cooccurrence()
+    ranked = recommend_for_basket([burger.id, fries.id])
+    assert [dish_id for dish_id, _ in ranked] == [soda.id]
+    assert ranked[0][1] == pytest.approx(2 * (1 / math.sqrt(2 * 3)), rel=1e-5)
+
+
+@pytest.mark.django_db
+def test_orders_feed_matrix_and_endpoint(customer_user, dishes):
+    burger, fries, soda, salad = dishes
+    api = APIClient()
+    api.force_authenticate(user=customer_user)
+    url = reverse('analytics:recommendation-list')
+
+    # Cold start falls back to popularity
+    Dish.objects.filter(pk=salad.pk).update(popularity_score=9)
+    resp = api.get(url, {'dish': burger.id, 'limit': 2})
+    assert resp.data['source'] == 'popularity'
+    assert resp.data['results'][0]['name'] == 'Ensalada' and resp.data['results'][0]['score'] is None
+
+    resp = api.post(reverse('pedidos:order-list'), {
+        'customer': customer_user.id, 'order_type': 'TAKEOUT',
+        'items': [{'dish': burger.id, 'quantity': 1}, {'dish': fries.id, 'quantity': 2}],
+    }, format='json')
+    assert resp.status_code == status.HTTP_201_CREATED
+    assert CooccurrenceIncrement.objects.count() == 2
+    assert flush_cooccurrence() == 1
+
+    resp = api.get(url, {'dish': burger.id})
+    assert resp.data['source'] == 'cooccurrence'
+    assert [row['name'] for row in resp.data['results']] == ['Papas']
+    assert resp.data['results'][0]['score'] == pytest.approx(1.0)
+
+    resp = api.get(url, {'basket': f'{fries.id},{soda.id}'})
+    assert [row['name'] for row in resp.data['results']] == ['Hamburguesa']
+
+    assert api.get(url).status_code == status.HTTP_400_BAD_REQUEST
+    assert api.get(url, {'dish': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+    for limit in (0, -1, 51):
+        resp = api.get(url, {'dish': salad.id, 'limit': limit})
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST and 'limit' in resp.data['error']
+    assert api.get(url, {'dish': salad.id, 'limit': 50}).status_code == status.HTTP_200_OK
+    assert str(DishRecommendation.objects.get(dish=burger)).endswith('(#1, 1.000)')
+    assert str(DishCooccurrence.objects.get(dish=burger, other=fries)) == f'{burger.id} × {fries.id}: 1'
@@ -0,0 +1,18 @@
+"""
+URLs para el módulo de Analítica
+================================
+RF-03: Recomendaciones
+"""
+
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import RecommendationViewSet
+
+app_name = 'analytics'
+
+router = DefaultRouter()
+router.register(r'recommendations', RecommendationViewSet, basename='recommendation')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,79 @@
+"""
+Views para Analítica
+====================
+RF-03: Recomendaciones de platos
+"""
+
+from rest_framework import viewsets, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from apps.platos.models import Dish
+from apps.platos.serializers import DishListSerializer
+from .recommendations import recommend_for_dish, recommend_for_basket
+
+
+# Tope del parámetro `limit`
+MAX_RECOMMENDATIONS = 50
+
+
+class RecommendationViewSet(viewsets.ViewSet):
+    """
+    "Otros clientes también pidieron" para un plato o una canasta.
+
+    RF-03: Se lee la tabla top-K precalculada; si aún no hay datos de
+    co-ocurrencia se responde con los platos más populares.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Recomendaciones item-a-item por co-ocurrencia en pedidos",
+        manual_parameters=[
+            openapi.Parameter('dish', openapi.IN_QUERY, description="Id del plato", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('basket', openapi.IN_QUERY, description="Ids de platos separados por coma", type=openapi.TYPE_STRING),
+            openapi.Parameter('limit', openapi.IN_QUERY, description=f"Número de recomendaciones, de 1 a {MAX_RECOMMENDATIONS} (default: 5)", type=openapi.TYPE_INTEGER),
+        ]
+    )
+    def list(self, request):
+        params = request.query_params
+        try:
+            limit = int(params.get('limit', 5))
+            if params.get('basket'):
+                basket = [int(value) for value in params['basket'].split(',') if value]
+            elif params.get('dish'):
+                basket = [int(params['dish'])]
+            else:
+                return Response(
+                    {'error': "Indique 'dish' o 'basket'."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        except ValueError:
+            return Response(
+                {'error': "Los parámetros 'dish', 'basket' y 'limit' deben ser enteros."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= limit <= MAX_RECOMMENDATIONS:
+            return Response(
+                {'error': f"'limit' debe estar entre 1 y {MAX_RECOMMENDATIONS}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(basket) == 1:
+            ranked = recommend_for_dish(basket[0])
+        else:
+            ranked = recommend_for_basket(basket)
+
+        source = 'cooccurrence'
+        dishes = Dish.objects.filter(pk__in=[dish_id for dish_id, _ in ranked], is_available=True).in_bulk()
+        results = [
+            {**DishListSerializer(dishes[dish_id]).data, 'score': score}
+            for dish_id, score in ranked
+            if dish_id in dishes
+        ][:limit]
+        if not results:
+            source = 'popularity'
+            popular = Dish.objects.filter(is_available=True).exclude(pk__in=basket).order_by('-popularity_score')[:limit]
+            results = [{**data, 'score': None} for data in DishListSerializer(popular, many=True).data]
+        return Response({'source': source, 'results': results})
@@ -5,3 +5,9 @@ class InventarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.inventario'
     verbose_name = 'Gestión de Inventario'
+
+    def ready(self):
+        try:
+            import apps.inventario.signals  # noqa
+        except Exception:  # pragma: no cover - fallback path if import fails
+            pass
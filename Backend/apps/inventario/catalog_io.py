@@ -0,0 +1,313 @@
+"""
+Importación y Exportación del Catálogo de Ingredientes
+======================================================
+RF-02: Carga y sincronización del inventario
+
+Importa CSV o NDJSON en bloques, sin cargar el archivo completo en memoria:
+cada bloque se valida fila por fila y se escribe con
+`bulk_create(update_conflicts=True)` sobre `Ingredient.name` (upsert), más un
+bulk_create de las filas de stock que falten. La columna `quantity` solo se
+usa como stock inicial de ingredientes sin fila de stock, y se registra como
+un ADJUSTMENT en el ledger más un lote de apertura; los movimientos de stock
+existentes se registran con adjust/receive. Los números se validan contra los
+dígitos de su columna, de modo que un valor fuera de rango es un error de
+fila y no un error de la BD.
+
+La exportación recorre la tabla con `.iterator()` y genera el archivo línea
+por línea (StreamingHttpResponse o un archivo en disco).
+"""
+
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.platos.availability import dishes_using, refresh_dish_availability
+from apps.platos.cache import bump_menu_version
+from apps.platos.costing import invalidate_costs
+from .models import (
+    Ingredient, InventoryCategory, InventoryStock, InventoryTransaction, StockLot, UnitOfMeasure,
+)
+from .services import refresh_low_stock
+from .units import UnitConversionError, rebase_recipe_items
+
+
+FILE_FORMATS = ['csv', 'ndjson']
+
+# Columnas del catálogo (name es la clave del upsert)
+CATALOG_FIELDS = [
+    'name', 'category', 'unit', 'density', 'cost_per_unit', 'supplier',
+    'minimum_stock', 'description', 'is_active',
+]
+EXPORT_FIELDS = CATALOG_FIELDS + ['quantity']
+
+TRUE_VALUES = {'1', 'true', 'yes', 'si', 'sí', 't', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'f', 'n'}
+
+
+def detect_format(filename, default='csv'):
+    return 'ndjson' if str(filename).lower().endswith(('.ndjson', '.jsonl')) else default
+
+
+def iter_rows(lines, file_format):
+    """Genera (número de línea, dict) desde un iterable de líneas de texto."""
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield number, ValueError(f"JSON inválido: {exc.msg}")
+            continue
+        yield number, row if isinstance(row, dict) else ValueError("Cada línea debe ser un objeto JSON.")
+
+
+# Columnas numéricas y el campo del modelo que fija sus dígitos y decimales
+DECIMAL_FIELDS = {
+    'density': Ingredient._meta.get_field('density'),
+    'cost_per_unit': Ingredient._meta.get_field('cost_per_unit'),
+    'minimum_stock': Ingredient._meta.get_field('minimum_stock'),
+    'quantity': InventoryStock._meta.get_field('quantity'),
+}
+
+# Marca de columna vacía que se omite (conserva el valor guardado)
+SKIP = object()
+
+
+def _decimal(value, field):
+    model_field = DECIMAL_FIELDS[field]
+    try:
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"{field}: número inválido '{value}'.")
+    if number < 0 or not number.is_finite():
+        raise ValueError(f"{field}: debe ser mayor o igual a 0.")
+    number = number.quantize(Decimal(1).scaleb(-model_field.decimal_places))
+    limit = Decimal(10) ** (model_field.max_digits - model_field.decimal_places)
+    if number >= limit:
+        raise ValueError(f"{field}: debe ser menor que {limit}.")
+    return number
+
+
+def _clean_choice(choices):
+    def clean(value, field):
+        text = str(value).strip().upper()
+        if text not in choices:
+            raise ValueError(f"{field}: valor inválido '{value}'.")
+        return text
+    return clean
+
+
+def _clean_density(value, field):
+    # Vacío borra la densidad
+    if value == '':
+        return None
+    value = _decimal(value, field)
+    if value == 0:
+        raise ValueError("density: debe ser mayor que 0.")
+    return value
+
+
+def _clean_amount(value, field):
+    return SKIP if value == '' else _decimal(value, field)
+
+
+def _clean_bool(value, field):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text == '':
+        return SKIP
+    if text not in TRUE_VALUES | FALSE_VALUES:
+        raise ValueError(f"{field}: valor inválido '{value}'.")
+    return text in TRUE_VALUES
+
+
+def _clean_supplier(value, field):
+    return str(value).strip()[:200]
+
+
+CLEANERS = {
+    'category': _clean_choice(InventoryCategory.values),
+    'unit': _clean_choice(UnitOfMeasure.values),
+    'density': _clean_density,
+    'cost_per_unit': _clean_amount,
+    'minimum_stock': _clean_amount,
+    'quantity': _clean_amount,
+    'is_active': _clean_bool,
+    'supplier': _clean_supplier,
+}
+
+
+def clean_row(raw):
+    """
+    Normaliza una fila del archivo. Solo incluye las columnas presentes para
+    no pisar valores existentes con defaults. Lanza ValueError.
+    """
+    name = str(raw.get('name') or '').strip()
+    if not name:
+        raise ValueError("name: requerido.")
+    row = {'name': name[:200]}
+    for field in CATALOG_FIELDS[1:] + ['quantity']:
+        if field not in raw or raw[field] is None:
+            continue
+        clean = CLEANERS.get(field)
+        value = clean(raw[field], field) if clean else str(raw[field])
+        if value is not SKIP:
+            row[field] = value
+    return row
+
+
+def _seed_stock(rows, ids, user=None):
+    """
+    Crea las filas de stock que falten. La cantidad inicial de un ingrediente
+    sin stock entra como cualquier otra existencia: un movimiento ADJUSTMENT
+    en el ledger y un lote de apertura para el consumo FEFO.
+    """
+    stocked = set(InventoryStock.objects.filter(ingredient_id__in=ids.values()).values_list('ingredient_id', flat=True))
+    seeds = {
+        ids[row['name']]: row.get('quantity', Decimal('0.00'))
+        for row in rows if ids[row['name']] not in stocked
+    }
+    if not seeds:
+        return
+    now = timezone.now()
+    InventoryStock.objects.bulk_create(
+        [InventoryStock(ingredient_id=ingredient_id, quantity=quantity) for ingredient_id, quantity in seeds.items()],
+        ignore_conflicts=True,
+    )
+    opening = {ingredient_id: quantity for ingredient_id, quantity in seeds.items() if quantity > 0}
+    InventoryTransaction.objects.bulk_create([
+        InventoryTransaction(
+            ingredient_id=ingredient_id, transaction_type='ADJUSTMENT', quantity=quantity,
+            balance_after=quantity, notes='Stock inicial (importación del catálogo)', user=user,
+        )
+        for ingredient_id, quantity in opening.items()
+    ])
+    StockLot.objects.bulk_create([
+        StockLot(ingredient_id=ingredient_id, quantity=quantity, initial_quantity=quantity, received_at=now)
+        for ingredient_id, quantity in opening.items()
+    ])
+
+
+def _upsert_chunk(rows, user=None):
+    """Escribe un bloque ya validado. Devuelve (creados, actualizados)."""
+    names = [row['name'] for row in rows]
+    with transaction.atomic():
+        existing = set(Ingredient.objects.filter(name__in=names).values_list('name', flat=True))
+
+        # Un upsert por conjunto de columnas presentes (normalmente uno por archivo)
+        groups = {}
+        for row in rows:
+            columns = tuple(sorted(key for key in row if key in CATALOG_FIELDS))
+            groups.setdefault(columns, []).append(row)
+        for columns, group in groups.items():
+            update_fields = [column for column in columns if column != 'name'] + ['updated_at']
+            Ingredient.objects.bulk_create(
+                [Ingredient(**{column: row[column] for column in columns}) for row in group],
+                update_conflicts=True,
+                unique_fields=['name'],
+                update_fields=update_fields,
+            )
+
+        ids = dict(Ingredient.objects.filter(name__in=names).values_list('name', 'id'))
+        _seed_stock(rows, ids, user)
+        # bulk_create no dispara señales: derivados del menú en una pasada
+        ingredient_ids = list(ids.values())
+        if any('unit' in columns or 'density' in columns for columns in groups):
+            rebase_recipe_items(ingredient_ids)
+        invalidate_costs(dishes_using(ingredient_ids))
+        refresh_dish_availability(ingredient_ids=ingredient_ids)
+        refresh_low_stock(ingredient_ids)
+        bump_menu_version()
+
+    created = len(set(names) - existing)
+    return created, len(set(names)) - created
+
+
+def _validate_chunk(chunk, errors):
+    """Filas válidas de un bloque por nombre y su línea; los errores se agregan a `errors`."""
+    valid, lines_by_name = {}, {}
+    for number, raw in chunk:
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            row = clean_row(raw)
+        except ValueError as exc:
+            errors.append({'line': number, 'error': str(exc)})
+            continue
+        # Dentro de un bloque gana la última aparición del nombre
+        valid[row['name']] = row
+        lines_by_name[row['name']] = number
+    return valid, lines_by_name
+
+
+def import_catalog(lines, file_format='csv', chunk_size=500, user=None):
+    """
+    Importa el catálogo desde un iterable de líneas. Las filas inválidas se
+    reportan y se omiten; las válidas se escriben bloque a bloque.
+    Devuelve {'created', 'updated', 'errors': [{'line', 'error'}]}.
+    """
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Formato no soportado: '{file_format}'.")
+    stats = {'created': 0, 'updated': 0, 'errors': []}
+    rows_iter = iter_rows(lines, file_format)
+    while True:
+        chunk = list(islice(rows_iter, chunk_size))
+        if not chunk:
+            break
+        valid, lines_by_name = _validate_chunk(chunk, stats['errors'])
+        if not valid:
+            continue
+        try:
+            created, updated = _upsert_chunk(list(valid.values()), user)
+        except UnitConversionError as exc:
+            # Una unidad nueva que rompe alguna receta revierte el bloque completo
+            stats['errors'].extend({'line': lines_by_name[name], 'error': str(exc)} for name in valid)
+            continue
+        stats['created'] += created
+        stats['updated'] += updated
+    return stats
+
+
+def export_queryset(queryset=None):
+    queryset = Ingredient.objects.all() if queryset is None else queryset
+    # LEFT JOIN con inventory_stock; sin fila de stock se exporta 0.00
+    return queryset.order_by('name').values(*CATALOG_FIELDS, quantity=F('stock__quantity'))
+
+
+def _export_rows(queryset, chunk_size):
+    for row in export_queryset(queryset).iterator(chunk_size=chunk_size):
+        if row['quantity'] is None:
+            row['quantity'] = Decimal('0.00')
+        yield row
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en lugar de escribirla."""
+
+    def write(self, value):
+        return value
+
+
+def export_catalog(queryset=None, file_format='csv', chunk_size=2000):
+    """Genera el catálogo línea por línea (.iterator(): sin cargar toda la tabla)."""
+    rows = _export_rows(queryset, chunk_size)
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+    else:
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
@@ -0,0 +1,259 @@
+"""
+Pronóstico de Consumo y Reposición
+==================================
+RF-02: Stock mínimo calculado a partir del consumo
+
+Job nocturno (comando forecast_inventory). Lee el historial USAGE del
+ledger con una consulta agregada por (ingrediente, día), más los días ya
+compactados en inventory_transaction_daily (ledger.py), y arma una serie
+diaria por ingrediente. Sobre todas las series a la vez (matriz
+ingredientes × días, vectorizada con NumPy si está instalado):
+
+1. Estacionalidad semanal: índice por día de la semana = consumo medio de
+   ese día / consumo medio general (1 si hay menos de dos semanas de datos).
+2. Suavizado exponencial simple (FORECAST_SMOOTHING) sobre la serie
+   desestacionalizada: nivel = demanda diaria base; la dispersión de los
+   errores de un paso da la desviación estándar.
+3. Demanda del plazo de entrega (FORECAST_LEAD_TIME_DAYS) y del ciclo de
+   revisión (FORECAST_REVIEW_DAYS) = nivel × índices de los días futuros.
+4. Stock de seguridad = z × σ × √plazo; punto de reorden = demanda del plazo
+   + seguridad; stock objetivo = demanda de plazo + revisión + seguridad.
+
+Las sugerencias por proveedor se calculan al consultarlas contra el stock
+vigente: ingredientes en o bajo su punto de reorden piden hasta el objetivo.
+"""
+
+import math
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal, ROUND_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy es opcional
+    np = None
+
+from .models import Ingredient, IngredientForecast, InventoryDailySummary, InventoryStock, InventoryTransaction
+from .services import refresh_low_stock
+
+
+# Con menos días la estacionalidad semanal no es confiable
+MIN_SEASONAL_DAYS = 14
+
+FORECAST_FIELDS = [
+    'daily_demand', 'lead_time_demand', 'safety_stock', 'reorder_point', 'order_up_to',
+]
+
+
+def load_daily_usage(history_days, end=None):
+    """
+    Consumo diario por ingrediente de los `history_days` días que terminan
+    en `end` (ayer por defecto): una consulta agregada sobre el ledger y otra
+    sobre los resúmenes diarios de los días compactados.
+    Devuelve (primer día, {ingredient_id: [consumo por día]}).
+    """
+    end = end or timezone.localdate() - timedelta(days=1)
+    start = end - timedelta(days=history_days - 1)
+    rows = (
+        InventoryTransaction.objects
+        .filter(
+            transaction_type='USAGE',
+            created_at__gte=timezone.make_aware(datetime.combine(start, time.min)),
+            created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+        )
+        .annotate(day=TruncDate('created_at'))
+        .values('ingredient_id', 'day')
+        .annotate(used=Sum('quantity'))
+        .order_by()
+    )
+    compacted = InventoryDailySummary.objects.filter(
+        transaction_type='USAGE', day__range=(start, end)
+    ).values_list('ingredient_id', 'day', 'quantity')
+
+    series = defaultdict(lambda: [0.0] * history_days)
+    # USAGE se registra en negativo
+    for row in rows:
+        series[row['ingredient_id']][(row['day'] - start).days] -= float(row['used'])
+    for ingredient_id, day, quantity in compacted:
+        series[ingredient_id][(day - start).days] -= float(quantity)
+    return start, dict(series)
+
+
+def _forecast_numpy(matrix, first_weekday, alpha, lead, review, z):
+    usage = np.array(matrix, dtype=float)
+    days = usage.shape[1]
+    weekdays = (first_weekday + np.arange(days)) % 7
+    season = np.ones((usage.shape[0], 7))
+    mean = usage.mean(axis=1)
+    if days >= MIN_SEASONAL_DAYS:
+        onehot = np.eye(7)[weekdays]
+        by_weekday = (usage @ onehot) / onehot.sum(axis=0)
+        active = mean > 0
+        season[active] = by_weekday[active] / mean[active, None]
+
+    factors = season[:, weekdays]
+    deseasonalized = np.divide(usage, factors, out=np.zeros_like(usage), where=factors > 0)
+    level = deseasonalized[:, 0].copy()
+    squared_errors = np.zeros_like(level)
+    for day in range(1, days):
+        error = deseasonalized[:, day] - level
+        squared_errors += error ** 2
+        level += alpha * error
+    sigma = np.sqrt(squared_errors / max(days - 1, 1))
+
+    future = (first_weekday + days + np.arange(lead + review)) % 7
+    lead_demand = level * season[:, future[:lead]].sum(axis=1)
+    cycle_demand = level * season[:, future].sum(axis=1)
+    safety = z * sigma * math.sqrt(lead)
+    return zip(level, lead_demand, safety, lead_demand + safety, cycle_demand + safety)
+
+
+def _forecast_python(values, first_weekday, alpha, lead, review, z):
+    days = len(values)
+    weekdays = [(first_weekday + day) % 7 for day in range(days)]
+    season = [1.0] * 7
+    mean = sum(values) / days
+    if days >= MIN_SEASONAL_DAYS and mean > 0:
+        sums, counts = [0.0] * 7, [0] * 7
+        for value, weekday in zip(values, weekdays):
+            sums[weekday] += value
+            counts[weekday] += 1
+        season = [sums[weekday] / counts[weekday] / mean for weekday in range(7)]
+
+    deseasonalized = [
+        value / season[weekday] if season[weekday] > 0 else 0.0
+        for value, weekday in zip(values, weekdays)
+    ]
+    level = deseasonalized[0]
+    squared_errors = 0.0
+    for value in deseasonalized[1:]:
+        error = value - level
+        squared_errors += error ** 2
+        level += alpha * error
+    sigma = math.sqrt(squared_errors / max(days - 1, 1))
+
+    future = [(first_weekday + days + day) % 7 for day in range(lead + review)]
+    lead_demand = level * sum(season[weekday] for weekday in future[:lead])
+    cycle_demand = level * sum(season[weekday] for weekday in future)
+    safety = z * sigma * math.sqrt(lead)
+    return level, lead_demand, safety, lead_demand + safety, cycle_demand + safety
+
+
+def forecast(series, start, alpha=None, lead=None, review=None, z=None):
+    """
+    Pronóstico de todas las series {ingredient_id: [consumo diario]} que
+    empiezan en `start`. Devuelve {ingredient_id: {campo: Decimal}}.
+    """
+    alpha = getattr(settings, 'FORECAST_SMOOTHING', 0.3) if alpha is None else alpha
+    lead = getattr(settings, 'FORECAST_LEAD_TIME_DAYS', 2) if lead is None else lead
+    review = getattr(settings, 'FORECAST_REVIEW_DAYS', 7) if review is None else review
+    z = getattr(settings, 'FORECAST_SERVICE_Z', 1.65) if z is None else z
+    if not series:
+        return {}
+
+    ingredient_ids = sorted(series)
+    first_weekday = start.weekday()
+    if np is not None:
+        results = _forecast_numpy([series[i] for i in ingredient_ids], first_weekday, alpha, lead, review, z)
+    else:
+        results = (_forecast_python(series[i], first_weekday, alpha, lead, review, z) for i in ingredient_ids)
+
+    forecasts = {}
+    for ingredient_id, values in zip(ingredient_ids, results):
+        daily, *rest = (max(float(value), 0.0) for value in values)
+        forecasts[ingredient_id] = {
+            'daily_demand': Decimal(f'{daily:.4f}'),
+            # Cantidades de stock redondeadas hacia arriba a 2 decimales
+            **{
+                field: Decimal(f'{value:.6f}').quantize(Decimal('0.01'), ROUND_UP)
+                for field, value in zip(FORECAST_FIELDS[1:], rest)
+            },
+        }
+    return forecasts
+
+
+def run_forecast(history_days=None, end=None, apply_minimum_stock=False):
+    """
+    Recalcula y guarda IngredientForecast de los ingredientes con consumo en
+    la ventana (upsert en lote); con `apply_minimum_stock` copia el punto de
+    reorden a Ingredient.minimum_stock. Devuelve el número de pronósticos.
+    """
+    history_days = history_days or getattr(settings, 'FORECAST_HISTORY_DAYS', 365)
+    start, series = load_daily_usage(history_days, end=end)
+    forecasts = forecast(series, start)
+    now = timezone.now()
+    stock = dict(
+        InventoryStock.objects.filter(ingredient_id__in=forecasts).values_list('ingredient_id', 'quantity')
+    )
+
+    rows = []
+    for ingredient_id, values in forecasts.items():
+        available = stock.get(ingredient_id) or Decimal('0.00')
+        suggested = values['order_up_to'] - available if available <= values['reorder_point'] else Decimal('0.00')
+        rows.append(IngredientForecast(
+            ingredient_id=ingredient_id, suggested_quantity=max(suggested, Decimal('0.00')),
+            history_days=history_days, computed_at=now, **values,
+        ))
+
+    with transaction.atomic():
+        IngredientForecast.objects.exclude(ingredient_id__in=forecasts).delete()
+        IngredientForecast.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['ingredient'],
+            update_fields=FORECAST_FIELDS + ['suggested_quantity', 'history_days', 'computed_at'],
+        )
+        if apply_minimum_stock:
+            ingredients = [
+                Ingredient(pk=ingredient_id, minimum_stock=values['reorder_point'])
+                for ingredient_id, values in forecasts.items()
+            ]
+            Ingredient.objects.bulk_update(ingredients, ['minimum_stock'])
+            refresh_low_stock(list(forecasts))
+    return len(rows)
+
+
+def reorder_suggestions(queryset=None):
+    """
+    Pedido sugerido por proveedor contra el stock vigente: ingredientes
+    activos en o bajo su punto de reorden, hasta el stock objetivo.
+    [{'supplier', 'estimated_cost', 'items': [...]}], ordenado por proveedor.
+    """
+    queryset = Ingredient.objects.all() if queryset is None else queryset
+    quantity_field = DecimalField(max_digits=12, decimal_places=2)
+    rows = (
+        queryset.filter(is_active=True, forecast__isnull=False)
+        .annotate(current=Coalesce('stock__quantity', Value(Decimal('0.00')), output_field=quantity_field))
+        .filter(current__lte=F('forecast__reorder_point'))
+        .order_by('supplier', 'name')
+        .values(
+            'id', 'name', 'unit', 'supplier', 'cost_per_unit', 'current',
+            'forecast__daily_demand', 'forecast__reorder_point', 'forecast__order_up_to',
+        )
+    )
+    groups = {}
+    for row in rows:
+        current = Decimal(row['current']).quantize(Decimal('0.01'))
+        quantity = row['forecast__order_up_to'] - current
+        if quantity <= 0:
+            continue
+        cost = (quantity * row['cost_per_unit']).quantize(Decimal('0.01'))
+        group = groups.setdefault(row['supplier'], {'supplier': row['supplier'], 'estimated_cost': Decimal('0.00'), 'items': []})
+        group['estimated_cost'] += cost
+        group['items'].append({
+            'ingredient': row['id'],
+            'ingredient_name': row['name'],
+            'unit': row['unit'],
+            'current_stock': current,
+            'daily_demand': row['forecast__daily_demand'],
+            'reorder_point': row['forecast__reorder_point'],
+            'suggested_quantity': quantity,
+            'estimated_cost': cost,
+        })
+    return list(groups.values())
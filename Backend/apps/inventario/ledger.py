@@ -0,0 +1,129 @@
+"""
+Retención y Compactación del Ledger de Inventario
+=================================================
+RF-02, RNF-01: Trazabilidad sin que el ledger crezca sin límite
+
+`inventory_transactions` suma varias filas por pedido y por ajuste. La tabla
+caliente conserva solo los últimos INVENTORY_LEDGER_RETENTION_DAYS días, de
+modo que los listados recientes (InventoryTransactionViewSet) recorren índices
+chicos. El comando compact_inventory_ledger procesa los días anteriores, en
+lotes y en orden (created_at, id):
+
+1. Copia el detalle a `inventory_transactions_archive`, con el mismo id, para
+   auditoría (consultable en /api/inventory/ledger/archive/).
+2. Suma cada (ingrediente, día local, tipo) en `inventory_transaction_daily`:
+   cantidad neta, número de movimientos y saldos de apertura y cierre. Si la
+   fila ya existe (un día repartido en varios lotes) se combina con ella.
+3. Borra las filas compactadas de la tabla caliente.
+
+Cada lote corre en su propia transacción, por lo que interrumpir el comando
+no pierde ni duplica movimientos. El corte es siempre a medianoche local
+para que un día nunca quede repartido entre el ledger y el resumen.
+
+stock_at (snapshots.py) y el pronóstico (forecasting.py) leen también las
+tablas compactadas, así que sus resultados no cambian al compactar.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import InventoryDailySummary, InventoryTransaction, InventoryTransactionArchive
+
+
+SUMMARY_FIELDS = ['movements', 'quantity', 'opening_balance', 'closing_balance', 'first_at', 'last_at']
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def retention_cutoff(now=None):
+    """Medianoche local del primer día que se conserva en la tabla caliente."""
+    days = getattr(settings, 'INVENTORY_LEDGER_RETENTION_DAYS', 90)
+    return day_start(timezone.localdate(now) - timedelta(days=days))
+
+
+def _archive(row):
+    return InventoryTransactionArchive(
+        id=row.pk, ingredient_id=row.ingredient_id, transaction_type=row.transaction_type,
+        quantity=row.quantity, balance_after=row.balance_after, notes=row.notes,
+        user_id=row.user_id, related_order_id=row.related_order_id, created_at=row.created_at,
+    )
+
+
+def _summarize(rows):
+    """Resúmenes por (ingrediente, día local, tipo) de filas ordenadas por (created_at, id)."""
+    groups = {}
+    for row in rows:
+        key = (row.ingredient_id, timezone.localdate(row.created_at), row.transaction_type)
+        summary = groups.get(key)
+        if summary is None:
+            groups[key] = InventoryDailySummary(
+                ingredient_id=key[0], day=key[1], transaction_type=key[2],
+                movements=1, quantity=row.quantity,
+                opening_balance=row.balance_after - row.quantity, closing_balance=row.balance_after,
+                first_at=row.created_at, last_at=row.created_at,
+            )
+        else:
+            summary.movements += 1
+            summary.quantity += row.quantity
+            summary.closing_balance = row.balance_after
+            summary.last_at = row.created_at
+    return groups
+
+
+def _merge_summaries(groups):
+    """Combina los resúmenes nuevos con los ya guardados y los escribe con un upsert."""
+    stored = InventoryDailySummary.objects.select_for_update().filter(
+        ingredient_id__in={key[0] for key in groups},
+        day__in={key[1] for key in groups},
+    )
+    for previous in stored:
+        summary = groups.get((previous.ingredient_id, previous.day, previous.transaction_type))
+        if summary is None:
+            continue
+        summary.movements += previous.movements
+        summary.quantity += previous.quantity
+        if previous.first_at < summary.first_at:
+            summary.first_at, summary.opening_balance = previous.first_at, previous.opening_balance
+        if previous.last_at > summary.last_at:
+            summary.last_at, summary.closing_balance = previous.last_at, previous.closing_balance
+
+    InventoryDailySummary.objects.bulk_create(
+        groups.values(),
+        update_conflicts=True,
+        unique_fields=['ingredient', 'day', 'transaction_type'],
+        update_fields=SUMMARY_FIELDS,
+    )
+
+
+def compact_ledger(before=None, batch_size=1000):
+    """
+    Archiva y resume los movimientos anteriores a `before` (redondeado a la
+    medianoche local; por defecto retention_cutoff()).
+    Devuelve {'before', 'archived', 'summaries'}.
+    """
+    before = day_start(timezone.localdate(before)) if before else retention_cutoff()
+    archived = 0
+    summaries = set()
+    while True:
+        with transaction.atomic():
+            rows = list(
+                InventoryTransaction.objects.select_for_update()
+                .filter(created_at__lt=before)
+                .order_by('created_at', 'id')[:batch_size]
+            )
+            if not rows:
+                break
+            InventoryTransactionArchive.objects.bulk_create(
+                [_archive(row) for row in rows], ignore_conflicts=True
+            )
+            groups = _summarize(rows)
+            _merge_summaries(groups)
+            InventoryTransaction.objects.filter(pk__in=[row.pk for row in rows]).delete()
+        archived += len(rows)
+        summaries.update(groups)
+    return {'before': before, 'archived': archived, 'summaries': len(summaries)}
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventario.ledger import compact_ledger
+from apps.pedidos.stats import parse_date_bound
+
+
+class Command(BaseCommand):
+    help = "Archive old inventory transactions and keep daily per-ingredient summaries (RF-02); schedule nightly"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before",
+            type=str,
+            default=None,
+            help="Compact days before this date (YYYY-MM-DD); defaults to INVENTORY_LEDGER_RETENTION_DAYS ago",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Transactions archived per database transaction",
+        )
+
+    def handle(self, *args, **options):
+        before = None
+        if options["before"]:
+            try:
+                before = parse_date_bound(options["before"])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+
+        result = compact_ledger(before=before, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {result['archived']} transactions into {result['summaries']} daily summaries "
+            f"(before {result['before']:%Y-%m-%d})"
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from apps.inventario.catalog_io import FILE_FORMATS, detect_format, export_catalog
+
+
+class Command(BaseCommand):
+    help = "Export the ingredient catalog with current stock (RF-02) as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default=None,
+            help="Output file (defaults to stdout)",
+        )
+        parser.add_argument(
+            "--file-format",
+            choices=FILE_FORMATS,
+            default=None,
+            help="Override the format detected from the file extension",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["file_format"] or detect_format(path or "", default="csv")
+        if path is None:
+            for line in export_catalog(file_format=file_format):
+                self.stdout.write(line, ending="")
+            return
+
+        rows = 0
+        with open(path, "w", encoding="utf-8", newline="") as handle:
+            for line in export_catalog(file_format=file_format):
+                handle.write(line)
+                rows += 1
+        if file_format == "csv":
+            rows -= 1
+        self.stdout.write(self.style.SUCCESS(f"Exported {rows} ingredients to {path}"))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventario.forecasting import run_forecast
+from apps.pedidos.stats import parse_date_bound
+
+
+class Command(BaseCommand):
+    help = "Forecast ingredient usage from the ledger and compute reorder points (RF-02); run nightly"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--history-days",
+            type=int,
+            default=None,
+            help="Days of USAGE history to read (default: FORECAST_HISTORY_DAYS)",
+        )
+        parser.add_argument(
+            "--end",
+            type=str,
+            default=None,
+            help="Last day of history (YYYY-MM-DD, default: yesterday)",
+        )
+        parser.add_argument(
+            "--apply-minimum-stock",
+            action="store_true",
+            help="Copy each reorder point into Ingredient.minimum_stock",
+        )
+
+    def handle(self, *args, **options):
+        end = None
+        if options["end"]:
+            try:
+                end = parse_date_bound(options["end"]).date()
+            except ValueError as exc:
+                raise CommandError(str(exc))
+        if options["history_days"] is not None and options["history_days"] < 1:
+            raise CommandError("--history-days must be at least 1")
+
+        count = run_forecast(
+            history_days=options["history_days"],
+            end=end,
+            apply_minimum_stock=options["apply_minimum_stock"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Forecast {count} ingredients"))
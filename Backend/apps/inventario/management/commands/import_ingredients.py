@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventario.catalog_io import FILE_FORMATS, detect_format, import_catalog
+
+
+class Command(BaseCommand):
+    help = "Upsert the ingredient catalog (RF-02) from a CSV or NDJSON file, in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=str, help="CSV or NDJSON (.ndjson/.jsonl) file")
+        parser.add_argument(
+            "--file-format",
+            choices=FILE_FORMATS,
+            default=None,
+            help="Override the format detected from the file extension",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Rows per bulk upsert",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["file_format"] or detect_format(path)
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as handle:
+                stats = import_catalog(handle, file_format=file_format, chunk_size=options["chunk_size"])
+        except (OSError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+
+        for error in stats["errors"]:
+            self.stderr.write(f"Line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported ingredients: {stats['created']} created, {stats['updated']} updated, "
+            f"{len(stats['errors'])} rejected"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.inventario.services import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Release stock reservations of pending orders whose TTL expired (RF-02); schedule every few minutes"
+
+    def handle(self, *args, **options):
+        count = release_expired_reservations()
+        self.stdout.write(self.style.SUCCESS(f"Released {count} expired reservations"))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventario.snapshots import take_stock_snapshots
+from apps.pedidos.stats import parse_date_bound
+
+
+class Command(BaseCommand):
+    help = "Record a stock snapshot per ingredient (RF-02); schedule daily and at month end"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--at",
+            type=str,
+            default=None,
+            help="Reconstruct the snapshot for this moment (YYYY-MM-DD = end of day, or ISO 8601)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per bulk insert",
+        )
+
+    def handle(self, *args, **options):
+        at = None
+        if options["at"]:
+            try:
+                at = parse_date_bound(options["at"], end=True)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+
+        count = take_stock_snapshots(at=at, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Recorded {count} stock snapshots"))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0004_transaction_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorystock',
+            index=models.Index(fields=['ingredient', 'quantity'], name='inventory_s_ingredi_ab6fc3_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0005_stock_quantity_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(help_text='Point in time the snapshot represents')),
+                ('quantity', models.DecimalField(decimal_places=2, help_text='Stock balance at taken_at', max_digits=10)),
+                ('unit_cost', models.DecimalField(decimal_places=2, help_text='Cost per unit at taken_at (for valuation - RF-06)', max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('ingredient', models.ForeignKey(help_text='Related ingredient', on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventario.ingredient')),
+            ],
+            options={
+                'verbose_name': 'Stock Snapshot',
+                'verbose_name_plural': 'Stock Snapshots',
+                'db_table': 'inventory_stock_snapshots',
+                'ordering': ['-taken_at'],
+                'indexes': [models.Index(fields=['taken_at'], name='inventory_s_taken_a_662a4d_idx')],
+                'unique_together': {('ingredient', 'taken_at')},
+            },
+        ),
+    ]
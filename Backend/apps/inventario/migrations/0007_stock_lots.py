@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:36
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def open_lots_from_stock(apps, schema_editor):
+    # El saldo actual pasa a ser un lote inicial con el vencimiento que tenía la fila de stock
+    InventoryStock = apps.get_model('inventario', 'InventoryStock')
+    StockLot = apps.get_model('inventario', 'StockLot')
+    StockLot.objects.bulk_create([
+        StockLot(
+            ingredient_id=stock.ingredient_id,
+            quantity=stock.quantity,
+            initial_quantity=stock.quantity,
+            received_at=stock.last_restocked or stock.updated_at,
+            expiration_date=stock.expiration_date,
+        )
+        for stock in InventoryStock.objects.filter(quantity__gt=0).iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0006_stock_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lot_code', models.CharField(blank=True, help_text='Supplier lot code', max_length=100)),
+                ('quantity', models.DecimalField(decimal_places=2, help_text='Remaining quantity in this lot', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))])),
+                ('initial_quantity', models.DecimalField(decimal_places=2, help_text='Quantity received', max_digits=10)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Reception date')),
+                ('expiration_date', models.DateField(blank=True, help_text='Expiration date (if applicable)', null=True)),
+                ('ingredient', models.ForeignKey(help_text='Related ingredient', on_delete=django.db.models.deletion.CASCADE, related_name='lots', to='inventario.ingredient')),
+            ],
+            options={
+                'verbose_name': 'Stock Lot',
+                'verbose_name_plural': 'Stock Lots',
+                'db_table': 'inventory_lots',
+                'ordering': ['expiration_date', 'received_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('quantity__gt', 0)), fields=['expiration_date'], name='lot_open_expiry_idx'), models.Index(condition=models.Q(('quantity__gt', 0)), fields=['ingredient', 'expiration_date', 'received_at'], name='lot_fefo_idx')],
+            },
+        ),
+        migrations.RunPython(open_lots_from_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:42
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0007_stock_lots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='density',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Density in g/ml, for mass/volume recipe conversions (RF-02)', max_digits=8, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.0001'))]),
+        ),
+    ]
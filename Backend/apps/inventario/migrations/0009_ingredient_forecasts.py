@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0008_ingredient_density'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_demand', models.DecimalField(decimal_places=4, help_text='Smoothed, deseasonalized daily usage', max_digits=12)),
+                ('lead_time_demand', models.DecimalField(decimal_places=2, help_text='Forecast usage during the supplier lead time', max_digits=12)),
+                ('safety_stock', models.DecimalField(decimal_places=2, help_text='Buffer for usage variability', max_digits=12)),
+                ('reorder_point', models.DecimalField(decimal_places=2, help_text='Reorder when stock falls to this level (RF-02)', max_digits=12)),
+                ('order_up_to', models.DecimalField(decimal_places=2, help_text='Target stock after receiving an order', max_digits=12)),
+                ('suggested_quantity', models.DecimalField(decimal_places=2, help_text='Quantity to order now (0 if above the reorder point)', max_digits=12)),
+                ('history_days', models.PositiveIntegerField(help_text='Days of ledger history used')),
+                ('computed_at', models.DateTimeField(help_text='Forecast run timestamp')),
+                ('ingredient', models.OneToOneField(help_text='Related ingredient', on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='inventario.ingredient')),
+            ],
+            options={
+                'verbose_name': 'Ingredient Forecast',
+                'verbose_name_plural': 'Ingredient Forecasts',
+                'db_table': 'ingredient_forecasts',
+                'indexes': [models.Index(fields=['suggested_quantity'], name='ingredient__suggest_69c810_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:50
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0009_ingredient_forecasts'),
+        ('pedidos', '0003_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorystock',
+            name='reserved_quantity',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Held by pending orders (sum of active reservations)', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))]),
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=2, help_text='Reserved quantity in the stock unit', max_digits=10)),
+                ('expires_at', models.DateTimeField(help_text='Released automatically after this moment')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('ingredient', models.ForeignKey(help_text='Reserved ingredient', on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='inventario.ingredient')),
+                ('order', models.ForeignKey(help_text='Pending order holding the stock', on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='pedidos.order')),
+            ],
+            options={
+                'verbose_name': 'Stock Reservation',
+                'verbose_name_plural': 'Stock Reservations',
+                'db_table': 'inventory_reservations',
+                'indexes': [models.Index(fields=['expires_at'], name='inventory_r_expires_6d42ee_idx')],
+                'unique_together': {('order', 'ingredient')},
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0010_stock_reservations'),
+        ('pedidos', '0003_order_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Local date of the movements')),
+                ('transaction_type', models.CharField(choices=[('RESTOCK', 'Restock'), ('USAGE', 'Usage (Order)'), ('ADJUSTMENT', 'Manual Adjustment'), ('WASTE', 'Waste/Spoilage'), ('RETURN', 'Return to Supplier')], help_text='Type of transaction (RF-02)', max_length=20)),
+                ('movements', models.PositiveIntegerField(help_text='Number of compacted transactions')),
+                ('quantity', models.DecimalField(decimal_places=2, help_text='Net quantity of the compacted transactions', max_digits=12)),
+                ('opening_balance', models.DecimalField(decimal_places=2, help_text='Stock balance before the first transaction', max_digits=10)),
+                ('closing_balance', models.DecimalField(decimal_places=2, help_text='Stock balance after the last transaction', max_digits=10)),
+                ('first_at', models.DateTimeField(help_text='Timestamp of the first transaction')),
+                ('last_at', models.DateTimeField(help_text='Timestamp of the last transaction')),
+                ('ingredient', models.ForeignKey(help_text='Related ingredient', on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='inventario.ingredient')),
+            ],
+            options={
+                'verbose_name': 'Inventory Daily Summary',
+                'verbose_name_plural': 'Inventory Daily Summaries',
+                'db_table': 'inventory_transaction_daily',
+                'ordering': ['-day', 'ingredient', 'transaction_type'],
+                'indexes': [models.Index(fields=['day', 'transaction_type'], name='inventory_t_day_9bd46f_idx')],
+                'unique_together': {('ingredient', 'day', 'transaction_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryTransactionArchive',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Original transaction id', primary_key=True, serialize=False)),
+                ('transaction_type', models.CharField(choices=[('RESTOCK', 'Restock'), ('USAGE', 'Usage (Order)'), ('ADJUSTMENT', 'Manual Adjustment'), ('WASTE', 'Waste/Spoilage'), ('RETURN', 'Return to Supplier')], help_text='Type of transaction (RF-02)', max_length=20)),
+                ('quantity', models.DecimalField(decimal_places=2, help_text='Quantity changed (positive for add, negative for deduct)', max_digits=10)),
+                ('balance_after', models.DecimalField(decimal_places=2, help_text='Stock balance after transaction', max_digits=10)),
+                ('notes', models.TextField(blank=True, help_text='Transaction notes')),
+                ('created_at', models.DateTimeField(help_text='Original transaction timestamp')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, help_text='When the row was compacted')),
+                ('ingredient', models.ForeignKey(help_text='Related ingredient', on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='inventario.ingredient')),
+                ('related_order', models.ForeignKey(blank=True, help_text='Related order (if applicable)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_inventory_transactions', to='pedidos.order')),
+                ('user', models.ForeignKey(help_text='User who performed transaction (RNF-04)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_inventory_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Inventory Transaction',
+                'verbose_name_plural': 'Archived Inventory Transactions',
+                'db_table': 'inventory_transactions_archive',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['ingredient', 'created_at'], name='inventory_t_ingredi_374871_idx'), models.Index(fields=['created_at', 'id'], name='inventory_t_created_34e50b_idx')],
+            },
+        ),
+    ]
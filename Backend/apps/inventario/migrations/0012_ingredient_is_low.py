@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 20:42
+
+from django.db import migrations, models
+from django.db.models import F, Q
+
+
+def compute_is_low(apps, schema_editor):
+    Ingredient = apps.get_model('inventario', 'Ingredient')
+    Ingredient.objects.filter(
+        Q(stock__isnull=True, minimum_stock__gt=0) | Q(stock__quantity__lt=F('minimum_stock'))
+    ).update(is_low=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0011_transaction_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='inventorystock',
+            name='inventory_s_ingredi_ab6fc3_idx',
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='is_low',
+            field=models.BooleanField(default=False, editable=False, help_text='Stock below minimum_stock (maintained by services.refresh_low_stock - RF-02)'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(condition=models.Q(('is_low', True)), fields=['name'], name='ingredient_low_stock_idx'),
+        ),
+        migrations.RunPython(compute_is_low, migrations.RunPython.noop),
+    ]
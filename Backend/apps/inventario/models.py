@@ -4,6 +4,8 @@ Modelos de Inventario
 """
 
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from decimal import Decimal
@@ -39,8 +41,10 @@ class Ingredient(models.Model):
     cost_per_unit = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'), validators=[MinValueValidator(Decimal('0.00'))], help_text=_("Cost per unit (for analytics - RF-06)"))
     supplier = models.CharField(max_length=200, blank=True, help_text=_("Primary supplier"))
     minimum_stock = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('10.00'), validators=[MinValueValidator(Decimal('0.00'))], help_text=_("Minimum stock level for alerts (RF-02)"))
+    density = models.DecimalField(max_digits=8, decimal_places=4, null=True, blank=True, validators=[MinValueValidator(Decimal('0.0001'))], help_text=_("Density in g/ml, for mass/volume recipe conversions (RF-02)"))
     description = models.TextField(blank=True, help_text=_("Additional information"))
     is_active = models.BooleanField(default=True, help_text=_("Is this ingredient currently in use?"))
+    is_low = models.BooleanField(default=False, editable=False, help_text=_("Stock below minimum_stock (maintained by services.refresh_low_stock - RF-02)"))
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -52,6 +56,8 @@ class Ingredient(models.Model):
         indexes = [
             models.Index(fields=['category']),
             models.Index(fields=['is_active']),
+            # Índice parcial: solo los ingredientes en alerta, en el orden del listado low_stock
+            models.Index(fields=['name'], condition=Q(is_low=True), name='ingredient_low_stock_idx'),
         ]
 
     def __str__(self):
@@ -71,6 +77,7 @@ class Ingredient(models.Model):
 class InventoryStock(models.Model):
     ingredient = models.OneToOneField(Ingredient, on_delete=models.CASCADE, related_name='stock', help_text=_("Related ingredient"))
     quantity = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'), validators=[MinValueValidator(Decimal('0.00'))], help_text=_("Current quantity in stock (RF-02)"))
+    reserved_quantity = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'), validators=[MinValueValidator(Decimal('0.00'))], help_text=_("Held by pending orders (sum of active reservations)"))
     last_restocked = models.DateTimeField(null=True, blank=True, help_text=_("Last restock date"))
     expiration_date = models.DateField(null=True, blank=True, help_text=_("Expiration date (if applicable)"))
     updated_at = models.DateTimeField(auto_now=True)
@@ -83,28 +90,75 @@ class InventoryStock(models.Model):
     def __str__(self):
         return f"{self.ingredient.name}: {self.quantity} {self.ingredient.get_unit_display()}"
 
+    @property
+    def available_quantity(self):
+        """Stock libre: físico menos lo reservado por pedidos pendientes."""
+        return self.quantity - self.reserved_quantity
+
     def add_stock(self, quantity):
-        self.quantity += quantity
-        self.save()
-        InventoryTransaction.objects.create(
-            ingredient=self.ingredient,
-            transaction_type='RESTOCK',
-            quantity=quantity,
-            balance_after=self.quantity
-        )
+        from .services import adjust_stock
+        adjust_stock(self, quantity, 'RESTOCK')
 
     def deduct_stock(self, quantity):
-        if self.quantity >= quantity:
-            self.quantity -= quantity
-            self.save()
-            InventoryTransaction.objects.create(
-                ingredient=self.ingredient,
-                transaction_type='USAGE',
-                quantity=-quantity,
-                balance_after=self.quantity
-            )
-            return True
-        return False
+        from .services import adjust_stock, InsufficientStock
+        try:
+            adjust_stock(self, -quantity, 'USAGE')
+        except InsufficientStock:
+            return False
+        return True
+
+
+class StockLot(models.Model):
+    """
+    Lote recibido de un ingrediente. InventoryStock.quantity sigue siendo el
+    total; los lotes desglosan ese total por vencimiento y se consumen FEFO.
+    """
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='lots', help_text=_("Related ingredient"))
+    lot_code = models.CharField(max_length=100, blank=True, help_text=_("Supplier lot code"))
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.00'))], help_text=_("Remaining quantity in this lot"))
+    initial_quantity = models.DecimalField(max_digits=10, decimal_places=2, help_text=_("Quantity received"))
+    received_at = models.DateTimeField(default=timezone.now, help_text=_("Reception date"))
+    expiration_date = models.DateField(null=True, blank=True, help_text=_("Expiration date (if applicable)"))
+
+    class Meta:
+        db_table = 'inventory_lots'
+        verbose_name = _('Stock Lot')
+        verbose_name_plural = _('Stock Lots')
+        ordering = ['expiration_date', 'received_at', 'id']
+        # Índices parciales: solo lotes con saldo, que son los que se consultan
+        indexes = [
+            models.Index(fields=['expiration_date'], condition=Q(quantity__gt=0), name='lot_open_expiry_idx'),
+            models.Index(fields=['ingredient', 'expiration_date', 'received_at'], condition=Q(quantity__gt=0), name='lot_fefo_idx'),
+        ]
+
+    def __str__(self):
+        code = self.lot_code or f"#{self.pk}"
+        return f"{self.ingredient.name} {code}: {self.quantity} (exp. {self.expiration_date or '-'})"
+
+
+class StockReservation(models.Model):
+    """
+    Cantidad de un ingrediente retenida por un pedido pendiente hasta
+    expires_at. El total por ingrediente se mantiene en
+    InventoryStock.reserved_quantity para leerlo sin JOIN.
+    """
+    order = models.ForeignKey('pedidos.Order', on_delete=models.CASCADE, related_name='reservations', help_text=_("Pending order holding the stock"))
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='reservations', help_text=_("Reserved ingredient"))
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, help_text=_("Reserved quantity in the stock unit"))
+    expires_at = models.DateTimeField(help_text=_("Released automatically after this moment"))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'inventory_reservations'
+        verbose_name = _('Stock Reservation')
+        verbose_name_plural = _('Stock Reservations')
+        unique_together = ['order', 'ingredient']
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Pedido #{self.order_id} - {self.ingredient.name}: {self.quantity}"
 
 
 class InventoryTransaction(models.Model):
@@ -133,7 +187,115 @@ class InventoryTransaction(models.Model):
         indexes = [
             models.Index(fields=['ingredient', 'created_at']),
             models.Index(fields=['transaction_type']),
+            models.Index(fields=['created_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient.name} - {self.get_transaction_type_display()}: {self.quantity}"
+
+
+class InventoryTransactionArchive(models.Model):
+    """
+    Detalle de movimientos compactados (ledger.py): misma forma e id que en
+    inventory_transactions, fuera de la tabla caliente.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text=_("Original transaction id"))
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='archived_transactions', help_text=_("Related ingredient"))
+    transaction_type = models.CharField(max_length=20, choices=InventoryTransaction.TRANSACTION_TYPES, help_text=_("Type of transaction (RF-02)"))
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, help_text=_("Quantity changed (positive for add, negative for deduct)"))
+    balance_after = models.DecimalField(max_digits=10, decimal_places=2, help_text=_("Stock balance after transaction"))
+    notes = models.TextField(blank=True, help_text=_("Transaction notes"))
+    user = models.ForeignKey('usuarios.User', on_delete=models.SET_NULL, null=True, related_name='archived_inventory_transactions', help_text=_("User who performed transaction (RNF-04)"))
+    related_order = models.ForeignKey('pedidos.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_inventory_transactions', help_text=_("Related order (if applicable)"))
+    created_at = models.DateTimeField(help_text=_("Original transaction timestamp"))
+    archived_at = models.DateTimeField(auto_now_add=True, help_text=_("When the row was compacted"))
+
+    class Meta:
+        db_table = 'inventory_transactions_archive'
+        verbose_name = _('Archived Inventory Transaction')
+        verbose_name_plural = _('Archived Inventory Transactions')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['ingredient', 'created_at']),
+            models.Index(fields=['created_at', 'id']),
         ]
 
     def __str__(self):
         return f"{self.ingredient.name} - {self.get_transaction_type_display()}: {self.quantity}"
+
+
+class InventoryDailySummary(models.Model):
+    """Movimientos compactados de un ingrediente por día y tipo (ledger.py)."""
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='daily_summaries', help_text=_("Related ingredient"))
+    day = models.DateField(help_text=_("Local date of the movements"))
+    transaction_type = models.CharField(max_length=20, choices=InventoryTransaction.TRANSACTION_TYPES, help_text=_("Type of transaction (RF-02)"))
+    movements = models.PositiveIntegerField(help_text=_("Number of compacted transactions"))
+    quantity = models.DecimalField(max_digits=12, decimal_places=2, help_text=_("Net quantity of the compacted transactions"))
+    opening_balance = models.DecimalField(max_digits=10, decimal_places=2, help_text=_("Stock balance before the first transaction"))
+    closing_balance = models.DecimalField(max_digits=10, decimal_places=2, help_text=_("Stock balance after the last transaction"))
+    first_at = models.DateTimeField(help_text=_("Timestamp of the first transaction"))
+    last_at = models.DateTimeField(help_text=_("Timestamp of the last transaction"))
+
+    class Meta:
+        db_table = 'inventory_transaction_daily'
+        verbose_name = _('Inventory Daily Summary')
+        verbose_name_plural = _('Inventory Daily Summaries')
+        ordering = ['-day', 'ingredient', 'transaction_type']
+        unique_together = ['ingredient', 'day', 'transaction_type']
+        indexes = [
+            models.Index(fields=['day', 'transaction_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient.name} {self.day} {self.transaction_type}: {self.quantity}"
+
+
+class StockSnapshot(models.Model):
+    """Saldo y costo unitario de un ingrediente en un instante (cierres periódicos)."""
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='snapshots', help_text=_("Related ingredient"))
+    taken_at = models.DateTimeField(help_text=_("Point in time the snapshot represents"))
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, help_text=_("Stock balance at taken_at"))
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, help_text=_("Cost per unit at taken_at (for valuation - RF-06)"))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'inventory_stock_snapshots'
+        verbose_name = _('Stock Snapshot')
+        verbose_name_plural = _('Stock Snapshots')
+        ordering = ['-taken_at']
+        # El índice único (ingredient, taken_at) resuelve "snapshot más cercano" con un seek
+        unique_together = ['ingredient', 'taken_at']
+        indexes = [
+            models.Index(fields=['taken_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient.name} @ {self.taken_at:%Y-%m-%d %H:%M}: {self.quantity}"
+
+    @property
+    def value(self):
+        return (self.quantity * self.unit_cost).quantize(Decimal('0.01'))
+
+
+class IngredientForecast(models.Model):
+    """Pronóstico nocturno de consumo y sugerencia de reposición (forecasting.py)."""
+    ingredient = models.OneToOneField(Ingredient, on_delete=models.CASCADE, related_name='forecast', help_text=_("Related ingredient"))
+    daily_demand = models.DecimalField(max_digits=12, decimal_places=4, help_text=_("Smoothed, deseasonalized daily usage"))
+    lead_time_demand = models.DecimalField(max_digits=12, decimal_places=2, help_text=_("Forecast usage during the supplier lead time"))
+    safety_stock = models.DecimalField(max_digits=12, decimal_places=2, help_text=_("Buffer for usage variability"))
+    reorder_point = models.DecimalField(max_digits=12, decimal_places=2, help_text=_("Reorder when stock falls to this level (RF-02)"))
+    order_up_to = models.DecimalField(max_digits=12, decimal_places=2, help_text=_("Target stock after receiving an order"))
+    suggested_quantity = models.DecimalField(max_digits=12, decimal_places=2, help_text=_("Quantity to order now (0 if above the reorder point)"))
+    history_days = models.PositiveIntegerField(help_text=_("Days of ledger history used"))
+    computed_at = models.DateTimeField(help_text=_("Forecast run timestamp"))
+
+    class Meta:
+        db_table = 'ingredient_forecasts'
+        verbose_name = _('Ingredient Forecast')
+        verbose_name_plural = _('Ingredient Forecasts')
+        indexes = [
+            models.Index(fields=['suggested_quantity']),
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient.name}: ROP {self.reorder_point}, order {self.suggested_quantity}"
@@ -1,7 +1,11 @@
 from decimal import Decimal
+from django.db.models import Q
 from django.utils import timezone
 from rest_framework import serializers
-from .models import Ingredient, InventoryStock, InventoryTransaction
+from .models import (
+    Ingredient, InventoryDailySummary, InventoryStock, InventoryTransaction, InventoryTransactionArchive, StockLot,
+)
+from .units import UnitConversionError, conversion_factor
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -10,11 +14,24 @@ class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = [
-            'id', 'name', 'category', 'unit', 'cost_per_unit', 'supplier',
+            'id', 'name', 'category', 'unit', 'density', 'cost_per_unit', 'supplier',
             'minimum_stock', 'description', 'is_active', 'created_at', 'updated_at',
-            'current_stock',
+            'current_stock', 'is_low',
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'current_stock']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'current_stock', 'is_low']
+
+    def validate(self, attrs):
+        # A new unit or density must still convert every recipe that uses the ingredient
+        if self.instance is not None and ('unit' in attrs or 'density' in attrs):
+            unit = attrs.get('unit', self.instance.unit)
+            density = attrs.get('density', self.instance.density)
+            recipe_units = self.instance.recipe_items.exclude(unit='').values_list('unit', flat=True).distinct()
+            try:
+                for recipe_unit in recipe_units:
+                    conversion_factor(recipe_unit, unit, density)
+            except UnitConversionError as exc:
+                raise serializers.ValidationError({'unit': str(exc)})
+        return attrs
 
     def create(self, validated_data):
         ingredient = super().create(validated_data)
@@ -26,14 +43,15 @@ class IngredientSerializer(serializers.ModelSerializer):
 class InventoryStockSerializer(serializers.ModelSerializer):
     ingredient_name = serializers.CharField(source='ingredient.name', read_only=True)
     unit = serializers.CharField(source='ingredient.unit', read_only=True)
+    available_quantity = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = InventoryStock
         fields = [
-            'id', 'ingredient', 'ingredient_name', 'quantity', 'last_restocked',
-            'expiration_date', 'updated_at', 'unit',
+            'id', 'ingredient', 'ingredient_name', 'quantity', 'reserved_quantity',
+            'available_quantity', 'last_restocked', 'expiration_date', 'updated_at', 'unit',
         ]
-        read_only_fields = ['id', 'updated_at']
+        read_only_fields = ['id', 'reserved_quantity', 'updated_at']
 
     def update(self, instance, validated_data):
         # Prevent direct quantity tampering through generic update; prefer adjust action
@@ -46,6 +64,10 @@ class InventoryAdjustmentSerializer(serializers.Serializer):
     transaction_type = serializers.ChoiceField(choices=[t[0] for t in InventoryTransaction.TRANSACTION_TYPES if t[0] != 'USAGE'])
     quantity = serializers.DecimalField(max_digits=10, decimal_places=2)
     notes = serializers.CharField(allow_blank=True, required=False)
+    # Entradas: datos del lote nuevo. Salidas: lote a consumir primero (FEFO para el resto)
+    lot = serializers.IntegerField(required=False, allow_null=True)
+    lot_code = serializers.CharField(required=False, allow_blank=True, max_length=100)
+    expiration_date = serializers.DateField(required=False, allow_null=True)
 
     def validate(self, attrs):
         ttype = attrs['transaction_type']
@@ -59,6 +81,25 @@ class InventoryAdjustmentSerializer(serializers.Serializer):
         return attrs
 
 
+class StockLotSerializer(serializers.ModelSerializer):
+    ingredient_name = serializers.CharField(source='ingredient.name', read_only=True)
+    unit = serializers.CharField(source='ingredient.unit', read_only=True)
+    days_to_expiry = serializers.SerializerMethodField()
+
+    class Meta:
+        model = StockLot
+        fields = [
+            'id', 'ingredient', 'ingredient_name', 'lot_code', 'quantity', 'initial_quantity',
+            'unit', 'received_at', 'expiration_date', 'days_to_expiry',
+        ]
+        read_only_fields = fields
+
+    def get_days_to_expiry(self, obj):
+        if obj.expiration_date is None:
+            return None
+        return (obj.expiration_date - timezone.localdate()).days
+
+
 class InventoryTransactionSerializer(serializers.ModelSerializer):
     ingredient_name = serializers.CharField(source='ingredient.name', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
@@ -70,3 +111,68 @@ class InventoryTransactionSerializer(serializers.ModelSerializer):
             'balance_after', 'notes', 'user', 'user_username', 'related_order', 'created_at'
         ]
         read_only_fields = ['id', 'balance_after', 'created_at']
+
+
+class InventoryTransactionArchiveSerializer(InventoryTransactionSerializer):
+    class Meta(InventoryTransactionSerializer.Meta):
+        model = InventoryTransactionArchive
+        fields = InventoryTransactionSerializer.Meta.fields + ['archived_at']
+        read_only_fields = fields
+
+
+class InventoryDailySummarySerializer(serializers.ModelSerializer):
+    ingredient_name = serializers.CharField(source='ingredient.name', read_only=True)
+
+    class Meta:
+        model = InventoryDailySummary
+        fields = [
+            'id', 'ingredient', 'ingredient_name', 'day', 'transaction_type', 'movements', 'quantity',
+            'opening_balance', 'closing_balance', 'first_at', 'last_at',
+        ]
+        read_only_fields = fields
+
+
+class ReceivingLineSerializer(serializers.Serializer):
+    ingredient = serializers.IntegerField(required=False)
+    ingredient_name = serializers.CharField(required=False)
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    lot = serializers.CharField(required=False, allow_blank=True, max_length=100)
+    expiration_date = serializers.DateField(required=False, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        if attrs.get('ingredient') is None and not attrs.get('ingredient_name'):
+            raise serializers.ValidationError('Provide ingredient or ingredient_name.')
+        return attrs
+
+
+class ReceivingSerializer(serializers.Serializer):
+    """A whole supplier delivery; every line is validated before anything is applied."""
+    lines = ReceivingLineSerializer(many=True, allow_empty=False, max_length=1000)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_lines(self, lines):
+        # Resolve all ingredients (by id or by name) with a single query
+        ids = {line['ingredient'] for line in lines if line.get('ingredient') is not None}
+        names = {line['ingredient_name'] for line in lines if line.get('ingredient') is None}
+        found = list(Ingredient.objects.filter(Q(pk__in=ids) | Q(name__in=names)))
+        by_id = {ingredient.pk: ingredient for ingredient in found}
+        by_name = {ingredient.name: ingredient for ingredient in found}
+
+        errors, has_errors = [], False
+        for line in lines:
+            if line.get('ingredient') is not None:
+                ingredient = by_id.get(line['ingredient'])
+                missing = f"Unknown ingredient id {line['ingredient']}."
+            else:
+                ingredient = by_name.get(line['ingredient_name'])
+                missing = f"Unknown ingredient '{line['ingredient_name']}'."
+            if ingredient is None:
+                errors.append({'ingredient': [missing]})
+                has_errors = True
+            else:
+                line['ingredient'] = ingredient
+                errors.append({})
+        if has_errors:
+            raise serializers.ValidationError(errors)
+        return lines
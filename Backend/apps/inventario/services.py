@@ -0,0 +1,509 @@
+"""
+Servicios de Inventario
+=======================
+RF-02: Descuento automático de inventario
+
+Motor de descuento por pedido. Al confirmar un pedido se expanden sus items
+a través de las recetas (RecipeItem) y se agregan los requerimientos por
+ingrediente en una sola consulta; luego, dentro de una transacción:
+
+1. Se bloquean las filas de InventoryStock afectadas con SELECT ... FOR UPDATE
+   en orden de ingrediente, para que confirmaciones concurrentes tomen los
+   bloqueos siempre en el mismo orden (sin deadlocks).
+2. Se valida que alcance el stock de todos los ingredientes; si falta alguno
+   no se descuenta nada (InsufficientStock).
+3. Se aplican los saldos con un bulk_update y se registran los movimientos
+   USAGE con un bulk_create enlazado al pedido (related_order).
+4. Se recalcula Dish.is_in_stock de los platos que usan esos ingredientes.
+
+El descuento es idempotente: si el pedido ya tiene movimientos USAGE no se
+vuelve a descontar.
+
+Los ajustes puntuales (adjust_stock) no leen y reescriben la fila: aplican
+`UPDATE ... SET quantity = quantity + delta WHERE quantity + delta >= 0
+RETURNING quantity`, de modo que escritores concurrentes no se pisan y el
+saldo nunca queda negativo; el movimiento del ledger se inserta en la misma
+transacción.
+
+La recepción de una entrega completa (receive_delivery) aplica todas las
+líneas en una transacción con escrituras en lote: un bulk_create de las
+filas de stock faltantes, un SELECT ... FOR UPDATE, un bulk_update y un
+bulk_create del ledger, sin importar el número de líneas.
+
+Cada entrada crea un StockLot (cantidad, recepción, vencimiento) y cada
+salida consume los lotes abiertos en orden FEFO (primero el que vence
+antes) con un SELECT ... FOR UPDATE y un bulk_update. InventoryStock.expiration_date
+se mantiene como el vencimiento más próximo entre los lotes con saldo.
+
+Reservas: al crear un pedido se retienen sus ingredientes (StockReservation
+con vencimiento STOCK_RESERVATION_TTL_MINUTES) y el total retenido por
+ingrediente se suma en InventoryStock.reserved_quantity, que la
+disponibilidad lee en la misma fila (quantity - reserved_quantity). Al
+confirmar, la reserva se convierte en descuento; al cancelar se libera. Las
+reservas vencidas las libera el comando release_expired_reservations
+(programado); además, una reserva nueva libera en su transacción las
+vencidas de sus propios ingredientes, para que no le resten stock libre.
+
+Los bloqueos se toman siempre en el orden reservas → stock → lotes.
+"""
+
+import sqlite3
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_UP
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+from apps.platos.availability import refresh_dish_availability
+from .models import Ingredient, InventoryStock, InventoryTransaction, StockLot, StockReservation
+
+
+TWO_PLACES = Decimal('0.01')
+
+
+class InsufficientStock(Exception):
+    """No hay stock suficiente para uno o más ingredientes del pedido."""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        names = ', '.join(str(s['ingredient_name']) for s in shortages)
+        super().__init__(f"Stock insuficiente para: {names}.")
+
+
+def order_requirements(order):
+    """
+    Cantidad requerida por ingrediente para el pedido, en su unidad de stock:
+    {ingredient_id: Σ receta.base_quantity × item.quantity}, en una sola consulta.
+    """
+    from apps.platos.models import RecipeItem
+
+    rows = (
+        RecipeItem.objects
+        .filter(dish__order_items__order=order)
+        .values('ingredient_id')
+        .annotate(required=Sum(
+            F('base_quantity') * F('dish__order_items__quantity'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ))
+        .order_by('ingredient_id')
+    )
+    # Redondeo hacia arriba a la precisión del stock: 5 g en KG descuentan 0.01, no 0
+    return {row['ingredient_id']: Decimal(row['required']).quantize(TWO_PLACES, ROUND_UP) for row in rows}
+
+
+def refresh_low_stock(ingredient_ids=None):
+    """
+    Recalcula Ingredient.is_low (stock físico < minimum_stock; sin fila de
+    stock cuenta 0) de los ingredientes indicados, o de todos, con un único
+    UPDATE. Se llama donde cambia el stock o el mínimo, igual que
+    refresh_dish_availability; low_stock filtra por el flag con un índice parcial.
+    """
+    queryset = Ingredient.objects.all() if ingredient_ids is None else Ingredient.objects.filter(pk__in=ingredient_ids)
+    quantity = Coalesce(
+        Subquery(InventoryStock.objects.filter(ingredient=OuterRef('pk')).values('quantity')[:1]),
+        Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    return queryset.update(is_low=ExpressionWrapper(Q(minimum_stock__gt=quantity), output_field=BooleanField()))
+
+
+def _shortages(requirements, stocks, held=None):
+    """
+    Faltantes contra el stock libre (físico - reservado), sumando lo que el
+    propio pedido ya tiene reservado (`held`).
+    """
+    held = held or {}
+    shortages = []
+    for ingredient_id, required in requirements.items():
+        stock = stocks.get(ingredient_id)
+        available = stock.available_quantity + held.get(ingredient_id, 0) if stock else Decimal('0.00')
+        if available < required:
+            shortages.append({
+                'ingredient': ingredient_id,
+                'ingredient_name': stock.ingredient.name if stock else ingredient_id,
+                'required': required,
+                'available': available,
+            })
+    return shortages
+
+
+def _lock_stocks(ingredient_ids):
+    return {
+        stock.ingredient_id: stock
+        for stock in InventoryStock.objects.select_for_update()
+        .filter(ingredient_id__in=ingredient_ids)
+        .select_related('ingredient')
+        .order_by('ingredient_id')
+    }
+
+
+def consume_lots(amounts, lot=None):
+    """
+    Descuenta `amounts` ({ingredient_id: cantidad}) de los lotes abiertos en
+    orden FEFO; con `lot` ese lote se consume primero. Lo que exceda el saldo
+    de los lotes es stock sin lote (previo a los lotes) y no se desglosa.
+
+    Devuelve {ingredient_id: vencimiento más próximo con saldo} para los
+    ingredientes que tenían lotes abiertos. Debe llamarse dentro de una
+    transacción, después de bloquear las filas de stock.
+    """
+    lots = list(
+        StockLot.objects.select_for_update()
+        .filter(ingredient_id__in=amounts, quantity__gt=0)
+        .order_by('ingredient_id', F('expiration_date').asc(nulls_last=True), 'received_at', 'id')
+    )
+    if lot is not None:
+        lots.sort(key=lambda item: (item.ingredient_id, item.pk != lot.pk))
+
+    remaining = dict(amounts)
+    consumed = []
+    earliest = {}
+    for item in lots:
+        need = remaining[item.ingredient_id]
+        if need > 0:
+            taken = min(need, item.quantity)
+            item.quantity -= taken
+            remaining[item.ingredient_id] = need - taken
+            consumed.append(item)
+        current = earliest.setdefault(item.ingredient_id, None)
+        if item.quantity > 0 and item.expiration_date and (current is None or item.expiration_date < current):
+            earliest[item.ingredient_id] = item.expiration_date
+    if consumed:
+        StockLot.objects.bulk_update(consumed, ['quantity'])
+    return earliest
+
+
+def deduct_for_order(order, user=None):
+    """
+    Descuenta del inventario los ingredientes del pedido.
+
+    Devuelve la lista de InventoryTransaction creadas (vacía si el pedido no
+    usa ingredientes o ya fue descontado). Lanza InsufficientStock sin
+    modificar el inventario si algún ingrediente no alcanza.
+    """
+    requirements = order_requirements(order)
+    if not requirements:
+        return []
+
+    with transaction.atomic():
+        if InventoryTransaction.objects.filter(related_order=order, transaction_type='USAGE').exists():
+            return []
+
+        # La reserva del pedido (si sigue vigente) se convierte en descuento
+        held = dict(
+            StockReservation.objects.select_for_update()
+            .filter(order=order)
+            .values_list('ingredient_id', 'quantity')
+        )
+        stocks = _lock_stocks(set(requirements) | set(held))
+        shortages = _shortages(requirements, stocks, held)
+        if shortages:
+            raise InsufficientStock(shortages)
+
+        now = timezone.now()
+        movements = []
+        for ingredient_id, required in requirements.items():
+            stock = stocks[ingredient_id]
+            stock.quantity -= required
+            # bulk_update no aplica auto_now
+            stock.updated_at = now
+            movements.append(InventoryTransaction(
+                ingredient_id=ingredient_id,
+                transaction_type='USAGE',
+                quantity=-required,
+                balance_after=stock.quantity,
+                notes=f"Pedido #{order.pk}",
+                user=user,
+                related_order=order,
+            ))
+
+        for ingredient_id, quantity in held.items():
+            stock = stocks.get(ingredient_id)
+            if stock:
+                stock.reserved_quantity = max(stock.reserved_quantity - quantity, Decimal('0.00'))
+        for ingredient_id, expiration in consume_lots(requirements).items():
+            stocks[ingredient_id].expiration_date = expiration
+
+        InventoryStock.objects.bulk_update(
+            stocks.values(), ['quantity', 'reserved_quantity', 'expiration_date', 'updated_at']
+        )
+        if held:
+            StockReservation.objects.filter(order=order).delete()
+        movements = InventoryTransaction.objects.bulk_create(movements)
+        # bulk_update no dispara señales: recalcular solo los platos afectados
+        refresh_dish_availability(ingredient_ids=list(stocks))
+        refresh_low_stock(list(stocks))
+        return movements
+
+
+def supports_update_returning():
+    """PostgreSQL y SQLite >= 3.35 aceptan UPDATE ... RETURNING."""
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and sqlite3.sqlite_version_info >= (3, 35)
+
+
+def _guarded_update(stock_id, delta, changes):
+    """
+    Suma `delta` a la cantidad si el saldo resultante no es negativo; una
+    salida además no puede tomar lo reservado (el stock libre, cantidad -
+    reservado, no queda negativo). Devuelve la nueva cantidad, o None si la
+    condición no se cumplió.
+
+    La suma se redondea a 2 decimales en el SET y en el WHERE: SQLite opera
+    los NUMERIC en coma flotante y 0.30 - 0.10 - 0.10 no llega a ser 0.10.
+    """
+    floor = F('reserved_quantity') if delta < 0 else 0
+    balance = Round(F('quantity') + delta, 2)
+    if not supports_update_returning():
+        # Sin RETURNING: el UPDATE bloquea la fila y se relee dentro de la transacción
+        queryset = InventoryStock.objects.alias(balance=balance).filter(pk=stock_id, balance__gte=floor)
+        if not queryset.update(quantity=balance, **changes):
+            return None
+        return InventoryStock.objects.filter(pk=stock_id).values_list('quantity', flat=True).get()
+
+    opts = InventoryStock._meta
+    quote = connection.ops.quote_name
+    column = quote(opts.get_field('quantity').column)
+    floor = quote(opts.get_field('reserved_quantity').column) if delta < 0 else '0'
+    assignments = [f'{column} = ROUND({column} + %s, 2)']
+    params = [delta]
+    for name, value in changes.items():
+        field = opts.get_field(name)
+        assignments.append(f'{quote(field.column)} = %s')
+        params.append(field.get_db_prep_save(value, connection))
+    sql = (
+        f'UPDATE {quote(opts.db_table)} SET {", ".join(assignments)} '
+        f'WHERE {quote(opts.pk.column)} = %s AND ROUND({column} + %s, 2) >= {floor} '
+        f'RETURNING {column}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [stock_id, delta])
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return Decimal(str(row[0])).quantize(TWO_PLACES)
+
+
+def adjust_stock(stock, delta, transaction_type, user=None, notes='', related_order=None,
+                 lot=None, lot_code='', expiration_date=None):
+    """
+    Aplica un movimiento de stock de forma atómica y registra el ledger.
+
+    Las entradas abren un lote (`lot_code`, `expiration_date`); las salidas
+    consumen lotes FEFO, empezando por `lot` si se indica. Actualiza la
+    instancia en memoria y devuelve la InventoryTransaction creada. Lanza
+    InsufficientStock si el saldo quedaría negativo.
+    """
+    now = timezone.now()
+    changes = {'updated_at': now}
+    if transaction_type == 'RESTOCK':
+        changes['last_restocked'] = now
+
+    with transaction.atomic():
+        quantity = _guarded_update(stock.pk, delta, changes)
+        if quantity is None:
+            available = InventoryStock.objects.filter(pk=stock.pk).values_list(
+                F('quantity') - F('reserved_quantity'), flat=True
+            ).first()
+            raise InsufficientStock([{
+                'ingredient': stock.ingredient_id,
+                'ingredient_name': stock.ingredient.name,
+                'required': -delta,
+                'available': available,
+            }])
+        if delta > 0:
+            StockLot.objects.create(
+                ingredient_id=stock.ingredient_id, lot_code=lot_code, quantity=delta,
+                initial_quantity=delta, received_at=now, expiration_date=expiration_date,
+            )
+            # Solo adelanta el vencimiento más próximo, nunca lo atrasa
+            if expiration_date and InventoryStock.objects.filter(
+                Q(expiration_date__isnull=True) | Q(expiration_date__gt=expiration_date), pk=stock.pk
+            ).update(expiration_date=expiration_date):
+                changes['expiration_date'] = expiration_date
+        else:
+            expiries = consume_lots({stock.ingredient_id: -delta}, lot=lot)
+            if expiries.get(stock.ingredient_id, stock.expiration_date) != stock.expiration_date:
+                changes['expiration_date'] = expiries[stock.ingredient_id]
+                InventoryStock.objects.filter(pk=stock.pk).update(expiration_date=changes['expiration_date'])
+        movement = InventoryTransaction.objects.create(
+            ingredient_id=stock.ingredient_id,
+            transaction_type=transaction_type,
+            quantity=delta,
+            balance_after=quantity,
+            notes=notes,
+            user=user,
+            related_order=related_order,
+        )
+        # El UPDATE directo no dispara post_save: recalcular disponibilidad y alerta
+        refresh_dish_availability(ingredient_ids=[stock.ingredient_id])
+        refresh_low_stock([stock.ingredient_id])
+
+    stock.quantity = quantity
+    for name, value in changes.items():
+        setattr(stock, name, value)
+    return movement
+
+
+def receive_delivery(lines, user=None, notes=''):
+    """
+    Registra una entrega de proveedor. `lines` son dicts ya validados con
+    ingredient (instancia), quantity y opcionalmente lot, expiration_date y
+    notes. Devuelve un resultado por línea, en el mismo orden.
+    """
+    ingredient_ids = sorted({line['ingredient'].pk for line in lines})
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Ingredientes sin fila de stock todavía
+        InventoryStock.objects.bulk_create(
+            [InventoryStock(ingredient_id=ingredient_id) for ingredient_id in ingredient_ids],
+            ignore_conflicts=True,
+        )
+        stocks = {
+            stock.ingredient_id: stock
+            for stock in InventoryStock.objects.select_for_update()
+            .filter(ingredient_id__in=ingredient_ids)
+            .order_by('ingredient_id')
+        }
+
+        movements = []
+        lots = []
+        for line in lines:
+            stock = stocks[line['ingredient'].pk]
+            stock.quantity += line['quantity']
+            expiration = line.get('expiration_date')
+            if expiration and (stock.expiration_date is None or expiration < stock.expiration_date):
+                stock.expiration_date = expiration
+            lots.append(StockLot(
+                ingredient_id=stock.ingredient_id, lot_code=line.get('lot', ''), quantity=line['quantity'],
+                initial_quantity=line['quantity'], received_at=now, expiration_date=expiration,
+            ))
+            line_notes = [text for text in (notes, line.get('notes', '')) if text]
+            if line.get('lot'):
+                line_notes.append(f"Lote {line['lot']}")
+            movements.append(InventoryTransaction(
+                ingredient_id=stock.ingredient_id,
+                transaction_type='RESTOCK',
+                quantity=line['quantity'],
+                balance_after=stock.quantity,
+                notes=' | '.join(line_notes),
+                user=user,
+            ))
+        for stock in stocks.values():
+            stock.last_restocked = now
+            stock.updated_at = now
+
+        InventoryStock.objects.bulk_update(
+            stocks.values(), ['quantity', 'expiration_date', 'last_restocked', 'updated_at']
+        )
+        StockLot.objects.bulk_create(lots)
+        movements = InventoryTransaction.objects.bulk_create(movements)
+        refresh_dish_availability(ingredient_ids=ingredient_ids)
+        refresh_low_stock(ingredient_ids)
+
+    return [
+        {
+            'line': number,
+            'ingredient': line['ingredient'].pk,
+            'ingredient_name': line['ingredient'].name,
+            'quantity': line['quantity'],
+            'balance_after': movement.balance_after,
+            'transaction': movement.pk,
+        }
+        for number, (line, movement) in enumerate(zip(lines, movements), start=1)
+    ]
+
+
+def reservation_ttl():
+    return timedelta(minutes=getattr(settings, 'STOCK_RESERVATION_TTL_MINUTES', 30))
+
+
+def reserve_for_order(order):
+    """
+    Retiene los ingredientes de un pedido recién creado hasta que se
+    confirme, se cancele o venza la reserva. Antes libera las reservas
+    vencidas de esos mismos ingredientes (bloqueadas en orden, antes que el
+    stock) para que no le resten stock libre. Lanza InsufficientStock si el
+    stock libre no alcanza. Devuelve las StockReservation creadas.
+    """
+    requirements = order_requirements(order)
+    if not requirements:
+        return []
+
+    with transaction.atomic():
+        expired = _lock_reservations(
+            StockReservation.objects.filter(ingredient_id__in=requirements, expires_at__lte=timezone.now())
+        )
+        stocks = _lock_stocks(requirements)
+        _drop_reservations(expired, stocks)
+        shortages = _shortages(requirements, stocks)
+        if shortages:
+            raise InsufficientStock(shortages)
+
+        expires_at = timezone.now() + reservation_ttl()
+        reservations = []
+        for ingredient_id, required in requirements.items():
+            stocks[ingredient_id].reserved_quantity += required
+            reservations.append(StockReservation(
+                order=order, ingredient_id=ingredient_id, quantity=required, expires_at=expires_at,
+            ))
+        InventoryStock.objects.bulk_update(stocks.values(), ['reserved_quantity'])
+        reservations = StockReservation.objects.bulk_create(reservations)
+        refresh_dish_availability(ingredient_ids=list(requirements))
+    return reservations
+
+
+def _lock_reservations(reservations):
+    """Bloquea las reservas del queryset en orden; [(pk, ingredient_id, quantity)]."""
+    return list(
+        reservations.select_for_update()
+        .order_by('ingredient_id', 'pk')
+        .values_list('pk', 'ingredient_id', 'quantity')
+    )
+
+
+def _drop_reservations(held, stocks):
+    """Resta las reservas bloqueadas de reserved_quantity (en memoria) y las borra."""
+    if not held:
+        return
+    totals = defaultdict(Decimal)
+    for _, ingredient_id, quantity in held:
+        totals[ingredient_id] += quantity
+    for ingredient_id, total in totals.items():
+        stock = stocks.get(ingredient_id)
+        if stock:
+            stock.reserved_quantity = max(stock.reserved_quantity - total, Decimal('0.00'))
+    StockReservation.objects.filter(pk__in=[pk for pk, _, _ in held]).delete()
+
+
+def _release(reservations):
+    """
+    Libera las reservas del queryset: resta su total por ingrediente de
+    reserved_quantity con un bulk_update y las borra. Devuelve cuántas liberó.
+    """
+    with transaction.atomic():
+        held = _lock_reservations(reservations)
+        if not held:
+            return 0
+        ingredient_ids = sorted({ingredient_id for _, ingredient_id, _ in held})
+        stocks = _lock_stocks(ingredient_ids)
+        _drop_reservations(held, stocks)
+        InventoryStock.objects.bulk_update(stocks.values(), ['reserved_quantity'])
+        refresh_dish_availability(ingredient_ids=ingredient_ids)
+    return len(held)
+
+
+def release_for_order(order):
+    """Libera las reservas de un pedido cancelado o eliminado."""
+    return _release(StockReservation.objects.filter(order=order))
+
+
+def release_expired_reservations(now=None):
+    """Libera las reservas vencidas (comando release_expired_reservations)."""
+    return _release(StockReservation.objects.filter(expires_at__lte=now or timezone.now()))
@@ -0,0 +1,55 @@
+"""
+Señales de Inventario
+=====================
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from apps.pedidos.models import Order, OrderStatus
+from apps.pedidos.signals import order_placed, order_status_changed
+from .models import Ingredient, InventoryStock
+from .services import deduct_for_order, refresh_low_stock, release_for_order, reserve_for_order
+
+
+@receiver(order_placed, sender=Order)
+def reserve_inventory_on_order(sender, instance, created, **kwargs):
+    """
+    RF-02: Reserva los ingredientes del pedido recién creado. Corre dentro de
+    la transacción de creación: si falta stock libre, InsufficientStock
+    revierte también el pedido.
+    """
+    if created:
+        reserve_for_order(instance)
+
+
+@receiver(order_status_changed, sender=Order)
+def deduct_inventory_on_confirm(sender, instance, previous, **kwargs):
+    """
+    RF-02: Descuenta el inventario al confirmar el pedido (convirtiendo su
+    reserva) y libera la reserva si se cancela antes de confirmar. Corre
+    dentro de la transacción de la transición: si falta stock,
+    InsufficientStock revierte también el cambio de estado.
+    """
+    if instance.status == OrderStatus.CONFIRMED:
+        deduct_for_order(instance)
+    elif instance.status == OrderStatus.CANCELLED:
+        release_for_order(instance)
+
+
+@receiver(pre_delete, sender=Order)
+def release_inventory_on_delete(sender, instance, **kwargs):
+    """Devuelve al stock libre lo reservado por un pedido que se elimina."""
+    release_for_order(instance)
+
+
+@receiver([post_save, post_delete], sender=InventoryStock)
+def refresh_low_stock_on_stock_change(sender, instance, **kwargs):
+    """RF-02: Alerta de stock bajo (Ingredient.is_low) del ingrediente de la fila."""
+    refresh_low_stock([instance.ingredient_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_low_stock_on_minimum_change(sender, instance, created, update_fields=None, **kwargs):
+    """RF-02: Un ingrediente nuevo o un mínimo distinto recalculan la alerta."""
+    if created or update_fields is None or 'minimum_stock' in update_fields:
+        refresh_low_stock([instance.pk])
@@ -0,0 +1,142 @@
+"""
+Snapshots de Stock y Valorización a una Fecha
+=============================================
+RF-02, RF-06: Inventario histórico y cierres de mes
+
+`take_stock_snapshots` guarda periódicamente (comando take_stock_snapshots,
+p. ej. diario y al cierre de mes) una fila por ingrediente con su saldo y su
+costo unitario. El catálogo no guarda historial de precios, por lo que el
+snapshot es la fuente del costo histórico, y conserva el saldo aunque el
+ledger se compacte.
+
+`stock_at(moment)` responde el saldo de todos los ingredientes en una sola
+consulta. Por ingrediente se resuelve con búsquedas sobre los índices
+(ingredient, taken_at) e (ingredient, created_at), sin recorrer el ledger:
+
+1. Snapshot más cercano con taken_at <= moment.
+2. Último movimiento con created_at <= moment: si es posterior al snapshot,
+   su balance_after es el saldo; si no, vale el snapshot.
+3. Sin snapshot ni movimientos previos: saldo de apertura del primer
+   movimiento posterior (balance_after - quantity) o el stock actual.
+
+Los movimientos compactados (ledger.py) se buscan igual en
+inventory_transactions_archive: como el archivo solo tiene días anteriores a
+los del ledger caliente, se toma el último movimiento del ledger y, si no
+hay, el del archivo (y al revés para el primer movimiento posterior).
+
+El costo de un punto en el tiempo es el del snapshot más cercano o, si no
+existe, el cost_per_unit actual.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Ingredient, InventoryTransaction, InventoryTransactionArchive, StockSnapshot
+
+
+TWO_PLACES = Decimal('0.01')
+
+
+def _decimal_field():
+    return DecimalField(max_digits=10, decimal_places=2)
+
+
+def stock_at(moment, queryset=None):
+    """
+    Ingredientes existentes en `moment` anotados con `quantity_at`,
+    `unit_cost_at` y `snapshot_at` (None si no había snapshot).
+    """
+    queryset = Ingredient.objects.all() if queryset is None else queryset
+    snapshots = StockSnapshot.objects.filter(
+        ingredient=OuterRef('pk'), taken_at__lte=moment
+    ).order_by('-taken_at')
+    ledgers = [
+        model.objects.filter(ingredient=OuterRef('pk'), created_at__lte=moment).order_by('-created_at', '-id')
+        for model in (InventoryTransaction, InventoryTransactionArchive)
+    ]
+    following = [
+        model.objects.filter(ingredient=OuterRef('pk'), created_at__gt=moment).order_by('created_at', 'id')
+        .annotate(opening=F('balance_after') - F('quantity')).values('opening')[:1]
+        for model in (InventoryTransactionArchive, InventoryTransaction)
+    ]
+
+    return queryset.filter(created_at__lte=moment).annotate(
+        snapshot_at=Subquery(snapshots.values('taken_at')[:1]),
+        snapshot_quantity=Subquery(snapshots.values('quantity')[:1]),
+        snapshot_cost=Subquery(snapshots.values('unit_cost')[:1]),
+        ledger_at=Coalesce(*(Subquery(ledger.values('created_at')[:1]) for ledger in ledgers)),
+        ledger_balance=Coalesce(*(Subquery(ledger.values('balance_after')[:1]) for ledger in ledgers)),
+        opening_balance=Coalesce(*(Subquery(first, output_field=_decimal_field()) for first in following)),
+    ).annotate(
+        quantity_at=Case(
+            When(
+                Q(ledger_at__isnull=False) & (Q(snapshot_at__isnull=True) | Q(ledger_at__gt=F('snapshot_at'))),
+                then=F('ledger_balance'),
+            ),
+            When(snapshot_at__isnull=False, then=F('snapshot_quantity')),
+            When(opening_balance__isnull=False, then=F('opening_balance')),
+            default=Coalesce('stock__quantity', Value(Decimal('0.00'))),
+            output_field=_decimal_field(),
+        ),
+        unit_cost_at=Coalesce('snapshot_cost', 'cost_per_unit', output_field=_decimal_field()),
+    )
+
+
+def valuation_at(moment, queryset=None):
+    """
+    Valorización del inventario en `moment`:
+    {'at', 'total_value', 'items': [{ingredient, ..., quantity, unit_cost, value}]}.
+    """
+    rows = stock_at(moment, queryset).order_by('name').values(
+        'id', 'name', 'unit', 'category', 'quantity_at', 'unit_cost_at', 'snapshot_at'
+    )
+    items = []
+    total = Decimal('0.00')
+    for row in rows:
+        quantity = Decimal(row['quantity_at']).quantize(TWO_PLACES)
+        unit_cost = Decimal(row['unit_cost_at']).quantize(TWO_PLACES)
+        value = (quantity * unit_cost).quantize(TWO_PLACES)
+        total += value
+        items.append({
+            'ingredient': row['id'],
+            'ingredient_name': row['name'],
+            'unit': row['unit'],
+            'category': row['category'],
+            'quantity': quantity,
+            'unit_cost': unit_cost,
+            'value': value,
+            'snapshot_at': row['snapshot_at'],
+        })
+    return {'at': moment, 'total_value': total, 'items': items}
+
+
+def take_stock_snapshots(at=None, batch_size=1000):
+    """
+    Registra un snapshot por ingrediente. Sin `at` se usa el stock actual;
+    con `at` (cierre atrasado) se reconstruye con stock_at. Repetir el mismo
+    instante no duplica filas. Devuelve el número de ingredientes procesados.
+    """
+    if at is None:
+        with transaction.atomic():
+            at = timezone.now()
+            rows = Ingredient.objects.values_list('id', 'stock__quantity', 'cost_per_unit')
+            snapshots = [
+                StockSnapshot(ingredient_id=ingredient_id, taken_at=at,
+                              quantity=quantity or Decimal('0.00'), unit_cost=cost)
+                for ingredient_id, quantity, cost in rows
+            ]
+    else:
+        snapshots = [
+            StockSnapshot(
+                ingredient_id=ingredient_id, taken_at=at,
+                quantity=Decimal(quantity).quantize(TWO_PLACES),
+                unit_cost=Decimal(cost).quantize(TWO_PLACES),
+            )
+            for ingredient_id, quantity, cost in stock_at(at).values_list('id', 'quantity_at', 'unit_cost_at')
+        ]
+    StockSnapshot.objects.bulk_create(snapshots, batch_size=batch_size, ignore_conflicts=True)
+    return len(snapshots)
@@ -0,0 +1,162 @@
+import json
+import pytest
+from decimal import Decimal
+from io import StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.inventario.catalog_io import import_catalog
+from apps.inventario.models import Ingredient, InventoryStock, InventoryTransaction, StockLot
+from apps.platos.models import Dish, RecipeItem
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(username='io_staff', password='p', role='STAFF')
+
+
+CSV = (
+    "name,category,unit,cost_per_unit,minimum_stock,is_active,quantity\n"
+    "Tomate,VEGETABLES,KG,1.50,2,yes,10\n"
+    "Queso,DAIRY,KG,8.00,1,true,0\n"
+    ",DAIRY,KG,1,1,true,0\n"
+    "Sal,SPICES,LITRO,1,1,true,0\n"
+    "Aceite,OILS,L,-1,1,true,0\n"
+)
+
+
+@pytest.mark.django_db
+def test_import_upserts_by_name_in_chunks():
+    dish = Dish.objects.create(name='Ensalada', description='d', price=Decimal('5.00'), is_in_stock=False)
+    existing = Ingredient.objects.create(name='Tomate', unit='KG', cost_per_unit=Decimal('1.00'),
+                                         supplier='Huerta', description='Rojo')
+    RecipeItem.objects.create(dish=dish, ingredient=existing, quantity=Decimal('0.50'))
+    InventoryStock.objects.filter(ingredient=existing).delete()
+
+    stats = import_catalog(StringIO(CSV), chunk_size=2)
+    assert (stats['created'], stats['updated']) == (1, 1)
+    assert [error['line'] for error in stats['errors']] == [4, 5, 6]
+    assert 'unit' in stats['errors'][1]['error']
+
+    existing.refresh_from_db()
+    # Columns absent from the file keep their stored values
+    assert existing.cost_per_unit == Decimal('1.50') and existing.supplier == 'Huerta'
+    assert existing.stock.quantity == Decimal('10.00')
+    assert InventoryStock.objects.get(ingredient__name='Queso').quantity == Decimal('0.00')
+    dish.refresh_from_db()
+    assert dish.is_in_stock
+
+    # Seeded quantities enter through the ledger and an opening lot
+    movement = InventoryTransaction.objects.get()
+    assert (movement.ingredient, movement.transaction_type) == (existing, 'ADJUSTMENT')
+    assert movement.quantity == movement.balance_after == Decimal('10.00')
+    lot = StockLot.objects.get()
+    assert (lot.ingredient, lot.quantity, lot.initial_quantity) == (existing, Decimal('10.00'), Decimal('10.00'))
+
+    # Re-importing never touches existing stock rows nor writes ledger entries
+    rows = '\n'.join(json.dumps(row) for row in [
+        {'name': 'Tomate', 'quantity': '99', 'is_active': False},
+        {'name': 'Tomate', 'minimum_stock': 3},
+        'x',
+    ]) + '\n{bad\n'
+    stats = import_catalog(StringIO(rows), file_format='ndjson')
+    assert (stats['created'], stats['updated']) == (0, 1)
+    assert [error['line'] for error in stats['errors']] == [3, 4]
+    existing.refresh_from_db()
+    assert existing.minimum_stock == Decimal('3.00') and existing.is_active
+    assert existing.stock.quantity == Decimal('10.00')
+    assert InventoryTransaction.objects.count() == StockLot.objects.count() == 1
+    with pytest.raises(ValueError):
+        import_catalog([], file_format='xlsx')
+
+
+@pytest.mark.django_db
+def test_import_rejects_values_beyond_the_column_digits():
+    stats = import_catalog(StringIO(
+        "name,density,cost_per_unit,quantity\n"
+        "Miel,10000,1,1\n"
+        "Azafrán,1,100000000,1\n"
+        "Arroz,9999.99994,1,99999999.99\n"
+        "Agua,1,1,100000000\n"
+    ))
+    assert stats['created'] == 1
+    assert [(error['line'], error['error'].split(':')[0]) for error in stats['errors']] == [
+        (2, 'density'), (3, 'cost_per_unit'), (5, 'quantity'),
+    ]
+    assert '10000' in stats['errors'][0]['error']
+    rice = Ingredient.objects.get(name='Arroz')
+    assert rice.density == Decimal('9999.9999') and rice.stock.quantity == Decimal('99999999.99')
+
+
+@pytest.mark.django_db
+def test_import_keeps_flags_for_empty_bool_cells():
+    Ingredient.objects.create(name='Harina', is_active=True)
+    Ingredient.objects.create(name='Levadura', is_active=False)
+    stats = import_catalog(StringIO(
+        "name,minimum_stock,is_active\n"
+        "Harina,2,\n"
+        "Levadura,1, \n"
+        "Nuevo,1,\n"
+        "Sal,1,quizá\n"
+    ))
+    assert (stats['created'], stats['updated']) == (1, 2)
+    assert [error['line'] for error in stats['errors']] == [5]
+    flags = dict(Ingredient.objects.values_list('name', 'is_active'))
+    assert flags == {'Harina': True, 'Levadura': False, 'Nuevo': True}
+
+
+@pytest.mark.django_db
+def test_import_and_export_endpoints(staff_user):
+    api = APIClient()
+    api.force_authenticate(user=staff_user)
+    url = reverse('inventario:ingredient-import-catalog')
+
+    upload = SimpleUploadedFile('catalog.csv', ('﻿' + CSV).encode(), content_type='text/csv')
+    resp = api.post(url, {'file': upload}, format='multipart')
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.data['created'] == 2 and len(resp.data['errors']) == 3
+    assert InventoryTransaction.objects.get().user == staff_user
+
+    assert api.post(url, {}, format='multipart').status_code == status.HTTP_400_BAD_REQUEST
+    upload = SimpleUploadedFile('catalog.txt', b'name\nx\n')
+    resp = api.post(url, {'file': upload, 'file_format': 'xml'}, format='multipart')
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+    upload = SimpleUploadedFile('catalog.csv', b'name\n\xff\n')
+    assert api.post(url, {'file': upload}, format='multipart').status_code == status.HTTP_400_BAD_REQUEST
+
+    export_url = reverse('inventario:ingredient-export')
+    resp = api.get(export_url)
+    assert resp.status_code == status.HTTP_200_OK and resp['Content-Type'] == 'text/csv'
+    lines = b''.join(resp.streaming_content).decode().splitlines()
+    assert lines[0].startswith('name,category') and lines[1].startswith('Queso,DAIRY')
+    assert lines[2].endswith(',10.00')
+
+    resp = api.get(export_url, {'file_format': 'ndjson', 'category': 'DAIRY'})
+    rows = [json.loads(line) for line in b''.join(resp.streaming_content).decode().splitlines()]
+    assert rows == [{**rows[0], 'name': 'Queso', 'quantity': '0.00'}]
+    assert api.get(export_url, {'file_format': 'xml'}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_import_and_export_commands(tmp_path):
+    source = tmp_path / 'catalog.ndjson'
+    source.write_text('{"name": "Harina", "unit": "KG", "quantity": 5}\n{"unit": "KG"}\n', encoding='utf-8')
+    out, err = StringIO(), StringIO()
+    call_command('import_ingredients', str(source), stdout=out, stderr=err)
+    assert '1 created' in out.getvalue() and 'Line 2' in err.getvalue()
+    with pytest.raises(CommandError):
+        call_command('import_ingredients', str(tmp_path / 'missing.csv'))
+
+    target = tmp_path / 'out.csv'
+    out = StringIO()
+    call_command('export_ingredients', str(target), stdout=out)
+    assert 'Exported 1 ingredients' in out.getvalue()
+    assert target.read_text(encoding='utf-8').splitlines()[1].startswith('Harina,')
+
+    out = StringIO()
+    call_command('export_ingredients', '--file-format', 'ndjson', stdout=out)
+    assert json.loads(out.getvalue())['quantity'] == '5.00'
@@ -103,3 +103,128 @@ def test_low_stock_without_pagination_branch(api_client, staff_user, monkeypatch
     resp = api_client.get(url)
     assert resp.status_code == status.HTTP_200_OK
     assert isinstance(resp.data, list)
+
+
+@pytest.mark.django_db
+def test_transactions_are_cursor_paginated(api_client, staff_user):
+    api_client.force_authenticate(user=staff_user)
+    ing = Ingredient.objects.create(name='Rice', unit=UnitOfMeasure.KILOGRAM)
+    for i in range(3):
+        InventoryTransaction.objects.create(
+            ingredient=ing, transaction_type='RESTOCK', quantity=Decimal('1.00'), balance_after=Decimal(i + 1)
+        )
+    url = reverse('inventario:inventory-transaction-list')
+    first = api_client.get(url, {'page_size': 2})
+    assert first.status_code == status.HTTP_200_OK
+    assert 'count' not in first.data
+    assert [t['balance_after'] for t in first.data['results']] == ['3.00', '2.00']
+    second = api_client.get(first.data['next'])
+    assert [t['balance_after'] for t in second.data['results']] == ['1.00']
+
+
+@pytest.mark.django_db
+def test_low_stock_is_computed_in_sql_with_filters(api_client, staff_user, django_assert_num_queries):
+    api_client.force_authenticate(user=staff_user)
+    for n in range(5):
+        ing = Ingredient.objects.create(name=f'Low {n}', supplier='Acme', minimum_stock=Decimal('5.00'))
+        InventoryStock.objects.create(ingredient=ing, quantity=Decimal('1.00'))
+    Ingredient.objects.create(name='No stock row', supplier='Other', category='SPICES', minimum_stock=Decimal('1.00'))
+    ok = Ingredient.objects.create(name='Plenty', supplier='Acme', minimum_stock=Decimal('5.00'))
+    InventoryStock.objects.create(ingredient=ok, quantity=Decimal('5.00'))
+
+    url = reverse('inventario:ingredient-low-stock')
+    with django_assert_num_queries(2):  # count + page on the partial index, stock joined
+        resp = api_client.get(url)
+    names = [i['name'] for i in resp.data['results']]
+    assert names == ['Low 0', 'Low 1', 'Low 2', 'Low 3', 'Low 4', 'No stock row']
+    assert resp.data['results'][0]['current_stock'] == '1.00'
+
+    assert resp.data['count'] == 6
+    assert api_client.get(url, {'supplier': 'Other'}).data['count'] == 1
+    assert api_client.get(url, {'category': 'SPICES'}).data['results'][0]['current_stock'] == '0.00'
+    assert api_client.get(url, {'supplier': 'Acme', 'search': 'Low 3'}).data['count'] == 1
+
+
+@pytest.mark.django_db
+def test_is_low_flag_follows_stock_and_minimum(api_client, staff_user):
+    from apps.inventario.services import adjust_stock, receive_delivery
+
+    ing = Ingredient.objects.create(name='Flour', minimum_stock=Decimal('5.00'))
+    assert Ingredient.objects.get(pk=ing.pk).is_low  # no stock row counts as 0
+    stock = InventoryStock.objects.create(ingredient=ing, quantity=Decimal('6.00'))
+    assert not Ingredient.objects.get(pk=ing.pk).is_low
+
+    adjust_stock(stock, Decimal('-2.00'), 'ADJUSTMENT')
+    assert Ingredient.objects.get(pk=ing.pk).is_low
+    receive_delivery([{'ingredient': ing, 'quantity': Decimal('3.00')}])
+    assert not Ingredient.objects.get(pk=ing.pk).is_low
+
+    ing.minimum_stock = Decimal('10.00')
+    ing.save(update_fields=['minimum_stock'])
+    assert Ingredient.objects.get(pk=ing.pk).is_low
+    stock.delete()
+    assert Ingredient.objects.get(pk=ing.pk).is_low
+
+    api_client.force_authenticate(user=staff_user)
+    resp = api_client.get(reverse('inventario:ingredient-low-stock'))
+    assert [i['name'] for i in resp.data['results']] == ['Flour']
+    assert resp.data['results'][0]['is_low'] is True
+
+
+@pytest.mark.django_db
+def test_receive_delivery_in_one_request(api_client, staff_user):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    api_client.force_authenticate(user=staff_user)
+    url = reverse('inventario:stock-receive')
+    counts = []
+    for size in (3, 30):
+        ingredients = [Ingredient.objects.create(name=f'Rec {size}-{n}') for n in range(size)]
+        for ing in ingredients[::2]:
+            InventoryStock.objects.create(ingredient=ing, quantity=Decimal('1.00'))
+        lines = [{'ingredient': ing.id, 'quantity': '2.00'} for ing in ingredients[1:]]
+        lines.append({'ingredient_name': ingredients[0].name, 'quantity': '0.50', 'lot': 'L-7',
+                      'expiration_date': '2031-05-01', 'notes': 'frío'})
+        with CaptureQueriesContext(connection) as ctx:
+            resp = api_client.post(url, {'lines': lines, 'notes': 'Camión 12'}, format='json')
+        assert resp.status_code == status.HTTP_201_CREATED
+        assert resp.data['received'] == size
+        counts.append(len(ctx.captured_queries))
+    assert counts[0] == counts[1]
+
+    first = Ingredient.objects.get(name='Rec 30-0')
+    stock = first.stock
+    assert stock.quantity == Decimal('1.50') and str(stock.expiration_date) == '2031-05-01'
+    assert stock.last_restocked is not None
+    assert Ingredient.objects.get(name='Rec 30-1').stock.quantity == Decimal('2.00')
+    movement = InventoryTransaction.objects.get(ingredient=first)
+    assert movement.notes == 'Camión 12 | frío | Lote L-7' and movement.balance_after == Decimal('1.50')
+    assert resp.data['lines'][-1]['balance_after'] == Decimal('1.50')
+
+
+@pytest.mark.django_db
+def test_receive_delivery_validates_every_line_first(api_client, staff_user):
+    api_client.force_authenticate(user=staff_user)
+    ing = Ingredient.objects.create(name='Beans')
+    InventoryStock.objects.create(ingredient=ing, quantity=Decimal('1.00'))
+    url = reverse('inventario:stock-receive')
+    resp = api_client.post(url, {'lines': [
+        {'ingredient': ing.id, 'quantity': '3.00'},
+        {'ingredient_name': 'Ghost', 'quantity': '1.00'},
+        {'ingredient': 999999, 'quantity': '1.00'},
+    ]}, format='json')
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+    errors = resp.data['lines']
+    assert errors[0] == {} and 'Ghost' in str(errors[1]) and '999999' in str(errors[2])
+
+    resp = api_client.post(url, {'lines': [
+        {'ingredient': ing.id, 'quantity': '3.00'},
+        {'quantity': '1.00'},
+        {'ingredient': ing.id, 'quantity': '0'},
+    ]}, format='json')
+    errors = resp.data['lines']
+    assert errors[0] == {} and 'non_field_errors' in errors[1] and 'quantity' in errors[2]
+    assert InventoryStock.objects.get(ingredient=ing).quantity == Decimal('1.00')
+    assert not InventoryTransaction.objects.exists()
+    assert api_client.post(url, {'lines': []}, format='json').status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,108 @@
+import pytest
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.inventario.forecasting import forecast, load_daily_usage, run_forecast
+from apps.inventario.models import Ingredient, IngredientForecast, InventoryStock, InventoryTransaction
+
+
+def record_usage(ingredient, day, quantity):
+    movement = InventoryTransaction.objects.create(
+        ingredient=ingredient, transaction_type='USAGE', quantity=-Decimal(quantity), balance_after=Decimal('0.00')
+    )
+    moment = timezone.make_aware(datetime.combine(day, time(12)))
+    InventoryTransaction.objects.filter(pk=movement.pk).update(created_at=moment)
+
+
+def test_forecast_smooths_and_applies_weekly_seasonality(engine):
+    monday = datetime(2026, 9, 7).date()
+    flat = [3.0] * 21
+    # Twice the usage on Saturdays (index 5 of each week)
+    weekly = [8.0 if day % 7 == 5 else 4.0 for day in range(28)]
+    result = forecast({1: flat, 3: [0.0] * 21}, monday, alpha=0.3, lead=2, review=5, z=1.65)
+    result.update(forecast({2: weekly}, monday, alpha=0.3, lead=2, review=5, z=1.65))
+    result.update(forecast({4: [1.0, 3.0]}, monday, alpha=0.3, lead=2, review=5, z=1.65))
+
+    assert result[1] == {
+        'daily_demand': Decimal('3.0000'), 'lead_time_demand': Decimal('6.00'), 'safety_stock': Decimal('0.00'),
+        'reorder_point': Decimal('6.00'), 'order_up_to': Decimal('21.00'),
+    }
+    # The next 7 days hold one Saturday: 6 × 4 + 8 units, and lead time (Mon, Tue) is 2 × 4
+    assert result[2]['lead_time_demand'] == Decimal('8.00')
+    assert result[2]['order_up_to'] == Decimal('32.00')
+    assert result[3]['reorder_point'] == Decimal('0.00')
+    # Short histories skip seasonality and keep a safety buffer for the noise
+    assert result[4]['daily_demand'] == Decimal('1.6000')
+    assert result[4]['safety_stock'] == Decimal('4.67')
+    assert forecast({}, monday) == {}
+
+
+@pytest.mark.django_db
+def test_run_forecast_and_supplier_suggestions(settings):
+    settings.FORECAST_LEAD_TIME_DAYS = 2
+    settings.FORECAST_REVIEW_DAYS = 5
+    end = timezone.localdate() - timedelta(days=1)
+    flour = Ingredient.objects.create(name='Harina', supplier='Molino', cost_per_unit=Decimal('1.50'))
+    sugar = Ingredient.objects.create(name='Azucar', supplier='Molino', cost_per_unit=Decimal('1.00'))
+    milk = Ingredient.objects.create(name='Leche', supplier='Granja', cost_per_unit=Decimal('2.00'))
+    stale = Ingredient.objects.create(name='Viejo')
+    InventoryStock.objects.create(ingredient=flour, quantity=Decimal('4.00'))
+    InventoryStock.objects.create(ingredient=sugar, quantity=Decimal('50.00'))
+    for offset in range(14):
+        record_usage(flour, end - timedelta(days=offset), '3')
+        record_usage(milk, end - timedelta(days=offset), '1')
+    record_usage(sugar, end, '2')
+    record_usage(sugar, end - timedelta(days=30), '9')  # outside the window
+    IngredientForecast.objects.create(
+        ingredient=stale, daily_demand=1, lead_time_demand=1, safety_stock=0, reorder_point=1,
+        order_up_to=1, suggested_quantity=1, history_days=1, computed_at=timezone.now(),
+    )
+
+    start, series = load_daily_usage(14)
+    assert start == end - timedelta(days=13) and series[flour.id] == [3.0] * 14
+
+    assert run_forecast(history_days=14, apply_minimum_stock=True) == 3
+    assert not IngredientForecast.objects.filter(ingredient=stale).exists()
+    forecast_row = IngredientForecast.objects.get(ingredient=flour)
+    assert forecast_row.reorder_point == Decimal('6.00') and forecast_row.suggested_quantity == Decimal('17.00')
+    assert IngredientForecast.objects.get(ingredient=sugar).suggested_quantity == Decimal('0.00')
+    assert 'Harina' in str(forecast_row)
+    flour.refresh_from_db()
+    assert flour.minimum_stock == Decimal('6.00')
+
+    staff = User.objects.create_user(username='fc_staff', password='p', role='STAFF')
+    api = APIClient()
+    api.force_authenticate(user=staff)
+    url = reverse('inventario:ingredient-reorder-suggestions')
+    resp = api.get(url)
+    assert resp.status_code == status.HTTP_200_OK
+    assert [group['supplier'] for group in resp.data] == ['Granja', 'Molino']
+    molino = resp.data[1]
+    assert [item['ingredient_name'] for item in molino['items']] == ['Harina']
+    assert molino['items'][0]['suggested_quantity'] == Decimal('17.00')
+    assert molino['estimated_cost'] == Decimal('25.50')
+    # Milk has no stock row at all: it counts as empty
+    assert resp.data[0]['items'][0]['current_stock'] == Decimal('0.00')
+
+    # Suggestions follow the live stock, not the nightly snapshot
+    InventoryStock.objects.filter(ingredient=flour).update(quantity=Decimal('21.00'))
+    assert [group['supplier'] for group in api.get(url, {'supplier': 'Molino'}).data] == []
+
+
+@pytest.mark.django_db
+def test_forecast_command():
+    flour = Ingredient.objects.create(name='Harina')
+    record_usage(flour, timezone.localdate() - timedelta(days=2), '3')
+    out = StringIO()
+    call_command('forecast_inventory', '--history-days', '7', '--end', (timezone.localdate() - timedelta(days=1)).isoformat(), stdout=out)
+    assert 'Forecast 1 ingredients' in out.getvalue()
+    for args in (['--end', 'ayer'], ['--history-days', '0']):
+        with pytest.raises(CommandError):
+            call_command('forecast_inventory', *args)
@@ -0,0 +1,97 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.inventario.forecasting import load_daily_usage
+from apps.inventario.ledger import compact_ledger, day_start, retention_cutoff
+from apps.inventario.models import (
+    Ingredient, InventoryDailySummary, InventoryStock, InventoryTransaction, InventoryTransactionArchive,
+)
+from apps.inventario.services import adjust_stock
+from apps.inventario.snapshots import stock_at
+
+
+def move(stock, delta, when, transaction_type='ADJUSTMENT'):
+    movement = adjust_stock(stock, Decimal(delta), 'ADJUSTMENT')
+    InventoryTransaction.objects.filter(pk=movement.pk).update(created_at=when, transaction_type=transaction_type)
+
+
+@pytest.fixture
+def history():
+    old = day_start(timezone.localdate() - timedelta(days=100)) + timedelta(hours=12)
+    rice = Ingredient.objects.create(name='Arroz')
+    Ingredient.objects.filter(pk=rice.pk).update(created_at=old - timedelta(days=1))
+    stock = InventoryStock.objects.create(ingredient=rice, quantity=Decimal('20.00'))
+    move(stock, '-2', old, 'USAGE')                              # 18
+    move(stock, '-3', old + timedelta(hours=2), 'USAGE')         # 15
+    move(stock, '5', old + timedelta(hours=3))                   # 20
+    move(stock, '-1', old + timedelta(days=1), 'USAGE')          # 19
+    move(stock, '-4', timezone.now() - timedelta(days=2), 'USAGE')  # 15
+    return rice, old
+
+
+def quantities(moments):
+    return [stock_at(moment).get().quantity_at for moment in moments]
+
+
+@pytest.mark.django_db
+def test_compaction_archives_and_summarizes_without_changing_history(history):
+    rice, old = history
+    moments = [old - timedelta(hours=1), old + timedelta(hours=1), old + timedelta(days=2), timezone.now()]
+    before_compaction = quantities(moments)
+    usage = load_daily_usage(120)
+    assert before_compaction == [Decimal('20.00'), Decimal('18.00'), Decimal('19.00'), Decimal('15.00')]
+
+    result = compact_ledger(batch_size=1)
+    assert result == {'before': retention_cutoff(), 'archived': 4, 'summaries': 3}
+    assert InventoryTransaction.objects.count() == 1
+    assert set(InventoryTransactionArchive.objects.values_list('quantity', flat=True)) == {
+        Decimal('-2.00'), Decimal('-3.00'), Decimal('5.00'), Decimal('-1.00'),
+    }
+
+    # Two batches merged into one summary row for the first day's usage
+    summary = InventoryDailySummary.objects.get(day=timezone.localdate(old), transaction_type='USAGE')
+    assert summary.movements == 2 and summary.quantity == Decimal('-5.00')
+    assert summary.opening_balance == Decimal('20.00') and summary.closing_balance == Decimal('15.00')
+    assert summary.first_at == old and summary.last_at == old + timedelta(hours=2)
+    assert 'Arroz' in str(summary) and 'Arroz' in str(InventoryTransactionArchive.objects.first())
+
+    assert quantities(moments) == before_compaction
+    assert load_daily_usage(120) == usage
+    assert compact_ledger()['archived'] == 0
+
+    # An explicit date compacts everything before that day and merges again
+    out = StringIO()
+    call_command('compact_inventory_ledger', '--before', timezone.localdate().isoformat(), stdout=out)
+    assert 'Archived 1 transactions into 1 daily summaries' in out.getvalue()
+    assert quantities(moments) == before_compaction
+    with pytest.raises(CommandError):
+        call_command('compact_inventory_ledger', '--before', 'ayer')
+
+
+@pytest.mark.django_db
+def test_archive_and_daily_summary_endpoints(history):
+    rice, old = history
+    compact_ledger()
+    api = APIClient()
+    api.force_authenticate(user=User.objects.create_user(username='ledger_customer', password='p', role='CUSTOMER'))
+    assert api.get(reverse('inventario:transaction-archive-list')).status_code == status.HTTP_403_FORBIDDEN
+
+    api.force_authenticate(user=User.objects.create_user(username='ledger_staff', password='p', role='STAFF'))
+    resp = api.get(reverse('inventario:transaction-archive-list'), {'ingredient': rice.id, 'transaction_type': 'USAGE'})
+    assert resp.status_code == status.HTTP_200_OK
+    assert [row['quantity'] for row in resp.data['results']] == ['-1.00', '-3.00', '-2.00']
+
+    url = reverse('inventario:transaction-daily-list')
+    resp = api.get(url, {'day__gte': (timezone.localdate(old) + timedelta(days=1)).isoformat()})
+    assert [(row['transaction_type'], row['quantity']) for row in resp.data['results']] == [('USAGE', '-1.00')]
+    resp = api.get(url, {'transaction_type': 'ADJUSTMENT'})
+    assert resp.data['results'][0]['ingredient_name'] == 'Arroz'
+    assert resp.data['results'][0]['closing_balance'] == '20.00'
@@ -0,0 +1,113 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.platos.models import Dish, RecipeItem
+from apps.pedidos.models import Order, OrderItem
+from apps.inventario.models import Ingredient, InventoryStock, StockLot
+from apps.inventario.services import adjust_stock, deduct_for_order, receive_delivery
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(username='lot_staff', password='p', role='STAFF')
+
+
+@pytest.fixture
+def milk():
+    ingredient = Ingredient.objects.create(name='Leche', unit='L')
+    stock = InventoryStock.objects.create(ingredient=ingredient)
+    today = timezone.localdate()
+    receive_delivery([
+        {'ingredient': ingredient, 'quantity': Decimal('4.00'), 'lot': 'L-late', 'expiration_date': today + timedelta(days=20)},
+        {'ingredient': ingredient, 'quantity': Decimal('3.00'), 'lot': 'L-soon', 'expiration_date': today + timedelta(days=2)},
+        {'ingredient': ingredient, 'quantity': Decimal('2.00'), 'lot': 'L-none'},
+    ])
+    stock.refresh_from_db()
+    return ingredient, stock, today
+
+
+def remaining(ingredient):
+    return dict(StockLot.objects.filter(ingredient=ingredient).values_list('lot_code', 'quantity'))
+
+
+@pytest.mark.django_db
+def test_deductions_consume_earliest_expiring_lot_first(milk, staff_user):
+    ingredient, stock, today = milk
+    assert stock.quantity == Decimal('9.00') and stock.expiration_date == today + timedelta(days=2)
+
+    dish = Dish.objects.create(name='Flan', description='d', price=Decimal('3.00'))
+    RecipeItem.objects.create(dish=dish, ingredient=ingredient, quantity=Decimal('1.00'))
+    order = Order.objects.create(customer=staff_user, order_type='TAKEOUT')
+    OrderItem.objects.create(order=order, dish=dish, quantity=4, unit_price=dish.price)
+    deduct_for_order(order)
+    assert remaining(ingredient) == {'L-late': Decimal('3.00'), 'L-soon': Decimal('0.00'), 'L-none': Decimal('2.00')}
+    stock.refresh_from_db()
+    assert stock.expiration_date == today + timedelta(days=20)
+
+    # A manual exit consumes the requested lot first; lots without expiry go last
+    lot = StockLot.objects.get(lot_code='L-none')
+    adjust_stock(stock, Decimal('-4.00'), 'WASTE', lot=lot)
+    assert remaining(ingredient) == {'L-late': Decimal('1.00'), 'L-soon': Decimal('0.00'), 'L-none': Decimal('0.00')}
+
+    # Stock without lots (before lot tracking) is consumed after every lot
+    InventoryStock.objects.filter(pk=stock.pk).update(quantity=Decimal('3.00'))
+    stock.refresh_from_db()
+    adjust_stock(stock, Decimal('-2.50'), 'ADJUSTMENT')
+    stock.refresh_from_db()
+    assert stock.quantity == Decimal('0.50') and stock.expiration_date is None
+    assert not StockLot.objects.filter(quantity__gt=0).exists()
+
+    # New entries open a lot and only ever move the stock expiry earlier
+    adjust_stock(stock, Decimal('5.00'), 'RESTOCK', lot_code='L-new', expiration_date=today + timedelta(days=9))
+    adjust_stock(stock, Decimal('1.00'), 'ADJUSTMENT', expiration_date=today + timedelta(days=30))
+    stock.refresh_from_db()
+    assert stock.expiration_date == today + timedelta(days=9)
+    assert 'L-new' in str(StockLot.objects.get(lot_code='L-new'))
+    assert 'exp. -' in str(lot)
+
+
+@pytest.mark.django_db
+def test_expiring_endpoint_and_lot_adjustments(milk, staff_user):
+    ingredient, stock, today = milk
+    StockLot.objects.create(ingredient=ingredient, lot_code='L-old', quantity=Decimal('1.00'),
+                            initial_quantity=Decimal('1.00'), expiration_date=today - timedelta(days=1))
+    StockLot.objects.create(ingredient=ingredient, lot_code='L-empty', quantity=Decimal('0.00'),
+                            initial_quantity=Decimal('1.00'), expiration_date=today)
+    api = APIClient()
+    api.force_authenticate(user=staff_user)
+
+    url = reverse('inventario:stock-lot-expiring')
+    resp = api.get(url, {'days': 3})
+    assert resp.status_code == status.HTTP_200_OK
+    assert [row['lot_code'] for row in resp.data['results']] == ['L-old', 'L-soon']
+    assert resp.data['results'][0]['days_to_expiry'] == -1
+    assert len(api.get(url).data['results']) == 2
+    assert len(api.get(url, {'days': 30, 'ingredient': ingredient.id}).data['results']) == 3
+    assert api.get(url, {'days': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+    assert api.get(url, {'days': 999}).status_code == status.HTTP_400_BAD_REQUEST
+    resp = api.get(reverse('inventario:stock-lot-list'), {'ingredient': ingredient.id})
+    assert resp.data['count'] == 5
+    assert next(row for row in resp.data['results'] if row['lot_code'] == 'L-none')['days_to_expiry'] is None
+
+    adjust_url = reverse('inventario:stock-adjust', args=[stock.id])
+    old = StockLot.objects.get(lot_code='L-old')
+    resp = api.post(adjust_url, {'transaction_type': 'WASTE', 'quantity': '1.00', 'lot': old.id}, format='json')
+    assert resp.status_code == status.HTTP_200_OK
+    old.refresh_from_db()
+    assert old.quantity == Decimal('0.00')
+
+    for payload in (
+        {'transaction_type': 'WASTE', 'quantity': '1.00', 'lot': 99999},
+        {'transaction_type': 'WASTE', 'quantity': '5.00', 'lot': old.id},
+        {'transaction_type': 'RESTOCK', 'quantity': '1.00', 'lot': old.id},
+    ):
+        assert api.post(adjust_url, payload, format='json').status_code == status.HTTP_400_BAD_REQUEST
+
+    resp = api.post(adjust_url, {'transaction_type': 'RESTOCK', 'quantity': '2.00', 'lot_code': 'L-api',
+                                 'expiration_date': today.isoformat()}, format='json')
+    assert resp.data['expiration_date'] == today.isoformat()
@@ -0,0 +1,155 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.platos.models import Dish, RecipeItem
+from apps.platos.portions import load_recipe_matrix
+from apps.pedidos.models import Order, OrderItem, OrderStatus
+from apps.pedidos.transitions import transition_order
+from apps.inventario.models import Ingredient, InventoryStock, InventoryTransaction, StockReservation
+from apps.inventario.services import (
+    InsufficientStock, release_expired_reservations, release_for_order, reserve_for_order,
+)
+
+
+@pytest.fixture
+def customer_user():
+    return User.objects.create_user(username='res_customer', password='p', role='CUSTOMER')
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(username='res_staff', password='p', role='STAFF')
+
+
+@pytest.fixture
+def soup():
+    tomato = Ingredient.objects.create(name='Tomate')
+    InventoryStock.objects.create(ingredient=tomato, quantity=Decimal('3.00'))
+    dish = Dish.objects.create(name='Sopa', description='d', price=Decimal('5.00'))
+    RecipeItem.objects.create(dish=dish, ingredient=tomato, quantity=Decimal('1.00'))
+    return tomato, dish
+
+
+def stock_of(ingredient):
+    return InventoryStock.objects.get(ingredient=ingredient)
+
+
+def place_order(api, user, dish, quantity):
+    api.force_authenticate(user=user)
+    return api.post(reverse('pedidos:order-list'), {
+        'customer': user.id, 'order_type': 'TAKEOUT',
+        'items': [{'dish': dish.id, 'quantity': quantity}],
+    }, format='json')
+
+
+@pytest.mark.django_db
+def test_order_creation_reserves_and_confirmation_converts(soup, customer_user, staff_user):
+    tomato, dish = soup
+    api = APIClient()
+
+    assert place_order(api, customer_user, dish, 2).status_code == status.HTTP_201_CREATED
+    order = Order.objects.get(customer=customer_user)
+    stock = stock_of(tomato)
+    assert stock.quantity == Decimal('3.00') and stock.reserved_quantity == Decimal('2.00')
+    assert stock.available_quantity == Decimal('1.00')
+    assert StockReservation.objects.get(order=order).quantity == Decimal('2.00')
+    assert load_recipe_matrix()[1] == {tomato.id: Decimal('1.00')}
+
+    # Only the free quantity can be reserved by other orders
+    resp = place_order(api, customer_user, dish, 2)
+    assert resp.status_code == status.HTTP_409_CONFLICT
+    assert resp.data['shortages'][0]['available'] == Decimal('1.00')
+    assert Order.objects.filter(customer=customer_user).count() == 1
+
+    # Confirming deducts the physical stock and consumes the reservation
+    transition_order(order, OrderStatus.CONFIRMED)
+    stock = stock_of(tomato)
+    assert stock.quantity == Decimal('1.00') and stock.reserved_quantity == Decimal('0.00')
+    assert not StockReservation.objects.exists()
+    assert InventoryTransaction.objects.get(related_order=order).quantity == Decimal('-2.00')
+
+    api.force_authenticate(user=staff_user)
+    data = api.get(reverse('inventario:stock-detail', args=[stock.pk])).data
+    assert data['reserved_quantity'] == '0.00' and data['available_quantity'] == '1.00'
+
+
+@pytest.mark.django_db
+def test_reservation_holds_dish_availability_until_released(soup, customer_user):
+    tomato, dish = soup
+    order = Order.objects.create(customer=customer_user, order_type='TAKEOUT')
+    OrderItem.objects.create(order=order, dish=dish, quantity=3, unit_price=dish.price)
+
+    reserve_for_order(order)
+    dish.refresh_from_db()
+    assert not dish.is_in_stock
+    assert not dish.recipe_items.get().check_availability()
+    with pytest.raises(InsufficientStock):
+        reserve_for_order(order)
+
+    # Cancelling a pending order gives the quantity back
+    transition_order(order, OrderStatus.CANCELLED)
+    dish.refresh_from_db()
+    assert dish.is_in_stock
+    assert stock_of(tomato).reserved_quantity == Decimal('0.00')
+    assert release_for_order(order) == 0
+
+
+@pytest.mark.django_db
+def test_expired_and_deleted_orders_release_reservations(soup, customer_user):
+    tomato, dish = soup
+    orders = []
+    for _ in range(2):
+        order = Order.objects.create(customer=customer_user, order_type='TAKEOUT')
+        OrderItem.objects.create(order=order, dish=dish, quantity=1, unit_price=dish.price)
+        reserve_for_order(order)
+        orders.append(order)
+    assert stock_of(tomato).reserved_quantity == Decimal('2.00')
+
+    StockReservation.objects.filter(order=orders[0]).update(expires_at=timezone.now() - timedelta(minutes=1))
+    out = StringIO()
+    call_command('release_expired_reservations', stdout=out)
+    assert 'Released 1' in out.getvalue()
+    assert stock_of(tomato).reserved_quantity == Decimal('1.00')
+    assert release_expired_reservations() == 0
+
+    orders[1].delete()
+    assert stock_of(tomato).reserved_quantity == Decimal('0.00')
+
+    # A confirmed order whose reservation expired is deducted against free stock
+    transition_order(orders[0], OrderStatus.CONFIRMED)
+    assert stock_of(tomato).quantity == Decimal('2.00')
+
+
+@pytest.mark.django_db
+def test_new_reservation_releases_only_expired_rows_of_its_ingredients(soup, customer_user):
+    tomato, dish = soup
+    basil = Ingredient.objects.create(name='Albahaca')
+    InventoryStock.objects.create(ingredient=basil, quantity=Decimal('1.00'))
+    pesto = Dish.objects.create(name='Pesto', description='d', price=Decimal('6.00'))
+    RecipeItem.objects.create(dish=pesto, ingredient=basil, quantity=Decimal('1.00'))
+
+    def order_of(item, quantity):
+        order = Order.objects.create(customer=customer_user, order_type='TAKEOUT')
+        OrderItem.objects.create(order=order, dish=item, quantity=quantity, unit_price=item.price)
+        reserve_for_order(order)
+        return order
+
+    stale_soup, stale_pesto = order_of(dish, 3), order_of(pesto, 1)
+    StockReservation.objects.filter(order__in=[stale_soup, stale_pesto]).update(
+        expires_at=timezone.now() - timedelta(minutes=1)
+    )
+
+    # The expired soup hold no longer blocks tomato; basil's waits for the command
+    fresh = order_of(dish, 2)
+    assert stock_of(tomato).reserved_quantity == Decimal('2.00')
+    assert list(StockReservation.objects.filter(ingredient=tomato).values_list('order', flat=True)) == [fresh.id]
+    assert stock_of(basil).reserved_quantity == Decimal('1.00')
+    assert release_expired_reservations() == 1
+    assert stock_of(basil).reserved_quantity == Decimal('0.00')
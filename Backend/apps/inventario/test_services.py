@@ -0,0 +1,146 @@
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.platos.models import Dish, RecipeItem
+from apps.pedidos.models import Order, OrderItem, OrderStatus
+from apps.pedidos.transitions import transition_order
+from apps.inventario.models import Ingredient, InventoryStock, InventoryTransaction
+from apps.inventario.services import deduct_for_order, order_requirements, InsufficientStock
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(username='ded_staff', password='p', role='STAFF')
+
+
+@pytest.fixture
+def kitchen(staff_user):
+    flour = Ingredient.objects.create(name='Harina')
+    cheese = Ingredient.objects.create(name='Queso')
+    InventoryStock.objects.create(ingredient=flour, quantity=Decimal('10.00'))
+    InventoryStock.objects.create(ingredient=cheese, quantity=Decimal('1.00'))
+    pizza = Dish.objects.create(name='Pizza', description='d', price=Decimal('9.00'))
+    bread = Dish.objects.create(name='Pan', description='d', price=Decimal('2.00'))
+    RecipeItem.objects.create(dish=pizza, ingredient=flour, quantity=Decimal('0.50'))
+    RecipeItem.objects.create(dish=pizza, ingredient=cheese, quantity=Decimal('0.20'))
+    RecipeItem.objects.create(dish=bread, ingredient=flour, quantity=Decimal('0.25'))
+    order = Order.objects.create(customer=staff_user, order_type='TAKEOUT')
+    OrderItem.objects.create(order=order, dish=pizza, quantity=2, unit_price=pizza.price)
+    OrderItem.objects.create(order=order, dish=bread, quantity=4, unit_price=bread.price)
+    return {'flour': flour, 'cheese': cheese, 'pizza': pizza, 'order': order}
+
+
+@pytest.mark.django_db
+def test_deduction_aggregates_and_writes_in_bulk(kitchen, django_assert_num_queries):
+    order, flour, cheese = kitchen['order'], kitchen['flour'], kitchen['cheese']
+    assert order_requirements(order) == {flour.id: Decimal('2.00'), cheese.id: Decimal('0.40')}
+
+    # requirements, idempotency check, locked reservations, locked stocks, locked lots,
+    # bulk update, bulk insert (+ savepoint), the availability refresh of the affected dishes and the is_low update
+    with django_assert_num_queries(13):
+        movements = deduct_for_order(order)
+    assert len(movements) == 2
+
+    assert InventoryStock.objects.get(ingredient=flour).quantity == Decimal('8.00')
+    usage = InventoryTransaction.objects.get(ingredient=cheese, related_order=order)
+    assert usage.transaction_type == 'USAGE'
+    assert usage.quantity == Decimal('-0.40') and usage.balance_after == Decimal('0.60')
+
+    # Idempotent per order
+    assert deduct_for_order(order) == []
+    assert InventoryTransaction.objects.filter(related_order=order).count() == 2
+
+
+@pytest.mark.django_db
+def test_confirm_transition_deducts_inventory(kitchen):
+    transition_order(kitchen['order'], OrderStatus.CONFIRMED)
+    assert InventoryStock.objects.get(ingredient=kitchen['cheese']).quantity == Decimal('0.60')
+    empty = Order.objects.create(customer=kitchen['order'].customer, order_type='TAKEOUT')
+    transition_order(empty, OrderStatus.CONFIRMED)
+    assert not InventoryTransaction.objects.filter(related_order=empty).exists()
+
+
+@pytest.mark.django_db
+def test_insufficient_stock_rolls_back_confirmation(kitchen, staff_user):
+    order = kitchen['order']
+    OrderItem.objects.create(order=order, dish=kitchen['pizza'], quantity=5, unit_price=Decimal('9.00'))
+    InventoryStock.objects.filter(ingredient=kitchen['flour']).delete()
+
+    with pytest.raises(InsufficientStock) as exc:
+        deduct_for_order(order)
+    assert {s['ingredient'] for s in exc.value.shortages} == {kitchen['flour'].id, kitchen['cheese'].id}
+
+    api = APIClient()
+    api.force_authenticate(user=staff_user)
+    resp = api.patch(reverse('pedidos:order-update-status', args=[order.id]), {'status': OrderStatus.CONFIRMED}, format='json')
+    assert resp.status_code == status.HTTP_409_CONFLICT
+    assert len(resp.data['shortages']) == 2
+    order.refresh_from_db()
+    assert order.status == OrderStatus.PENDING
+    assert InventoryStock.objects.get(ingredient=kitchen['cheese']).quantity == Decimal('1.00')
+    assert not InventoryTransaction.objects.exists()
+
+
+@pytest.mark.parametrize('returning', [True, False])
+@pytest.mark.django_db
+def test_adjust_stock_is_a_guarded_atomic_update(returning, monkeypatch, staff_user):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from apps.inventario import services
+    from apps.inventario.services import adjust_stock
+
+    monkeypatch.setattr(services, 'supports_update_returning', lambda: returning)
+    oil = Ingredient.objects.create(name='Aceite')
+    stock = InventoryStock.objects.create(ingredient=oil, quantity=Decimal('5.00'))
+    other_device = InventoryStock.objects.get(pk=stock.pk)
+
+    # Two writers holding stale copies: both deltas land, nothing is overwritten
+    adjust_stock(stock, Decimal('2.50'), 'RESTOCK', user=staff_user)
+    with CaptureQueriesContext(connection) as ctx:
+        movement = adjust_stock(other_device, Decimal('-1.25'), 'WASTE', notes='derrame')
+    assert other_device.quantity == movement.balance_after == Decimal('6.25')
+    assert stock.last_restocked is not None
+    stock.refresh_from_db()
+    assert stock.quantity == Decimal('6.25')
+    updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "inventory_stock"')]
+    assert len(updates) == 1 and ('RETURNING' in updates[0]) is returning
+
+    with pytest.raises(InsufficientStock) as exc:
+        adjust_stock(stock, Decimal('-7.00'), 'WASTE')
+    assert exc.value.shortages[0]['available'] == Decimal('6.25')
+    assert InventoryTransaction.objects.filter(ingredient=oil).count() == 2
+
+    # Outgoing movements cannot take quantity held by pending orders
+    InventoryStock.objects.filter(pk=stock.pk).update(reserved_quantity=Decimal('2.00'))
+    with pytest.raises(InsufficientStock) as exc:
+        adjust_stock(stock, Decimal('-4.50'), 'WASTE')
+    assert exc.value.shortages[0]['available'] == Decimal('4.25')
+    adjust_stock(stock, Decimal('1.00'), 'RESTOCK')
+    assert adjust_stock(stock, Decimal('-5.25'), 'WASTE').balance_after == Decimal('2.00')
+    InventoryStock.objects.filter(pk=stock.pk).update(reserved_quantity=Decimal('0.00'))
+    stock.refresh_from_db()
+
+    assert stock.deduct_stock(Decimal('2.00')) is True
+    assert stock.deduct_stock(Decimal('0.01')) is False
+    stock.add_stock(Decimal('1.00'))
+    assert InventoryStock.objects.get(pk=stock.pk).quantity == Decimal('1.00')
+
+
+@pytest.mark.parametrize('returning', [True, False])
+@pytest.mark.django_db
+def test_fractional_deductions_reach_exactly_zero(returning, monkeypatch):
+    from apps.inventario import services
+    from apps.inventario.services import adjust_stock
+
+    monkeypatch.setattr(services, 'supports_update_returning', lambda: returning)
+    salt = Ingredient.objects.create(name='Sal')
+    stock = InventoryStock.objects.create(ingredient=salt, quantity=Decimal('0.30'))
+    # 0.30 - 0.10 - 0.10 leaves 0.09999999999999998 in binary floating point
+    balances = [adjust_stock(stock, Decimal('-0.10'), 'WASTE').balance_after for _ in range(3)]
+    assert balances == [Decimal('0.20'), Decimal('0.10'), Decimal('0.00')]
+    assert InventoryStock.objects.get(pk=stock.pk).quantity == Decimal('0.00')
+    with pytest.raises(InsufficientStock):
+        adjust_stock(stock, Decimal('-0.01'), 'WASTE')
@@ -0,0 +1,97 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.inventario.models import Ingredient, InventoryStock, InventoryTransaction, StockSnapshot
+from apps.inventario.services import adjust_stock
+from apps.inventario.snapshots import stock_at, take_stock_snapshots, valuation_at
+
+
+def move(stock, delta, when):
+    adjust_stock(stock, Decimal(delta), 'ADJUSTMENT')
+    InventoryTransaction.objects.filter(pk=InventoryTransaction.objects.latest('id').pk).update(created_at=when)
+
+
+@pytest.fixture
+def ledger():
+    now = timezone.now()
+    start = now - timedelta(days=40)
+    flour = Ingredient.objects.create(name='Harina', cost_per_unit=Decimal('2.00'))
+    Ingredient.objects.filter(pk=flour.pk).update(created_at=start)
+    stock = InventoryStock.objects.create(ingredient=flour, quantity=Decimal('5.00'))
+    move(stock, '10', start + timedelta(days=1))    # 15
+    move(stock, '-3', start + timedelta(days=10))   # 12
+    move(stock, '8', start + timedelta(days=30))    # 20
+    return flour, stock, start
+
+
+def quantity(moment):
+    return {row.name: Decimal(row.quantity_at).quantize(Decimal('0.01')) for row in stock_at(moment)}
+
+
+@pytest.mark.django_db
+def test_stock_at_reconstructs_from_snapshots_and_ledger(ledger):
+    flour, stock, start = ledger
+    assert quantity(start + timedelta(hours=1)) == {'Harina': Decimal('5.00')}
+    assert quantity(start + timedelta(days=15)) == {'Harina': Decimal('12.00')}
+    assert quantity(start - timedelta(days=1)) == {}
+
+    # Snapshot at day 20 carries the historic cost; later ledger rows win over it
+    assert take_stock_snapshots(at=start + timedelta(days=20)) == 1
+    snapshot = StockSnapshot.objects.get()
+    assert snapshot.quantity == Decimal('12.00') and snapshot.value == Decimal('24.00')
+    assert 'Harina' in str(snapshot)
+    Ingredient.objects.filter(pk=flour.pk).update(cost_per_unit=Decimal('3.00'))
+    report = valuation_at(start + timedelta(days=25))
+    assert report['items'][0]['unit_cost'] == Decimal('2.00')
+    assert report['total_value'] == Decimal('24.00')
+    assert report['items'][0]['snapshot_at'] == snapshot.taken_at
+    assert quantity(timezone.now()) == {'Harina': Decimal('20.00')}
+
+    # Once the ledger before the snapshot is gone the snapshot still answers
+    InventoryTransaction.objects.filter(created_at__lt=snapshot.taken_at).delete()
+    assert quantity(start + timedelta(days=25)) == {'Harina': Decimal('12.00')}
+
+    # Ingredient without any movement falls back to its current stock
+    salt = Ingredient.objects.create(name='Sal', cost_per_unit=Decimal('1.00'))
+    InventoryStock.objects.create(ingredient=salt, quantity=Decimal('4.00'))
+    assert quantity(timezone.now())['Sal'] == Decimal('4.00')
+
+    # Current snapshots read the live stock; repeating the instant is a no-op
+    assert take_stock_snapshots() == 2
+    assert take_stock_snapshots(at=snapshot.taken_at) == 1
+    assert StockSnapshot.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_valuation_endpoint_and_command(ledger):
+    flour, stock, start = ledger
+    staff = User.objects.create_user(username='snap_staff', password='p', role='STAFF')
+    api = APIClient()
+    api.force_authenticate(user=staff)
+    url = reverse('inventario:stock-valuation')
+
+    resp = api.get(url)
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.data['total_value'] == Decimal('40.00')
+
+    day = (start + timedelta(days=15)).date().isoformat()
+    resp = api.get(url, {'at': day, 'ingredient': flour.id, 'category': flour.category})
+    assert resp.data['items'][0]['quantity'] == Decimal('12.00')
+    assert api.get(url, {'at': 'ayer'}).status_code == status.HTTP_400_BAD_REQUEST
+    assert api.get(url, {'ingredient': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    out = StringIO()
+    call_command('take_stock_snapshots', '--at', day, stdout=out)
+    assert 'Recorded 1 stock snapshots' in out.getvalue()
+    call_command('take_stock_snapshots', stdout=StringIO())
+    assert StockSnapshot.objects.count() == 2
+    with pytest.raises(CommandError):
+        call_command('take_stock_snapshots', '--at', 'nunca')
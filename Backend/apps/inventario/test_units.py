@@ -0,0 +1,117 @@
+import pytest
+from decimal import Decimal
+from io import StringIO
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.platos.models import Dish, RecipeItem
+from apps.pedidos.models import Order, OrderItem
+from apps.inventario.catalog_io import import_catalog
+from apps.inventario.models import Ingredient, InventoryStock
+from apps.inventario.services import order_requirements
+from apps.inventario.units import UnitConversionError, conversion_factor, convert_many
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(username='unit_staff', password='p', role='STAFF')
+
+
+def test_conversion_table_and_densities():
+    assert conversion_factor('KG', 'G') == Decimal('1000')
+    assert conversion_factor('DZ', 'PC') == Decimal('12')
+    assert conversion_factor('ML', 'G', Decimal('1.03')) == Decimal('1.03')
+    assert conversion_factor('G', 'L', Decimal('0.5')) == Decimal('0.002')
+    for source, target, density in [('G', 'L', None), ('PC', 'KG', Decimal('1')), ('XX', 'KG', None)]:
+        with pytest.raises(UnitConversionError):
+            conversion_factor(source, target, density)
+
+    values = convert_many(
+        [Decimal('250'), Decimal('2'), Decimal('500'), Decimal('1.5'), Decimal('3')],
+        ['G', 'LB', 'ML', 'L', 'DZ'],
+        ['KG', 'KG', 'KG', 'ML', 'PC'],
+        [None, None, Decimal('0.92'), None, None],
+    )
+    assert values == [Decimal('0.2500'), Decimal('0.9072'), Decimal('0.4600'), Decimal('1500.0000'), Decimal('36.0000')]
+    assert convert_many([], [], []) == []
+    assert convert_many([Decimal('5')], ['G'], ['G']) == [Decimal('5.0000')]
+    # Exact half-up rounding where a float product would round down
+    assert convert_many([Decimal('0.15'), Decimal('0.35')], ['G', 'G'], ['KG', 'KG']) == [
+        Decimal('0.0002'), Decimal('0.0004'),
+    ]
+    with pytest.raises(UnitConversionError):
+        convert_many([Decimal('1'), Decimal('1')], ['G', 'ML'], ['KG', 'KG'])
+    with pytest.raises(UnitConversionError):
+        convert_many([Decimal('1')], ['G'], ['XX'])
+
+
+@pytest.mark.django_db
+def test_recipes_in_other_units_drive_stock_and_cost(staff_user):
+    salt = Ingredient.objects.create(name='Sal', unit='KG', cost_per_unit=Decimal('2.00'))
+    oil = Ingredient.objects.create(name='Aceite', unit='L', cost_per_unit=Decimal('10.00'), density=Decimal('0.9200'))
+    InventoryStock.objects.create(ingredient=salt, quantity=Decimal('0.01'))
+    InventoryStock.objects.create(ingredient=oil, quantity=Decimal('1.00'))
+    dish = Dish.objects.create(name='Papas', description='d', price=Decimal('4.00'))
+    salt_item = RecipeItem.objects.create(dish=dish, ingredient=salt, quantity=Decimal('5.00'), unit='G')
+    RecipeItem.objects.create(dish=dish, ingredient=oil, quantity=Decimal('46.00'), unit='G')
+
+    assert salt_item.base_quantity == Decimal('0.0050')
+    assert RecipeItem.objects.get(ingredient=oil).base_quantity == Decimal('0.0500')
+    dish.refresh_from_db()
+    assert dish.is_in_stock and salt_item.check_availability()
+    assert dish.calculate_cost() == Decimal('0.51')
+
+    order = Order.objects.create(customer=staff_user, order_type='TAKEOUT')
+    OrderItem.objects.create(order=order, dish=dish, quantity=3, unit_price=dish.price)
+    # 15 g of salt rounds up to the stock precision instead of down to 0.01
+    assert order_requirements(order) == {salt.id: Decimal('0.02'), oil.id: Decimal('0.15')}
+
+    # Changing the stock unit rebases every recipe that uses the ingredient
+    salt.unit = 'G'
+    salt.save()
+    salt_item.refresh_from_db()
+    assert salt_item.base_quantity == Decimal('5.0000')
+    dish.refresh_from_db()
+    assert not dish.is_in_stock
+    salt.save(update_fields=['cost_per_unit'])
+
+    # Catalog imports rebase too, and reject a unit that breaks a recipe
+    stats = import_catalog(StringIO('name,unit,density\nSal,KG,\n'))
+    assert stats['updated'] == 1
+    salt_item.refresh_from_db()
+    assert salt_item.base_quantity == Decimal('0.0050')
+    stats = import_catalog(StringIO('name,unit,density\nSal,L,\nPimienta,KG,0\n'))
+    assert [error['line'] for error in stats['errors']] == [3, 2]
+    assert Ingredient.objects.get(name='Sal').unit == 'KG'
+
+
+@pytest.mark.django_db
+def test_recipe_and_ingredient_endpoints_validate_units(staff_user):
+    flour = Ingredient.objects.create(name='Harina', unit='KG', cost_per_unit=Decimal('1.00'))
+    InventoryStock.objects.create(ingredient=flour, quantity=Decimal('5.00'))
+    api = APIClient()
+    api.force_authenticate(user=staff_user)
+
+    payload = {
+        'name': 'Pan', 'description': 'd', 'price': '2.00',
+        'recipe_items': [{'ingredient': flour.id, 'quantity': '250', 'unit': 'G'}],
+    }
+    resp = api.post(reverse('platos:dish-list'), payload, format='json')
+    assert resp.status_code == status.HTTP_201_CREATED
+    assert resp.data['recipe_items'][0]['base_quantity'] == '0.2500'
+    dish_id = resp.data['id']
+
+    payload['recipe_items'] = [{'ingredient': flour.id, 'quantity': '1', 'unit': 'LB'}]
+    resp = api.patch(reverse('platos:dish-detail', args=[dish_id]), payload, format='json')
+    assert resp.data['recipe_items'][0]['base_quantity'] == '0.4536'
+
+    payload['recipe_items'] = [{'ingredient': flour.id, 'quantity': '1', 'unit': 'ML'}]
+    resp = api.patch(reverse('platos:dish-detail', args=[dish_id]), payload, format='json')
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+    url = reverse('inventario:ingredient-detail', args=[flour.id])
+    assert api.patch(url, {'unit': 'L'}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+    resp = api.patch(url, {'unit': 'L', 'density': '0.5000'}, format='json')
+    assert resp.status_code == status.HTTP_200_OK
+    assert RecipeItem.objects.get(dish_id=dish_id).base_quantity == Decimal('0.9072')
@@ -0,0 +1,118 @@
+"""
+Conversión de Unidades
+======================
+RF-02: Recetas e inventario en unidades distintas
+
+Cada unidad de UnitOfMeasure pertenece a una dimensión (masa, volumen o
+conteo) y tiene un factor hacia la unidad base de esa dimensión (g, ml,
+pieza). La tabla `CONVERSION_TABLE` precalcula el factor de cada par de
+unidades de la misma dimensión; masa ↔ volumen usa la densidad del
+ingrediente (Ingredient.density, en g/ml).
+
+`convert_many` convierte listas completas de cantidades en una pasada: el
+factor se calcula una sola vez por combinación (origen, destino, densidad)
+y cada cantidad se multiplica y redondea en Decimal (ROUND_HALF_UP). No se
+usa aritmética de punto flotante porque el resultado se guarda: un float
+redondeado a 4 decimales puede caer del otro lado del medio (0.15 g son
+0.0002 kg, no 0.0001). Las recetas guardan el resultado en
+`RecipeItem.base_quantity` (cantidad expresada en la unidad de stock del
+ingrediente), de modo que disponibilidad, descuentos y costos siguen
+comparando columnas en SQL sin convertir por fila.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from .models import UnitOfMeasure
+
+
+MASS, VOLUME, COUNT = 'mass', 'volume', 'count'
+
+# Dimensión y factor hacia la unidad base (g, ml, pieza)
+BASE_FACTORS = {
+    UnitOfMeasure.KILOGRAM: (MASS, Decimal('1000')),
+    UnitOfMeasure.GRAM: (MASS, Decimal('1')),
+    UnitOfMeasure.POUND: (MASS, Decimal('453.59237')),
+    UnitOfMeasure.OUNCE: (MASS, Decimal('28.349523125')),
+    UnitOfMeasure.LITER: (VOLUME, Decimal('1000')),
+    UnitOfMeasure.MILLILITER: (VOLUME, Decimal('1')),
+    UnitOfMeasure.PIECE: (COUNT, Decimal('1')),
+    UnitOfMeasure.DOZEN: (COUNT, Decimal('12')),
+}
+
+CONVERSION_TABLE = {
+    (source, target): source_factor / target_factor
+    for source, (source_dimension, source_factor) in BASE_FACTORS.items()
+    for target, (target_dimension, target_factor) in BASE_FACTORS.items()
+    if source_dimension == target_dimension
+}
+
+# base_quantity guarda 4 decimales: 5 g expresados en KG son 0.005
+BASE_QUANTITY_PLACES = Decimal('0.0001')
+
+
+class UnitConversionError(ValueError):
+    """No existe conversión entre las unidades (falta densidad o son de conteo)."""
+
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+        super().__init__(f"No se puede convertir de {source} a {target} sin una densidad para el ingrediente.")
+
+
+def conversion_factor(source, target, density=None):
+    """Factor multiplicativo source → target; `density` en g/ml para masa ↔ volumen."""
+    factor = CONVERSION_TABLE.get((source, target))
+    if factor is not None:
+        return factor
+    try:
+        (source_dimension, source_factor), (target_dimension, target_factor) = BASE_FACTORS[source], BASE_FACTORS[target]
+    except KeyError:
+        raise UnitConversionError(source, target)
+    if density and {source_dimension, target_dimension} == {MASS, VOLUME}:
+        density = Decimal(density)
+        # masa → volumen: ml = g / densidad; volumen → masa: g = ml × densidad
+        if source_dimension == MASS:
+            return source_factor / target_factor / density
+        return source_factor / target_factor * density
+    raise UnitConversionError(source, target)
+
+
+def convert_many(quantities, sources, targets, densities=None):
+    """
+    Convierte listas paralelas de cantidades de `sources` a `targets`
+    (densidades opcionales por posición). Devuelve Decimals con 4 decimales.
+    Lanza UnitConversionError si algún par no es convertible.
+    """
+    quantities, sources, targets = list(quantities), list(sources), list(targets)
+    densities = list(densities) if densities is not None else [None] * len(quantities)
+    factors = {}
+    values = []
+    for quantity, source, target, density in zip(quantities, sources, targets, densities):
+        key = (source, target, density)
+        if key not in factors:
+            factors[key] = conversion_factor(source, target, density)
+        values.append((Decimal(quantity) * factors[key]).quantize(BASE_QUANTITY_PLACES, ROUND_HALF_UP))
+    return values
+
+
+def rebase_recipe_items(ingredient_ids):
+    """
+    Recalcula `base_quantity` de las recetas que usan los ingredientes (tras
+    cambiar su unidad o densidad) con un bulk_update, y luego disponibilidad
+    y costos de los platos afectados. Devuelve los ids de esos platos.
+    """
+    from apps.platos.availability import refresh_dish_availability
+    from apps.platos.costing import invalidate_costs
+    from apps.platos.models import RecipeItem
+
+    items = list(RecipeItem.objects.filter(ingredient_id__in=ingredient_ids).select_related('ingredient'))
+    previous = [item.base_quantity for item in items]
+    RecipeItem.set_base_quantities(items)
+    changed = [item for item, old in zip(items, previous) if item.base_quantity != old]
+    if not changed:
+        return set()
+    RecipeItem.objects.bulk_update(changed, ['base_quantity'])
+    dish_ids = {item.dish_id for item in changed}
+    invalidate_costs(dish_ids)
+    refresh_dish_availability(dish_ids=dish_ids)
+    return dish_ids
@@ -1,12 +1,22 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import IngredientViewSet, InventoryStockViewSet, InventoryTransactionViewSet
+from .views import (
+    IngredientViewSet,
+    InventoryDailySummaryViewSet,
+    InventoryStockViewSet,
+    InventoryTransactionArchiveViewSet,
+    InventoryTransactionViewSet,
+    StockLotViewSet,
+)
 
 
 router = DefaultRouter()
 router.register(r'ingredients', IngredientViewSet, basename='ingredient')
 router.register(r'stocks', InventoryStockViewSet, basename='stock')
+router.register(r'lots', StockLotViewSet, basename='stock-lot')
 router.register(r'transactions', InventoryTransactionViewSet, basename='inventory-transaction')
+router.register(r'ledger/archive', InventoryTransactionArchiveViewSet, basename='transaction-archive')
+router.register(r'ledger/daily', InventoryDailySummaryViewSet, basename='transaction-daily')
 
 
 app_name = 'inventario'
@@ -1,5 +1,7 @@
+import io
+from datetime import timedelta
 from decimal import Decimal
-from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -8,33 +10,52 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
-from .models import Ingredient, InventoryStock, InventoryTransaction
+from apps.pedidos.stats import parse_date_bound
+from core.pagination import CreatedAtCursorPagination
+from .models import (
+    Ingredient, InventoryDailySummary, InventoryStock, InventoryTransaction, InventoryTransactionArchive, StockLot,
+)
 from .serializers import (
     IngredientSerializer,
     InventoryStockSerializer,
     InventoryTransactionSerializer,
+    InventoryTransactionArchiveSerializer,
+    InventoryDailySummarySerializer,
     InventoryAdjustmentSerializer,
+    StockLotSerializer,
+    ReceivingSerializer,
 )
 from .permissions import IsStaffOnly
+from .services import adjust_stock, receive_delivery, InsufficientStock
+from .snapshots import valuation_at
+from .forecasting import reorder_suggestions
+from .catalog_io import FILE_FORMATS, detect_format, export_catalog, import_catalog
 
 
 class IngredientViewSet(viewsets.ModelViewSet):
-    queryset = Ingredient.objects.all()
+    # current_stock se lee del JOIN con inventory_stock, no con una consulta por fila
+    queryset = Ingredient.objects.select_related('stock').all()
     serializer_class = IngredientSerializer
     permission_classes = [IsAuthenticated, IsStaffOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['category', 'unit', 'is_active']
+    filterset_fields = ['category', 'unit', 'is_active', 'supplier']
     search_fields = ['name', 'supplier', 'description']
     ordering_fields = ['name', 'created_at', 'updated_at']
 
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
-        """List ingredients below minimum stock threshold."""
-        items = [i for i in self.get_queryset() if i.is_low_stock()]
-        page = self.paginate_queryset(items)
-        serializer = self.get_serializer(page or items, many=True)
+        """
+        List ingredients below minimum stock threshold (missing stock rows
+        count as 0). Reads the maintained `is_low` flag through a partial
+        index; honours the category/supplier filters, search, ordering and
+        pagination.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).filter(is_low=True)
+        page = self.paginate_queryset(queryset)
         if page is not None:
+            serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
@@ -44,6 +65,50 @@ class IngredientViewSet(viewsets.ModelViewSet):
         ingredient.save(update_fields=['is_active'])
         return Response({'id': ingredient.id, 'is_active': ingredient.is_active})
 
+    @action(detail=False, methods=['get'], url_path='reorder-suggestions')
+    def reorder_suggestions(self, request):
+        """
+        Suggested purchase orders grouped by supplier, from the nightly
+        usage forecast and the current stock. Honours the list filters
+        (e.g. `?supplier=`).
+        """
+        return Response(reorder_suggestions(self.filter_queryset(Ingredient.objects.all())))
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_catalog(self, request):
+        """
+        Upsert the ingredient catalog from an uploaded CSV/NDJSON file (`file`).
+        The upload is parsed line by line and written in chunks; invalid rows
+        are reported by line number and skipped.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'detail': 'A file upload is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('file_format') or detect_format(upload.name)
+        if file_format not in FILE_FORMATS:
+            return Response({'detail': f'file_format must be one of {FILE_FORMATS}.'}, status=status.HTTP_400_BAD_REQUEST)
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            stats = import_catalog(lines, file_format=file_format, user=request.user)
+        except UnicodeDecodeError:
+            return Response({'detail': 'The file must be UTF-8 encoded.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(stats, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the (filtered) catalog with current stock as CSV or NDJSON.
+        Uses `?file_format=` because `format` is reserved for DRF renderers.
+        """
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in FILE_FORMATS:
+            return Response({'detail': f'file_format must be one of {FILE_FORMATS}.'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(Ingredient.objects.all())
+        content_type = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(export_catalog(queryset, file_format), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="ingredients.{file_format}"'
+        return response
+
 
 class InventoryStockViewSet(viewsets.ModelViewSet):
     queryset = InventoryStock.objects.select_related('ingredient').all()
@@ -71,26 +136,64 @@ class InventoryStockViewSet(viewsets.ModelViewSet):
         elif ttype in ('WASTE', 'RETURN'):
             delta = -qty
 
-        new_qty = stock.quantity + delta
-        if new_qty < 0:
+        lot = None
+        if data.get('lot') is not None:
+            lot = StockLot.objects.filter(pk=data['lot'], ingredient_id=stock.ingredient_id).first()
+            if lot is None:
+                return Response({'lot': 'Lot not found for this ingredient.'}, status=status.HTTP_400_BAD_REQUEST)
+            if delta > 0 or lot.quantity < -delta:
+                return Response({'lot': 'Lots can only be consumed, up to their remaining quantity.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # UPDATE condicional atómico + lotes + movimiento del ledger en una transacción
+        try:
+            adjust_stock(
+                stock, delta, ttype, user=request.user, notes=notes, lot=lot,
+                lot_code=data.get('lot_code', ''), expiration_date=data.get('expiration_date'),
+            )
+        except InsufficientStock:
             return Response({'detail': 'Insufficient stock for this adjustment.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        stock.quantity = new_qty
-        # Update restock timestamp if applicable
-        if ttype == 'RESTOCK':
-            stock.last_restocked = timezone.now()
-        stock.save()
-
-        InventoryTransaction.objects.create(
-            ingredient=stock.ingredient,
-            transaction_type=ttype,
-            quantity=delta,
-            balance_after=stock.quantity,
-            notes=notes,
+        return Response(self.get_serializer(stock).data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'])
+    def receive(self, request):
+        """
+        Receive a whole supplier delivery in one request.
+        All lines are validated first; then every stock change and RESTOCK
+        transaction is applied in a single transaction with bulk writes.
+        """
+        serializer = ReceivingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = receive_delivery(
+            serializer.validated_data['lines'],
             user=request.user,
+            notes=serializer.validated_data.get('notes', ''),
         )
+        return Response({'received': len(results), 'lines': results}, status=status.HTTP_201_CREATED)
 
-        return Response(self.get_serializer(stock).data, status=status.HTTP_200_OK)
+    @action(detail=False, methods=['get'])
+    def valuation(self, request):
+        """
+        Stock and valuation of every ingredient at `?at=` (default: now).
+        Dates without time mean end of day, so `?at=2025-09-30` is the
+        month-end close. Answered from the nearest snapshot plus the ledger
+        indexes; optional `category` and `ingredient` filters.
+        """
+        moment = timezone.now()
+        if request.query_params.get('at'):
+            try:
+                moment = parse_date_bound(request.query_params['at'], end=True)
+            except ValueError as exc:
+                return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = Ingredient.objects.all()
+        if request.query_params.get('category'):
+            queryset = queryset.filter(category=request.query_params['category'])
+        if request.query_params.get('ingredient'):
+            ids = request.query_params.getlist('ingredient')
+            if not all(value.isdigit() for value in ids):
+                return Response({'detail': 'ingredient must be an integer id.'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(pk__in=ids)
+        return Response(valuation_at(moment, queryset))
 
 
 class InventoryTransactionViewSet(viewsets.ReadOnlyModelViewSet):
@@ -100,3 +203,66 @@ class InventoryTransactionViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['ingredient', 'transaction_type']
     ordering_fields = ['created_at']
+    ordering = ['-created_at', '-id']
+    # Keyset sobre (created_at, id): sin COUNT(*) ni OFFSET en un ledger que solo crece
+    pagination_class = CreatedAtCursorPagination
+
+
+class InventoryTransactionArchiveViewSet(viewsets.ReadOnlyModelViewSet):
+    """Compacted ledger detail kept for audits (see ledger.py)."""
+    queryset = InventoryTransactionArchive.objects.select_related('ingredient', 'user').all()
+    serializer_class = InventoryTransactionArchiveSerializer
+    permission_classes = [IsAuthenticated, IsStaffOnly]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ['ingredient', 'transaction_type', 'related_order']
+    ordering_fields = ['created_at']
+    ordering = ['-created_at', '-id']
+    pagination_class = CreatedAtCursorPagination
+
+
+class InventoryDailySummaryViewSet(viewsets.ReadOnlyModelViewSet):
+    """Per-ingredient daily totals of compacted ledger rows."""
+    queryset = InventoryDailySummary.objects.select_related('ingredient').all()
+    serializer_class = InventoryDailySummarySerializer
+    permission_classes = [IsAuthenticated, IsStaffOnly]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = {
+        'ingredient': ['exact'],
+        'transaction_type': ['exact'],
+        'day': ['exact', 'gte', 'lte'],
+    }
+    ordering_fields = ['day', 'quantity', 'movements']
+
+
+class StockLotViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = StockLot.objects.select_related('ingredient').all()
+    serializer_class = StockLotSerializer
+    permission_classes = [IsAuthenticated, IsStaffOnly]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ['ingredient', 'ingredient__category', 'expiration_date']
+    ordering_fields = ['expiration_date', 'received_at', 'quantity']
+
+    @action(detail=False, methods=['get'])
+    def expiring(self, request):
+        """
+        Lots with remaining stock expiring within `?days=` (default 7),
+        including already expired ones, soonest first. Served from the
+        partial index on open lots' expiration date.
+        """
+        try:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            return Response({'detail': 'days must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= days <= 365:
+            return Response({'detail': 'days must be between 0 and 365.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        limit = timezone.localdate() + timedelta(days=days)
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            quantity__gt=0, expiration_date__lte=limit
+        ).order_by('expiration_date', 'id')
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
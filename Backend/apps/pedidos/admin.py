@@ -3,9 +3,15 @@ Admin de Pedidos
 ================
 """
 
-from django.contrib import admin
+from functools import partial
+
+from django.contrib import admin, messages
+from django.db import transaction
 from django.utils.html import format_html
-from .models import Order, OrderItem
+from apps.inventario.services import InsufficientStock
+from .events import OrderEventType, order_event_payload, order_events
+from .models import Order, OrderItem, OrderStatus
+from .transitions import InvalidTransition, TransitionConflict, transition_order
 
 
 class OrderItemInline(admin.TabularInline):
@@ -67,21 +73,66 @@ class OrderAdmin(admin.ModelAdmin):
 
     priority_colored.short_description = 'Prioridad'
 
+    def apply_transition(self, request, order, new_status):
+        """
+        Cambia el estado con transitions.transition_order, igual que la API,
+        para que se envíe order_status_changed (descuento de inventario,
+        reservas, rollups) y las pantallas de cocina reciban el evento.
+        Devuelve False y avisa al usuario si la transición no procede.
+        """
+        previous_status = order.status
+        try:
+            with transaction.atomic():
+                transition_order(order, new_status)
+        except (InvalidTransition, TransitionConflict, InsufficientStock) as exc:
+            self.message_user(request, f'Pedido #{order.pk}: {exc}', level=messages.WARNING)
+            return False
+        event_type = OrderEventType.CANCELLED if new_status == OrderStatus.CANCELLED else OrderEventType.STATUS_CHANGED
+        transaction.on_commit(partial(
+            order_events.publish, event_type, order_event_payload(order, previous_status=previous_status)
+        ))
+        return True
+
+    def transition_selected(self, request, queryset, new_status, label):
+        updated = sum(
+            self.apply_transition(request, order, new_status)
+            for order in queryset.order_by('pk')
+        )
+        self.message_user(request, f'{updated} pedidos marcados {label}.')
+
+    def save_model(self, request, obj, form, change):
+        """
+        Al editar solo se escriben los campos modificados en el formulario
+        (update_fields), nunca `status`: un guardado completo devolvería el
+        estado leído al abrir el formulario y pisaría el que haya puesto una
+        tablet o la API mientras tanto. El cambio de estado pasa por la
+        máquina de estados, cuyo UPDATE condicional sobre el estado leído
+        falla (y se avisa) si el pedido cambió en el intervalo.
+        """
+        if not change:
+            super().save_model(request, obj, form, change)
+            return
+        new_status = obj.status
+        obj.status = form.initial['status']
+        columns = {field.name for field in obj._meta.concrete_fields}
+        fields = [name for name in form.changed_data if name in columns and name != 'status']
+        if fields:
+            obj.save(update_fields=fields + ['updated_at'])
+        if new_status != obj.status:
+            self.apply_transition(request, obj, new_status)
+
     def mark_as_confirmed(self, request, queryset):
-        updated = queryset.update(status='CONFIRMED')
-        self.message_user(request, f'{updated} pedidos marcados como confirmados.')
+        self.transition_selected(request, queryset, OrderStatus.CONFIRMED, 'como confirmados')
 
     mark_as_confirmed.short_description = "Marcar como Confirmado"
 
     def mark_as_in_progress(self, request, queryset):
-        updated = queryset.update(status='IN_PROGRESS')
-        self.message_user(request, f'{updated} pedidos marcados en progreso.')
+        self.transition_selected(request, queryset, OrderStatus.IN_PROGRESS, 'en progreso')
 
     mark_as_in_progress.short_description = "Marcar como En Progreso"
 
     def mark_as_ready(self, request, queryset):
-        updated = queryset.update(status='READY')
-        self.message_user(request, f'{updated} pedidos marcados como listos.')
+        self.transition_selected(request, queryset, OrderStatus.READY, 'como listos')
 
     mark_as_ready.short_description = "Marcar como Listo"
 
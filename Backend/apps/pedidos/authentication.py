@@ -0,0 +1,44 @@
+"""
+Autenticación del Stream de Pedidos
+===================================
+RNF-03, RF-01: Pantallas de cocina con EventSource
+
+El EventSource del navegador no permite enviar el header Authorization, así
+que el stream SSE acepta además un token firmado en la query (`?token=`).
+El token se pide con el JWT (POST /api/orders/stream-token/), identifica al
+usuario, vence a los ORDER_EVENTS_TOKEN_MAX_AGE segundos y solo sirve para
+el stream (firma con su propio salt).
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from rest_framework import authentication, exceptions
+
+
+STREAM_TOKEN_SALT = 'pedidos.stream'
+
+
+def stream_token_max_age():
+    return int(getattr(settings, 'ORDER_EVENTS_TOKEN_MAX_AGE', 300))
+
+
+def create_stream_token(user):
+    return signing.dumps({'user': user.pk}, salt=STREAM_TOKEN_SALT)
+
+
+class StreamTokenAuthentication(authentication.BaseAuthentication):
+    """Autentica con `?token=` firmado; sin el parámetro deja pasar a las demás clases."""
+
+    def authenticate(self, request):
+        token = request.query_params.get('token')
+        if not token:
+            return None
+        try:
+            data = signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=stream_token_max_age())
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed('Invalid or expired stream token.')
+        user = get_user_model().objects.filter(pk=data.get('user'), is_active=True).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed('Invalid or expired stream token.')
+        return user, None
@@ -0,0 +1,286 @@
+"""
+Eventos de Pedidos (Server-Sent Events)
+=======================================
+RF-01, RF-04: Pantallas de cocina en tiempo real
+
+Las pantallas de cocina reciben los cambios de pedidos por un stream SSE en
+lugar de sondear `GET /api/orders/active/`. Cada evento se serializa una sola
+vez al publicarse y se reparte a todas las conexiones abiertas, de modo que
+N pantallas cuestan un fan-out y no N consultas del listado completo.
+
+El broker guarda los últimos ORDER_EVENTS_BUFFER_SIZE eventos para reanudar
+desde `Last-Event-ID`. Los ids tienen la forma "<token>-<secuencia>": si el
+proceso se reinició o el cliente quedó fuera del buffer se emite un evento
+`reset` para que la pantalla recargue el listado una vez.
+
+Con REDIS_URL (docker-compose) el log de eventos es un stream de Redis
+compartido por todos los workers de gunicorn: un evento publicado en un
+worker llega a las pantallas conectadas a cualquier otro. Sin Redis se usa un
+buffer en memoria, válido solo con un proceso (desarrollo y tests).
+
+Cada conexión dura como máximo ORDER_EVENTS_STREAM_TIMEOUT segundos, por
+debajo del --timeout de gunicorn; EventSource se reconecta solo. Los
+workers son gthread, así que una pantalla ocupa un hilo y no un worker.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+logger = logging.getLogger(__name__)
+
+
+class OrderEventType:
+    CREATED = 'order.created'
+    STATUS_CHANGED = 'order.status_changed'
+    CANCELLED = 'order.cancelled'
+    RESET = 'reset'
+
+
+def format_event(event_type, payload, event_id=None):
+    """Formatea un evento según el protocolo text/event-stream."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    for line in payload.splitlines() or ['']:
+        lines.append(f'data: {line}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Permite negociar `Accept: text/event-stream` (EventSource) en acciones DRF."""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Solo se usa para respuestas de error; el stream se envía como StreamingHttpResponse
+        return format_event('error', json.dumps(data, cls=DjangoJSONEncoder)).encode(self.charset)
+
+
+class BaseOrderEventBroker:
+    """
+    Generador text/event-stream común. Las subclases implementan
+    `parse_event_id`, `position`, `event_id`, `events_after` y `wait` sobre
+    una posición opaca del log de eventos.
+    """
+
+    def stream(self, last_event_id=None, timeout=None, heartbeat=None):
+        """
+        Envía los eventos pendientes desde `last_event_id` y luego espera
+        nuevos hasta `timeout` segundos (acotado por ORDER_EVENTS_STREAM_TIMEOUT
+        para no superar el timeout del worker); el cliente EventSource se
+        reconecta solo con el último id recibido.
+        """
+        limit = getattr(settings, 'ORDER_EVENTS_STREAM_TIMEOUT', 25)
+        timeout = limit if timeout is None else min(timeout, limit)
+        heartbeat = heartbeat or getattr(settings, 'ORDER_EVENTS_HEARTBEAT', 15)
+        deadline = time.monotonic() + timeout
+
+        yield 'retry: 3000\n\n'
+        position = self.parse_event_id(last_event_id)
+        if position is None:
+            position = self.position()
+            yield format_event(OrderEventType.RESET, '{}', self.event_id(position))
+
+        while True:
+            events, reset = self.events_after(position)
+            if reset:
+                yield format_event(OrderEventType.RESET, '{}')
+            for event_position, event_type, payload in events:
+                position = event_position
+                yield format_event(event_type, payload, self.event_id(event_position))
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self.wait(position, min(heartbeat, remaining)):
+                yield ': keep-alive\n\n'
+
+
+class OrderEventBroker(BaseOrderEventBroker):
+    """
+    Buffer circular en memoria con espera bloqueante. Solo reparte eventos
+    dentro del proceso: se usa en desarrollo y tests (sin REDIS_URL).
+    """
+
+    def __init__(self, maxlen=None):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=maxlen or getattr(settings, 'ORDER_EVENTS_BUFFER_SIZE', 1000))
+        self._sequence = 0
+        self.token = uuid.uuid4().hex[:8]
+
+    @property
+    def last_event_id(self):
+        return self.event_id(self._sequence)
+
+    def position(self):
+        return self._sequence
+
+    def event_id(self, sequence):
+        return f'{self.token}-{sequence}'
+
+    def publish(self, event_type, data):
+        """Serializa el evento una vez y despierta a todos los streams."""
+        payload = json.dumps(data, cls=DjangoJSONEncoder)
+        with self._condition:
+            self._sequence += 1
+            self._events.append((self._sequence, event_type, payload))
+            self._condition.notify_all()
+        return self.event_id(self._sequence)
+
+    def parse_event_id(self, event_id):
+        """
+        Devuelve la secuencia desde la cual reanudar, o None si el id no
+        pertenece a este proceso (el cliente debe recargar el estado).
+        """
+        if not event_id:
+            return self._sequence
+        token, _, sequence = str(event_id).rpartition('-')
+        if token != self.token:
+            return None
+        try:
+            sequence = int(sequence)
+        except ValueError:
+            return None
+        return sequence if sequence <= self._sequence else None
+
+    def events_after(self, sequence):
+        """Eventos posteriores a `sequence`; reset=True si ya salieron del buffer."""
+        with self._condition:
+            events = [event for event in self._events if event[0] > sequence]
+            oldest = self._events[0][0] if self._events else self._sequence + 1
+        reset = sequence < oldest - 1
+        return events, reset
+
+    def wait(self, sequence, timeout):
+        """Bloquea hasta que haya eventos posteriores a `sequence` o venza el timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._sequence > sequence, timeout=timeout)
+
+
+def _stream_id(value):
+    """Id de entrada de un stream de Redis ("<ms>-<seq>") como tupla comparable, o None."""
+    milliseconds, _, sequence = str(value).partition('-')
+    if not (milliseconds.isdigit() and sequence.isdigit()):
+        return None
+    return int(milliseconds), int(sequence)
+
+
+class RedisOrderEventBroker(BaseOrderEventBroker):
+    """
+    Log de eventos compartido por todos los workers en un stream de Redis
+    (XADD acotado a ORDER_EVENTS_BUFFER_SIZE). Cada conexión lee con XRANGE
+    y espera con XREAD BLOCK, y el id de la entrada sirve como Last-Event-ID,
+    así que reanudar funciona aunque el cliente cambie de worker.
+    """
+
+    def __init__(self, client, key='smartkitchen:order-events', maxlen=None):
+        self.client = client
+        self.key = key
+        self.maxlen = maxlen or getattr(settings, 'ORDER_EVENTS_BUFFER_SIZE', 1000)
+
+    @property
+    def last_event_id(self):
+        return self.position()
+
+    def position(self):
+        latest = self.client.xrevrange(self.key, count=1)
+        return latest[0][0] if latest else '0-0'
+
+    def event_id(self, position):
+        return position
+
+    def publish(self, event_type, data):
+        """
+        Agrega el evento al stream. Se llama en on_commit: si Redis falla se
+        registra en el log y el pedido ya confirmado no se ve afectado (las
+        pantallas se resincronizan con `reset` al reconectar).
+        """
+        payload = json.dumps(data, cls=DjangoJSONEncoder)
+        try:
+            return self.client.xadd(
+                self.key, {'type': event_type, 'data': payload}, maxlen=self.maxlen, approximate=True
+            )
+        except Exception:
+            logger.exception('No se pudo publicar el evento %s', event_type)
+            return None
+
+    def parse_event_id(self, event_id):
+        """Id de Redis desde el cual reanudar, o None si no es válido o es futuro."""
+        if not event_id:
+            return self.position()
+        parsed = _stream_id(event_id)
+        if parsed is None or parsed > _stream_id(self.position()):
+            return None
+        return str(event_id)
+
+    def events_after(self, position):
+        """Entradas posteriores a `position`; reset=True si el stream ya las recortó."""
+        entries = self.client.xrange(self.key, min=f'({position}', count=self.maxlen)
+        events = [(entry_id, fields['type'], fields['data']) for entry_id, fields in entries]
+        return events, bool(entries) and self._trimmed_after(position)
+
+    def _trimmed_after(self, position):
+        # XINFO STREAM (Redis >= 7) informa el id más alto eliminado por XADD MAXLEN
+        info = self.client.xinfo_stream(self.key)
+        deleted = _stream_id(info.get('max-deleted-entry-id', '0-0'))
+        return deleted is not None and deleted > _stream_id(position)
+
+    def wait(self, position, timeout):
+        """XREAD BLOCK hasta que llegue una entrada posterior a `position` o venza el timeout."""
+        milliseconds = max(1, int(timeout * 1000))
+        return bool(self.client.xread({self.key: position}, count=1, block=milliseconds))
+
+
+def create_broker():
+    """Broker en Redis si REDIS_URL está definido (varios workers), en memoria si no."""
+    url = getattr(settings, 'REDIS_URL', '')
+    if url:
+        try:
+            import redis
+        except ImportError:  # pragma: no cover - redis está en requirements.txt
+            logger.warning('REDIS_URL definido pero el paquete redis no está instalado; eventos en memoria')
+        else:
+            return RedisOrderEventBroker(redis.Redis.from_url(url, decode_responses=True))
+    return OrderEventBroker()
+
+
+def order_event_payload(order, previous_status=None, include_items=False):
+    """Payload compacto de un pedido para las pantallas de cocina."""
+    data = {
+        'id': order.id,
+        'status': order.status,
+        'priority': order.priority,
+        'order_type': order.order_type,
+        'table_number': order.table_number,
+        'estimated_time': order.estimated_time,
+        'updated_at': order.updated_at,
+    }
+    if previous_status is not None:
+        data['previous_status'] = previous_status
+    if include_items:
+        data['notes'] = order.notes
+        data['created_at'] = order.created_at
+        data['items'] = [
+            {
+                'dish': item.dish_id,
+                'dish_name': item.dish.name,
+                'quantity': item.quantity,
+                'special_instructions': item.special_instructions,
+            }
+            for item in order.items.all()
+        ]
+    return data
+
+
+order_events = create_broker()
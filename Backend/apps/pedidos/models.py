@@ -114,8 +114,8 @@ class Order(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status', 'priority']),
-            models.Index(fields=['customer', 'created_at']),
-            models.Index(fields=['created_at']),
+            models.Index(fields=['customer', 'created_at', 'id']),
+            models.Index(fields=['created_at', 'id']),
         ]
 
     def __str__(self):
@@ -187,6 +187,10 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.quantity}× {self.dish.name}"
 
-    def save(self, *args, **kwargs):
+    def calculate_subtotal(self):
         self.subtotal = self.quantity * self.unit_price
+        return self.subtotal
+
+    def save(self, *args, **kwargs):
+        self.calculate_subtotal()
         super().save(*args, **kwargs)
@@ -3,12 +3,34 @@ Serializadores de Pedidos
 =========================
 """
 
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 from .models import Order, OrderItem, OrderStatus, OrderPriority
+from .signals import order_placed
+from .transitions import can_transition
 from apps.platos.models import Dish
 
 
+class PrefetchedDishField(serializers.PrimaryKeyRelatedField):
+    """
+    Resuelve el plato desde el caché precargado por OrderCreateSerializer
+    (context['prefetched_dishes']) para no consultar la BD por cada línea.
+    """
+
+    def to_internal_value(self, data):
+        dishes = self.context.get('prefetched_dishes')
+        if dishes is not None:
+            try:
+                return dishes[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass  # Delegar para obtener el mensaje de error estándar
+        return super().to_internal_value(data)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
+    dish = PrefetchedDishField(queryset=Dish.objects.all())
     dish_name = serializers.CharField(source='dish.name', read_only=True)
     dish_category = serializers.CharField(source='dish.get_category_display', read_only=True)
 
@@ -74,18 +96,46 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             })
         return attrs
 
+    def to_internal_value(self, data):
+        """
+        Precarga en una sola pasada todos los platos del pedido con su receta
+        e inventario, para que validate_dish no genere consultas por línea.
+        """
+        items = data.get('items') if hasattr(data, 'get') else None
+        if isinstance(items, list):
+            dish_ids = set()
+            for item in items:
+                try:
+                    dish_ids.add(int(item.get('dish')))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            dishes = Dish.objects.filter(pk__in=dish_ids).prefetch_related('recipe_items__ingredient__stock')
+            self.context['prefetched_dishes'] = {dish.pk: dish for dish in dishes}
+        return super().to_internal_value(data)
+
     def create(self, validated_data):
+        """
+        Crea el pedido y sus items con un número fijo de consultas:
+        el total se calcula en memoria, el pedido se escribe una sola vez
+        y los items se insertan con bulk_create.
+        """
         items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
+        items = []
         for item_data in items_data:
             dish = item_data.pop('dish')
-            OrderItem.objects.create(
-                order=order,
-                dish=dish,
-                unit_price=dish.price,
-                **item_data
-            )
-        order.calculate_total()
+            item = OrderItem(dish=dish, unit_price=dish.price, **item_data)
+            item.calculate_subtotal()
+            items.append(item)
+        validated_data['total_amount'] = sum((item.subtotal for item in items), Decimal('0.00'))
+
+        with transaction.atomic():
+            order = Order.objects.create(**validated_data)
+            for item in items:
+                item.order = order
+            OrderItem.objects.bulk_create(items)
+            order_placed.send(sender=Order, instance=order, created=True, items=items)
+
+        prefetch_related_objects([order], Prefetch('items', queryset=OrderItem.objects.select_related('dish')))
         return order
 
 
@@ -95,15 +145,7 @@ class OrderStatusUpdateSerializer(serializers.Serializer):
 
     def validate_status(self, value):
         order = self.context.get('order')
-        valid_transitions = {
-            OrderStatus.PENDING: [OrderStatus.CONFIRMED, OrderStatus.CANCELLED],
-            OrderStatus.CONFIRMED: [OrderStatus.IN_PROGRESS, OrderStatus.CANCELLED],
-            OrderStatus.IN_PROGRESS: [OrderStatus.READY, OrderStatus.CANCELLED],
-            OrderStatus.READY: [OrderStatus.DELIVERED],
-            OrderStatus.DELIVERED: [],
-            OrderStatus.CANCELLED: [],
-        }
-        if value not in valid_transitions.get(order.status, []):
+        if not can_transition(order.status, value):
             raise serializers.ValidationError(
                 f"Transición inválida de {order.get_status_display()} a {dict(OrderStatus.choices)[value]}."
             )
@@ -3,31 +3,63 @@ Señales de Pedidos
 ==================
 """
 
+import logging
+
 from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 from django.utils import timezone
+from apps.platos.popularity import record_order
 from .models import Order, OrderStatus
 
 
+logger = logging.getLogger(__name__)
+
+
+# Enviada por OrderCreateSerializer cuando el pedido y sus items ya están escritos.
+# Argumentos: instance (Order), created (True), items (lista de OrderItem)
+order_placed = Signal()
+
+# Enviada por transitions.transition_order tras el UPDATE condicional de estado.
+# Argumentos: instance (Order ya actualizado), previous (valores anteriores de los campos escritos)
+order_status_changed = Signal()
+
+
 @receiver(post_save, sender=Order)
 def handle_order_status_change(sender, instance, created, **kwargs):
     if created:
-        print(f"Nuevo pedido creado: #{instance.id}")
+        logger.info("Nuevo pedido creado: #%s", instance.id)
     else:
         if instance.status == OrderStatus.CONFIRMED:
-            print(f"Pedido #{instance.id} confirmado - descontar inventario")
+            logger.info("Pedido #%s confirmado", instance.id)
         elif instance.status == OrderStatus.READY:
-            print(f"Pedido #{instance.id} listo para entrega")
+            logger.info("Pedido #%s listo para entrega", instance.id)
         elif instance.status == OrderStatus.DELIVERED:
             if not instance.completed_at:
                 instance.completed_at = timezone.now()
                 instance.save(update_fields=['completed_at'])
-            print(f"Pedido #{instance.id} entregado")
+            logger.info("Pedido #%s entregado", instance.id)
 
 
-@receiver(post_save, sender=Order)
-def update_dish_popularity(sender, instance, created, **kwargs):
+@receiver(order_status_changed, sender=Order)
+def handle_order_transition(sender, instance, previous, **kwargs):
+    # El descuento de inventario al confirmar vive en apps.inventario.signals
+    if instance.status == OrderStatus.CONFIRMED:
+        logger.info("Pedido #%s confirmado", instance.id)
+    elif instance.status == OrderStatus.READY:
+        logger.info("Pedido #%s listo para entrega", instance.id)
+    elif instance.status == OrderStatus.DELIVERED:
+        logger.info("Pedido #%s entregado", instance.id)
+
+
+@receiver(order_placed, sender=Order)
+def update_dish_popularity(sender, instance, created=True, items=None, **kwargs):
+    """
+    Registra los incrementos de popularidad en la transacción del pedido
+    (solo INSERT); flush_popularity los aplica a los platos (RF-03).
+    """
     if created:
-        for item in instance.items.all():
-            item.dish.popularity_score += 1
-            item.dish.save(update_fields=['popularity_score'])
+        if items is None:
+            dish_ids = list(instance.items.values_list('dish_id', flat=True))
+        else:
+            dish_ids = [item.dish_id for item in items]
+        record_order(dish_ids)
@@ -0,0 +1,87 @@
+"""
+Estadísticas de Pedidos
+=======================
+RF-06: Reportes y analytics
+
+Calcula los indicadores del dashboard de pedidos con una única consulta
+de agregación condicional (COUNT ... FILTER / CASE WHEN) en lugar de un
+COUNT por estado/prioridad y sumas en Python.
+"""
+
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Order, OrderStatus, OrderPriority
+
+
+ORDER_TYPES = [choice[0] for choice in Order.ORDER_TYPE_CHOICES]
+
+
+def parse_date_bound(value, end=False):
+    """
+    Convierte un parámetro de fecha (YYYY-MM-DD o ISO 8601) en un datetime aware.
+
+    Para fechas sin hora, el límite inferior es el inicio del día y el
+    superior el final del día. Lanza ValueError si el formato no es válido.
+    """
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Fecha inválida: '{value}'.")
+        parsed = datetime.combine(day, time.max if end else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_orders(queryset, date_from=None, date_to=None, order_type=None):
+    """Aplica los filtros de rango de fechas (created_at) y tipo de pedido."""
+    if date_from:
+        queryset = queryset.filter(created_at__gte=parse_date_bound(date_from))
+    if date_to:
+        queryset = queryset.filter(created_at__lte=parse_date_bound(date_to, end=True))
+    if order_type:
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"Tipo de pedido inválido: '{order_type}'.")
+        queryset = queryset.filter(order_type=order_type)
+    return queryset
+
+
+def order_stats(queryset):
+    """
+    Devuelve las estadísticas de pedidos del queryset en un solo round trip.
+
+    Estructura de respuesta compatible con el endpoint histórico:
+    total_orders, by_status, by_priority, total_revenue, average_order_value.
+    """
+    aggregates = {
+        'total_orders': Count('id'),
+        'total_revenue': Coalesce(Sum('total_amount'), Decimal('0.00')),
+    }
+    for code, _label in OrderStatus.choices:
+        aggregates[f'status_{code}'] = Count('id', filter=Q(status=code))
+    for code, _label in OrderPriority.choices:
+        aggregates[f'priority_{code}'] = Count('id', filter=Q(priority=code))
+
+    # order_by() elimina el ordenamiento por defecto y select/prefetch no aplican al agregado
+    result = queryset.order_by().aggregate(**aggregates)
+
+    total_orders = result['total_orders']
+    total_revenue = Decimal(result['total_revenue']).quantize(Decimal('0.01'))
+    average = (
+        (total_revenue / total_orders).quantize(Decimal('0.01'))
+        if total_orders > 0 else 0
+    )
+    return {
+        'total_orders': total_orders,
+        'by_status': {code: result[f'status_{code}'] for code, _label in OrderStatus.choices},
+        'by_priority': {code: result[f'priority_{code}'] for code, _label in OrderPriority.choices},
+        'total_revenue': total_revenue,
+        'average_order_value': average,
+    }
@@ -1,4 +1,6 @@
 import pytest
+from decimal import Decimal
+from django.contrib import messages
 from django.contrib.admin.sites import AdminSite
 from django.contrib.messages.storage.fallback import FallbackStorage
 from django.contrib.sessions.middleware import SessionMiddleware
@@ -7,12 +9,15 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from apps.usuarios.models import User
-from apps.platos.models import Dish, DishCategory
+from apps.platos.models import Dish, DishCategory, RecipeItem
+from apps.inventario.models import Ingredient, InventoryStock, InventoryTransaction
 from apps.pedidos.models import Order, OrderItem, OrderPriority, OrderStatus
 from apps.pedidos.admin import OrderAdmin
+from apps.pedidos.transitions import transition_order
 from django.apps import apps as django_apps
 from apps.pedidos.permissions import IsOwnerOrStaff, IsStaffOrReadOnlyOwn, IsStaffOnly
 from apps.pedidos.signals import update_dish_popularity
+from apps.platos.popularity import flush_popularity
 
 
 @pytest.fixture
@@ -68,6 +73,86 @@ def test_admin_colored_fields_and_actions(rf, admin_user, customer_user, dish):
     order.refresh_from_db(); assert order.status == OrderStatus.READY
 
 
+def admin_request(rf, user):
+    req = rf.post('/')
+    req.user = user
+    SessionMiddleware(lambda r: None).process_request(req)
+    req.session.save()
+    setattr(req, '_messages', FallbackStorage(req))
+    return req
+
+
+@pytest.mark.django_db
+def test_admin_status_changes_go_through_transitions(rf, admin_user, customer_user, dish):
+    salt = Ingredient.objects.create(name='Sal')
+    InventoryStock.objects.create(ingredient=salt, quantity=Decimal('1.00'))
+    RecipeItem.objects.create(dish=dish, ingredient=salt, quantity=Decimal('0.10'))
+    orders = [Order.objects.create(customer=customer_user, status=OrderStatus.PENDING) for _ in range(2)]
+    for order in orders:
+        OrderItem.objects.create(order=order, dish=dish, quantity=1, unit_price=dish.price)
+    admin = OrderAdmin(Order, AdminSite())
+    req = admin_request(rf, admin_user)
+
+    # The bulk action deducts stock like the API confirmation
+    admin.mark_as_confirmed(req, Order.objects.filter(pk=orders[0].pk))
+    assert InventoryTransaction.objects.filter(related_order=orders[0], transaction_type='USAGE').exists()
+    assert InventoryStock.objects.get(ingredient=salt).quantity == Decimal('0.90')
+
+    # Invalid transitions are reported instead of applied
+    admin.mark_as_ready(req, Order.objects.filter(pk=orders[1].pk))
+    orders[1].refresh_from_db()
+    assert orders[1].status == OrderStatus.PENDING
+    assert any(m.level == messages.WARNING for m in messages.get_messages(req))
+
+    # Form saves route the status change through the state machine too
+    form = admin.get_form(req, orders[1])(instance=orders[1], data={
+        'customer': customer_user.id, 'status': OrderStatus.CONFIRMED, 'priority': orders[1].priority,
+        'order_type': orders[1].order_type, 'table_number': '', 'total_amount': '5.00',
+        'estimated_time': 15, 'actual_time': '', 'notes': 'admin',
+    })
+    assert form.is_valid(), form.errors
+    admin.save_model(req, form.save(commit=False), form, change=True)
+    orders[1].refresh_from_db()
+    assert (orders[1].status, orders[1].notes) == (OrderStatus.CONFIRMED, 'admin')
+    assert InventoryStock.objects.get(ingredient=salt).quantity == Decimal('0.80')
+
+
+def order_form(admin, req, order, **changes):
+    data = {
+        'customer': order.customer_id, 'status': order.status, 'priority': order.priority,
+        'order_type': order.order_type, 'table_number': '', 'total_amount': '5.00',
+        'estimated_time': 15, 'actual_time': '', 'notes': order.notes, **changes,
+    }
+    form = admin.get_form(req, order)(instance=order, data=data)
+    assert form.is_valid(), form.errors
+    return form
+
+
+@pytest.mark.django_db
+def test_admin_save_never_writes_back_a_stale_status(rf, admin_user, customer_user, dish):
+    order = Order.objects.create(customer=customer_user, status=OrderStatus.PENDING)
+    admin = OrderAdmin(Order, AdminSite())
+    req = admin_request(rf, admin_user)
+
+    # The form is loaded while PENDING; a tablet confirms and starts the order
+    loaded = Order.objects.get(pk=order.pk)
+    edit_notes = order_form(admin, req, loaded, notes='sin sal')
+    cancel = order_form(admin, req, Order.objects.get(pk=order.pk), status=OrderStatus.CANCELLED)
+    transition_order(order, OrderStatus.CONFIRMED)
+    transition_order(order, OrderStatus.IN_PROGRESS)
+
+    # Editing other fields keeps the tablet's status
+    admin.save_model(req, edit_notes.save(commit=False), edit_notes, change=True)
+    order.refresh_from_db()
+    assert (order.status, order.notes) == (OrderStatus.IN_PROGRESS, 'sin sal')
+
+    # A status change based on the stale form is rejected, not applied
+    admin.save_model(req, cancel.save(commit=False), cancel, change=True)
+    order.refresh_from_db()
+    assert order.status == OrderStatus.IN_PROGRESS
+    assert any(f'#{order.pk}' in str(m) for m in messages.get_messages(req) if m.level == messages.WARNING)
+
+
 @pytest.mark.django_db
 def test_ready_method_safe_to_call():
     # Ensure ready() does not raise when called on the real AppConfig
@@ -122,9 +207,11 @@ def test_permissions_negative_branches(rf, customer_user, staff_user):
 def test_signals_update_dish_popularity(customer_user, dish):
     order = Order.objects.create(customer=customer_user, status=OrderStatus.PENDING)
     OrderItem.objects.create(order=order, dish=dish, quantity=1, unit_price=dish.price)
-    # Manually invoke to cover loop body
+    # Manually invoke to cover loop body; increments are stored until flush_popularity
     update_dish_popularity(Order, order, created=True)
-    dish.refresh_from_db(); assert dish.popularity_score >= 1
+    flush_popularity()
+    dish.refresh_from_db()
+    assert dish.popularity_score >= 1
 
 
 @pytest.mark.django_db
@@ -0,0 +1,215 @@
+import json
+import threading
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.platos.models import Dish
+from apps.pedidos.models import Order, OrderStatus
+from apps.pedidos.events import (
+    OrderEventBroker, OrderEventType, RedisOrderEventBroker, create_broker, format_event, order_events,
+)
+
+
+def parse_stream(body):
+    events = []
+    for block in body.split('\n\n'):
+        fields = {}
+        for line in block.splitlines():
+            key, _, value = line.partition(': ')
+            fields.setdefault(key, []).append(value)
+        if 'event' in fields:
+            events.append({
+                'id': fields.get('id', [None])[0],
+                'event': fields['event'][0],
+                'data': json.loads('\n'.join(fields['data'])),
+            })
+    return events
+
+
+class StreamClient:
+    """In-memory stand-in for the redis-py stream commands the broker uses."""
+
+    def __init__(self):
+        self.entries = []
+        self.max_deleted = '0-0'
+        self.sequence = 0
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        self.sequence += 1
+        self.entries.append((f'{self.sequence}-0', dict(fields)))
+        while maxlen and len(self.entries) > maxlen:
+            self.max_deleted = self.entries.pop(0)[0]
+        return self.entries[-1][0]
+
+    def xrange(self, key, min='-', max='+', count=None):
+        after = int(min[1:].split('-')[0]) if min.startswith('(') else 0
+        return [entry for entry in self.entries if int(entry[0].split('-')[0]) > after][:count]
+
+    def xrevrange(self, key, max='+', min='-', count=None):
+        return list(reversed(self.entries))[:count]
+
+    def xread(self, streams, count=None, block=None):
+        (key, position), = streams.items()
+        entries = self.xrange(key, min=f'({position}', count=count)
+        return [[key, entries]] if entries else []
+
+    def xinfo_stream(self, key):
+        return {'max-deleted-entry-id': self.max_deleted}
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(username='sse_staff', password='p', role='STAFF')
+
+
+@pytest.fixture
+def customer_user():
+    return User.objects.create_user(username='sse_customer', password='p', role='CUSTOMER')
+
+
+def test_broker_resume_and_reset():
+    broker = OrderEventBroker(maxlen=2)
+    first = broker.publish(OrderEventType.CREATED, {'id': 1})
+    broker.publish(OrderEventType.STATUS_CHANGED, {'id': 1, 'status': 'CONFIRMED'})
+
+    events = parse_stream(''.join(broker.stream(first, timeout=0)))
+    assert [e['event'] for e in events] == [OrderEventType.STATUS_CHANGED]
+
+    # Events dropped from the buffer or foreign ids force a reset
+    broker.publish(OrderEventType.CANCELLED, {'id': 1})
+    broker.publish(OrderEventType.CREATED, {'id': 2})
+    events = parse_stream(''.join(broker.stream(first, timeout=0)))
+    assert events[0]['event'] == OrderEventType.RESET
+    events = parse_stream(''.join(broker.stream('otro-7', timeout=0)))
+    assert events == [{'id': broker.last_event_id, 'event': OrderEventType.RESET, 'data': {}}]
+    assert broker.parse_event_id(f'{broker.token}-x') is None
+    assert broker.parse_event_id(f'{broker.token}-999') is None
+
+
+def test_broker_wakes_waiting_stream_and_sends_heartbeat():
+    broker = OrderEventBroker()
+    stream = broker.stream(broker.last_event_id, timeout=5, heartbeat=0.01)
+    assert next(stream).startswith('retry')
+    assert next(stream) == ': keep-alive\n\n'
+
+    timer = threading.Timer(0.05, broker.publish, args=(OrderEventType.CREATED, {'id': 9}))
+    timer.start()
+    chunk = next(stream)
+    while chunk.startswith(':'):
+        chunk = next(stream)
+    timer.join()
+    assert parse_stream(chunk)[0]['data'] == {'id': 9}
+    assert format_event('x', '') == 'event: x\ndata: \n\n'
+
+
+def test_redis_broker_shares_events_and_resumes_by_entry_id(settings):
+    settings.ORDER_EVENTS_STREAM_TIMEOUT = 0
+    client = StreamClient()
+    publisher = RedisOrderEventBroker(client, maxlen=2)
+    # Another worker: same Redis stream, its own broker instance
+    reader = RedisOrderEventBroker(client, maxlen=2)
+    assert reader.last_event_id == '0-0'
+
+    first = publisher.publish(OrderEventType.CREATED, {'id': 1})
+    publisher.publish(OrderEventType.STATUS_CHANGED, {'id': 1, 'status': 'CONFIRMED'})
+    events = parse_stream(''.join(reader.stream(first, timeout=5)))
+    assert [(e['id'], e['event']) for e in events] == [('2-0', OrderEventType.STATUS_CHANGED)]
+    assert reader.wait('1-0', 0.01) and not reader.wait('2-0', 0.01)
+
+    # Trimmed entries and unknown ids force a reset
+    publisher.publish(OrderEventType.CANCELLED, {'id': 1})
+    publisher.publish(OrderEventType.CREATED, {'id': 2})
+    events = parse_stream(''.join(reader.stream(first)))
+    assert [e['event'] for e in events] == [OrderEventType.RESET, OrderEventType.CANCELLED, OrderEventType.CREATED]
+    for unknown in ['otro-7', '99-0']:
+        events = parse_stream(''.join(reader.stream(unknown)))
+        assert events == [{'id': '4-0', 'event': OrderEventType.RESET, 'data': {}}]
+    assert parse_stream(''.join(reader.stream(None))) == []
+
+    # Publishing failures are logged, never raised into on_commit
+    client.xadd = None
+    assert publisher.publish(OrderEventType.CREATED, {'id': 3}) is None
+    settings.REDIS_URL = ''
+    assert isinstance(create_broker(), OrderEventBroker)
+
+
+@pytest.mark.django_db
+def test_order_views_publish_events_to_stream(staff_user, customer_user, settings, django_capture_on_commit_callbacks):
+    settings.ORDER_EVENTS_STREAM_TIMEOUT = 0
+    dish = Dish.objects.create(name='SSE Dish', description='d', price=Decimal('4.00'))
+    start = order_events.last_event_id
+    api = APIClient()
+
+    api.force_authenticate(user=customer_user)
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = api.post(reverse('pedidos:order-list'), {
+            'customer': customer_user.id, 'order_type': 'TAKEOUT',
+            'items': [{'dish': dish.id, 'quantity': 2}],
+        }, format='json')
+    assert resp.status_code == status.HTTP_201_CREATED
+    order = Order.objects.get(customer=customer_user)
+
+    api.force_authenticate(user=staff_user)
+    with django_capture_on_commit_callbacks(execute=True):
+        api.patch(reverse('pedidos:order-update-status', args=[order.id]), {'status': OrderStatus.CONFIRMED}, format='json')
+        api.post(reverse('pedidos:order-cancel', args=[order.id]))
+
+    url = reverse('pedidos:order-stream')
+    resp = api.get(url, HTTP_LAST_EVENT_ID=start, HTTP_ACCEPT='text/event-stream')
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp['Content-Type'] == 'text/event-stream'
+    events = parse_stream(b''.join(resp.streaming_content).decode())
+    assert [e['event'] for e in events] == [
+        OrderEventType.CREATED, OrderEventType.STATUS_CHANGED, OrderEventType.CANCELLED
+    ]
+    assert events[0]['data']['items'][0]['dish_name'] == 'SSE Dish'
+    assert events[1]['data']['previous_status'] == OrderStatus.PENDING
+    assert events[2]['data']['status'] == OrderStatus.CANCELLED
+
+    # Resume with the query parameter from the second event
+    resp = api.get(url, {'last_event_id': events[1]['id']})
+    assert [e['event'] for e in parse_stream(b''.join(resp.streaming_content).decode())] == [OrderEventType.CANCELLED]
+
+    # Customers cannot subscribe; errors render for EventSource clients too
+    api.force_authenticate(user=customer_user)
+    resp = api.get(url, HTTP_ACCEPT='text/event-stream')
+    assert resp.status_code == status.HTTP_403_FORBIDDEN
+    assert resp.content.startswith(b'event: error')
+
+
+@pytest.mark.django_db
+def test_event_source_connects_with_a_signed_query_token(staff_user, customer_user, settings):
+    settings.ORDER_EVENTS_STREAM_TIMEOUT = 0
+    api = APIClient()
+    url = reverse('pedidos:order-stream')
+    # No Authorization header, as with a browser EventSource
+    assert api.get(url, HTTP_ACCEPT='text/event-stream').status_code == status.HTTP_401_UNAUTHORIZED
+
+    api.force_authenticate(user=staff_user)
+    resp = api.post(reverse('pedidos:order-stream-token'))
+    assert resp.status_code == status.HTTP_200_OK and resp.data['expires_in'] == settings.ORDER_EVENTS_TOKEN_MAX_AGE
+    token = resp.data['token']
+    api.force_authenticate(user=None)
+
+    resp = api.get(url, {'token': token}, HTTP_ACCEPT='text/event-stream')
+    assert resp.status_code == status.HTTP_200_OK and resp['Content-Type'] == 'text/event-stream'
+    b''.join(resp.streaming_content)
+
+    # Tampered or expired tokens are rejected, and the token only opens the stream
+    assert api.get(url, {'token': token + 'x'}).status_code == status.HTTP_401_UNAUTHORIZED
+    assert api.get(reverse('pedidos:order-list'), {'token': token}).status_code == status.HTTP_401_UNAUTHORIZED
+    settings.ORDER_EVENTS_TOKEN_MAX_AGE = -1
+    assert api.get(url, {'token': token}).status_code == status.HTTP_401_UNAUTHORIZED
+    settings.ORDER_EVENTS_TOKEN_MAX_AGE = 300
+
+    # Customers can neither get a token nor use one issued before a role change
+    api.force_authenticate(user=customer_user)
+    assert api.post(reverse('pedidos:order-stream-token')).status_code == status.HTTP_403_FORBIDDEN
+    api.force_authenticate(user=None)
+    User.objects.filter(pk=staff_user.pk).update(role='CUSTOMER')
+    assert api.get(url, {'token': token}).status_code == status.HTTP_403_FORBIDDEN
+    User.objects.filter(pk=staff_user.pk).update(is_active=False)
+    assert api.get(url, {'token': token}).status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,49 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.pedidos.models import Order, OrderStatus
+
+
+@pytest.fixture
+def customer_user():
+    return User.objects.create_user(username='cursor_customer', password='p', role='CUSTOMER')
+
+
+@pytest.mark.django_db
+def test_order_list_uses_keyset_cursor_without_count(customer_user):
+    orders = [Order.objects.create(customer=customer_user, order_type='TAKEOUT') for _ in range(5)]
+    api = APIClient()
+    api.force_authenticate(user=customer_user)
+
+    seen = []
+    url = reverse('pedidos:order-list')
+    params = {'page_size': 2}
+    while url:
+        with CaptureQueriesContext(connection) as ctx:
+            resp = api.get(url, params)
+        assert resp.status_code == status.HTTP_200_OK
+        assert 'count' not in resp.data
+        assert not any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries)
+        seen.extend(row['id'] for row in resp.data['results'])
+        url, params = resp.data['next'], None
+    # Newest first, every order exactly once (ties on created_at broken by id)
+    assert seen == [o.id for o in reversed(orders)]
+
+
+@pytest.mark.django_db
+def test_history_limit_sets_cursor_page_size(customer_user):
+    for _ in range(3):
+        Order.objects.create(customer=customer_user, order_type='TAKEOUT', status=OrderStatus.DELIVERED)
+    api = APIClient()
+    api.force_authenticate(user=customer_user)
+    resp = api.get(reverse('pedidos:order-history'), {'limit': 2})
+    assert len(resp.data['results']) == 2
+    assert resp.data['next'] is not None
+
+    # active keeps the page-number paginator (priority ordering)
+    resp = api.get(reverse('pedidos:order-active'))
+    assert 'count' in resp.data
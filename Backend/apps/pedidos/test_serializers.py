@@ -88,3 +88,44 @@ def test_order_status_update_serializer_validates_transitions():
     ser_invalid = OrderStatusUpdateSerializer(data={'status': OrderStatus.READY}, context={'order': order})
     with pytest.raises(serializers.ValidationError):
         ser_invalid.is_valid(raise_exception=True)
+
+
+@pytest.mark.django_db
+def test_order_create_serializer_uses_constant_number_of_queries():
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    user = User.objects.create_user(username='bulk', password='p')
+    ing = Ingredient.objects.create(name='Bulk ing', unit=UnitOfMeasure.GRAM, cost_per_unit=Decimal('1.00'))
+    InventoryStock.objects.create(ingredient=ing, quantity=Decimal('100.00'))
+    dishes = []
+    for i in range(10):
+        dish = Dish.objects.create(name=f'Bulk {i}', description='d', price=Decimal('2.50'), is_available=True)
+        dish.recipe_items.create(ingredient=ing, quantity=Decimal('1.00'))
+        dishes.append(dish)
+
+    def create_order(lines):
+        ser = OrderCreateSerializer(data={
+            'customer': user.id, 'order_type': 'TAKEOUT',
+            'items': [{'dish': dish.id, 'quantity': 2} for dish in lines],
+        })
+        with CaptureQueriesContext(connection) as ctx:
+            ser.is_valid(raise_exception=True)
+            order = ser.save()
+            data = ser.data
+        return order, data, len(ctx.captured_queries)
+
+    create_order(dishes[:1])  # warm-up: creates the report rollup buckets
+    _, _, small_queries = create_order(dishes[:2])
+    order, data, queries = create_order(dishes)
+    assert queries == small_queries
+    assert order.total_amount == Decimal('50.00')
+    assert Order.objects.get(pk=order.pk).total_amount == Decimal('50.00')
+    assert order.items.count() == 10
+    assert all(item['subtotal'] == '5.00' for item in data['items'])
+
+    # Unknown dish ids still produce the standard validation error
+    ser = OrderCreateSerializer(data={'customer': user.id, 'order_type': 'TAKEOUT',
+                                      'items': [{'dish': 999999, 'quantity': 1}, {'dish': 'x'}]})
+    assert ser.is_valid() is False
+    assert 'items' in ser.errors
@@ -0,0 +1,78 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.pedidos.models import Order, OrderStatus, OrderPriority
+from apps.pedidos.stats import order_stats, filter_orders, parse_date_bound
+
+
+@pytest.fixture
+def customer_user():
+    return User.objects.create_user(username='stats_customer', password='p', role='CUSTOMER')
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(username='stats_staff', password='p', role='STAFF')
+
+
+@pytest.fixture
+def orders(customer_user):
+    Order.objects.create(customer=customer_user, order_type='TAKEOUT', status=OrderStatus.PENDING,
+                         priority=OrderPriority.HIGH, total_amount=Decimal('10.00'))
+    Order.objects.create(customer=customer_user, order_type='TAKEOUT', status=OrderStatus.DELIVERED,
+                         priority=OrderPriority.LOW, total_amount=Decimal('20.00'))
+    old = Order.objects.create(customer=customer_user, order_type='DELIVERY', status=OrderStatus.DELIVERED,
+                               priority=OrderPriority.LOW, total_amount=Decimal('5.50'))
+    Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=10))
+
+
+@pytest.mark.django_db
+def test_order_stats_single_query(orders, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        stats = order_stats(Order.objects.all())
+    assert stats['total_orders'] == 3
+    assert stats['by_status'][OrderStatus.DELIVERED] == 2
+    assert stats['by_status'][OrderStatus.CANCELLED] == 0
+    assert stats['by_priority'][OrderPriority.LOW] == 2
+    assert stats['total_revenue'] == Decimal('35.50')
+    assert stats['average_order_value'] == Decimal('11.83')
+
+
+@pytest.mark.django_db
+def test_order_stats_empty_queryset():
+    stats = order_stats(Order.objects.none())
+    assert stats['total_orders'] == 0
+    assert stats['total_revenue'] == Decimal('0.00')
+    assert stats['average_order_value'] == 0
+
+
+@pytest.mark.django_db
+def test_filter_orders_by_date_and_type(orders):
+    since = (timezone.now() - timedelta(days=1)).date().isoformat()
+    assert filter_orders(Order.objects.all(), date_from=since).count() == 2
+    until = (timezone.now() - timedelta(days=5)).date().isoformat()
+    assert filter_orders(Order.objects.all(), date_to=until).count() == 1
+    assert filter_orders(Order.objects.all(), order_type='TAKEOUT').count() == 2
+    with pytest.raises(ValueError):
+        filter_orders(Order.objects.all(), order_type='BOAT')
+    with pytest.raises(ValueError):
+        parse_date_bound('not-a-date')
+    assert parse_date_bound('2025-01-01T10:00:00').hour == 10
+
+
+@pytest.mark.django_db
+def test_stats_endpoint_filters(orders, staff_user):
+    api = APIClient()
+    api.force_authenticate(user=staff_user)
+    url = reverse('pedidos:order-stats')
+    resp = api.get(url, {'order_type': 'TAKEOUT'})
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.data['total_orders'] == 2
+    assert resp.data['total_revenue'] == Decimal('30.00')
+    bad = api.get(url, {'date_from': 'ayer'})
+    assert bad.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,85 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.pedidos.models import Order, OrderStatus
+from apps.pedidos.transitions import (
+    transition_order, InvalidTransition, TransitionConflict, CANCELLABLE_STATUSES
+)
+from apps.reports.models import OrderRollup, RollupGranularity
+
+
+@pytest.fixture
+def customer_user():
+    return User.objects.create_user(username='cas_customer', password='p', role='CUSTOMER')
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(username='cas_staff', password='p', role='STAFF')
+
+
+@pytest.fixture
+def order(customer_user):
+    return Order.objects.create(customer=customer_user, order_type='TAKEOUT')
+
+
+@pytest.mark.django_db
+def test_transition_is_single_conditional_update_of_changed_fields(order):
+    with CaptureQueriesContext(connection) as ctx:
+        transition_order(order, OrderStatus.CONFIRMED)
+    updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "orders"')]
+    assert len(updates) == 1
+    set_clause, where_clause = updates[0].split(' WHERE ')
+    assert '"notes"' not in set_clause and '"total_amount"' not in set_clause
+    assert '"status"' in where_clause
+    order.refresh_from_db()
+    assert order.status == OrderStatus.CONFIRMED
+
+
+@pytest.mark.django_db
+def test_stale_instance_reports_conflict_without_overwriting(order):
+    stale = Order.objects.get(pk=order.pk)
+    transition_order(order, OrderStatus.CANCELLED)
+    with pytest.raises(InvalidTransition):
+        transition_order(order, OrderStatus.CONFIRMED)
+    with pytest.raises(TransitionConflict) as exc:
+        transition_order(stale, OrderStatus.CONFIRMED)
+    assert exc.value.current == OrderStatus.CANCELLED
+    order.refresh_from_db()
+    assert order.status == OrderStatus.CANCELLED
+    with pytest.raises(InvalidTransition):
+        transition_order(Order.objects.get(pk=order.pk), OrderStatus.CANCELLED, allowed_from=CANCELLABLE_STATUSES)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_delivery_sets_completion_fields_and_moves_rollups(order):
+    for new_status in [OrderStatus.CONFIRMED, OrderStatus.IN_PROGRESS, OrderStatus.READY]:
+        transition_order(order, new_status)
+    transition_order(Order.objects.only('id', 'status').get(pk=order.pk), OrderStatus.DELIVERED, actual_time=12)
+    order.refresh_from_db()
+    assert order.completed_at is not None and order.actual_time == 12
+
+    rollups = OrderRollup.objects.filter(granularity=RollupGranularity.DAY)
+    assert {r.status: r.order_count for r in rollups if r.order_count} == {OrderStatus.DELIVERED: 1}
+    assert rollups.get(status=OrderStatus.DELIVERED).prep_time_total == 12
+
+
+@pytest.mark.django_db
+def test_views_return_409_on_concurrent_change(order, staff_user, customer_user, monkeypatch):
+    def conflicting(order, new_status, **kwargs):
+        raise TransitionConflict(order.pk, order.status, OrderStatus.IN_PROGRESS)
+
+    monkeypatch.setattr('apps.pedidos.views.transition_order', conflicting)
+    api = APIClient()
+    api.force_authenticate(user=staff_user)
+    resp = api.patch(reverse('pedidos:order-update-status', args=[order.id]), {'status': OrderStatus.CONFIRMED}, format='json')
+    assert resp.status_code == status.HTTP_409_CONFLICT
+    assert resp.data['current_status'] == OrderStatus.IN_PROGRESS
+
+    api.force_authenticate(user=customer_user)
+    resp = api.post(reverse('pedidos:order-cancel', args=[order.id]))
+    assert resp.status_code == status.HTTP_409_CONFLICT
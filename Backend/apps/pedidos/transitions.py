@@ -0,0 +1,90 @@
+"""
+Máquina de Estados de Pedidos
+=============================
+RF-04: Seguimiento de estados
+
+Motor central de transiciones. Cada transición se aplica como un único
+`UPDATE orders SET <campos modificados> WHERE id = ? AND status = <esperado>`
+(compare-and-swap): si otra tablet cambió el pedido entre la lectura y la
+escritura el UPDATE no afecta filas y se reporta un conflicto en lugar de
+sobrescribir el cambio ajeno.
+
+Como el UPDATE no dispara post_save, tras aplicarlo se envía la señal
+`order_status_changed` dentro de la misma transacción.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, OrderStatus
+from .signals import order_status_changed
+
+
+VALID_TRANSITIONS = {
+    OrderStatus.PENDING: [OrderStatus.CONFIRMED, OrderStatus.CANCELLED],
+    OrderStatus.CONFIRMED: [OrderStatus.IN_PROGRESS, OrderStatus.CANCELLED],
+    OrderStatus.IN_PROGRESS: [OrderStatus.READY, OrderStatus.CANCELLED],
+    OrderStatus.READY: [OrderStatus.DELIVERED],
+    OrderStatus.DELIVERED: [],
+    OrderStatus.CANCELLED: [],
+}
+
+# Estados desde los que el cliente puede cancelar (acción cancel)
+CANCELLABLE_STATUSES = [OrderStatus.PENDING, OrderStatus.CONFIRMED]
+
+
+class InvalidTransition(Exception):
+    """La transición no está permitida desde el estado actual."""
+
+    def __init__(self, current, new_status):
+        self.current = current
+        self.new_status = new_status
+        labels = dict(OrderStatus.choices)
+        super().__init__(f"Transición inválida de {labels.get(current, current)} a {labels.get(new_status, new_status)}.")
+
+
+class TransitionConflict(Exception):
+    """El pedido cambió de estado concurrentemente (el compare-and-swap falló)."""
+
+    def __init__(self, order_id, expected, current):
+        self.order_id = order_id
+        self.expected = expected
+        self.current = current
+        super().__init__(
+            f"El pedido #{order_id} cambió de estado ({expected} → {current}); recarga e intenta de nuevo."
+        )
+
+
+def can_transition(current, new_status):
+    return new_status in VALID_TRANSITIONS.get(current, [])
+
+
+def transition_order(order, new_status, *, allowed_from=None, actual_time=None):
+    """
+    Aplica la transición `order.status → new_status` con un UPDATE condicional.
+
+    Solo escribe los campos que cambian (status, updated_at y, al entregar,
+    completed_at/actual_time) y actualiza la instancia en memoria.
+    Lanza InvalidTransition o TransitionConflict.
+    """
+    expected = order.status
+    if not can_transition(expected, new_status) or (allowed_from is not None and expected not in allowed_from):
+        raise InvalidTransition(expected, new_status)
+
+    now = timezone.now()
+    changes = {'status': new_status, 'updated_at': now}
+    if new_status == OrderStatus.DELIVERED and not order.completed_at:
+        changes['completed_at'] = now
+        if actual_time:
+            changes['actual_time'] = actual_time
+    previous = {field: getattr(order, field) for field in changes}
+
+    with transaction.atomic():
+        updated = Order.objects.filter(pk=order.pk, status=expected).update(**changes)
+        if not updated:
+            current = Order.objects.filter(pk=order.pk).values_list('status', flat=True).first()
+            raise TransitionConflict(order.pk, expected, current)
+        for field, value in changes.items():
+            setattr(order, field, value)
+        order_status_changed.send(sender=Order, instance=order, previous=previous)
+    return order
@@ -4,21 +4,33 @@ Views (ViewSets) para Pedidos
 RF-01, RF-04: Gestión de pedidos y seguimiento
 """
 
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from django.utils import timezone
 
-from .models import Order, OrderStatus, OrderPriority
+from core.pagination import CreatedAtCursorPagination
+from apps.inventario.services import InsufficientStock
+from .models import Order, OrderStatus
 from .serializers import (
     OrderSerializer,
     OrderCreateSerializer,
     OrderStatusUpdateSerializer
 )
 from .permissions import IsOwnerOrStaff, IsStaffOrReadOnlyOwn, IsStaffOnly
+from .stats import filter_orders, order_stats
+from .transitions import transition_order, TransitionConflict, CANCELLABLE_STATUSES
+from .events import order_events, order_event_payload, OrderEventType, EventStreamRenderer
+from .authentication import StreamTokenAuthentication, create_stream_token, stream_token_max_age
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -40,6 +52,10 @@ class OrderViewSet(viewsets.ModelViewSet):
     
     Ordenamiento:
     - created_at, updated_at, total_amount, priority, status
+
+    Paginación:
+    - list e history usan cursor (keyset) sobre created_at + id: parámetros
+      `cursor` y `page_size`; la respuesta no incluye `count`.
     """
     queryset = Order.objects.all().select_related('customer').prefetch_related('items__dish')
     permission_classes = [IsStaffOrReadOnlyOwn]
@@ -47,7 +63,23 @@ class OrderViewSet(viewsets.ModelViewSet):
     filterset_fields = ['status', 'priority', 'order_type', 'customer']
     search_fields = ['notes', 'table_number', 'customer__username']
     ordering_fields = ['created_at', 'updated_at', 'total_amount', 'priority', 'status']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    pagination_class = CreatedAtCursorPagination
+    cursor_pagination_actions = ['list', 'history']
+
+    @property
+    def paginator(self):
+        """
+        Cursor para listados cronológicos; el resto de acciones (p. ej. `active`,
+        ordenada por prioridad) conserva la paginación por defecto.
+        """
+        if not hasattr(self, '_paginator'):
+            if self.action in self.cursor_pagination_actions:
+                pagination_class = self.pagination_class
+            else:
+                pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
 
     def get_serializer_class(self):
         """Devuelve el serializer apropiado según la acción."""
@@ -78,7 +110,12 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Asigna el usuario actual como customer al crear un pedido."""
-        serializer.save(customer=self.request.user)
+        order = serializer.save(customer=self.request.user)
+        self.publish_event(OrderEventType.CREATED, order_event_payload(order, include_items=True))
+
+    def publish_event(self, event_type, payload):
+        """Publica el evento para las pantallas de cocina cuando la transacción confirma."""
+        transaction.on_commit(partial(order_events.publish, event_type, payload))
 
     @swagger_auto_schema(
         operation_description="Lista todos los pedidos (clientes solo ven los suyos)",
@@ -97,7 +134,14 @@ class OrderViewSet(viewsets.ModelViewSet):
         request_body=OrderCreateSerializer
     )
     def create(self, request, *args, **kwargs):
-        return super().create(request, *args, **kwargs)
+        try:
+            return super().create(request, *args, **kwargs)
+        except InsufficientStock as exc:
+            # La reserva de ingredientes del pedido no alcanzó (RF-02)
+            return Response(
+                {'error': str(exc), 'shortages': exc.shortages},
+                status=status.HTTP_409_CONFLICT
+            )
 
     @swagger_auto_schema(
         operation_description="Obtiene el detalle completo de un pedido con items"
@@ -115,6 +159,8 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         Endpoint personalizado para actualizar el estado del pedido.
         Valida transiciones permitidas y registra timestamps.
+        Responde 409 si otro dispositivo cambió el estado concurrentemente
+        o si no hay stock para confirmar el pedido (RF-02).
         
         RF-04: Seguimiento de estados
         """
@@ -122,18 +168,28 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = OrderStatusUpdateSerializer(data=request.data, context={'order': order})
         serializer.is_valid(raise_exception=True)
         
-        new_status = serializer.validated_data['status']
-        actual_time = serializer.validated_data.get('actual_time')
-        
-        order.status = new_status
-        
-        # Si se marca como completado, registrar timestamp
-        if new_status == OrderStatus.DELIVERED and not order.completed_at:
-            order.completed_at = timezone.now()
-            if actual_time:
-                order.actual_time = actual_time
-        
-        order.save()
+        previous_status = order.status
+        try:
+            # UPDATE condicional sobre el estado leído; registra completed_at al entregar
+            transition_order(
+                order,
+                serializer.validated_data['status'],
+                actual_time=serializer.validated_data.get('actual_time')
+            )
+        except TransitionConflict as exc:
+            return Response(
+                {'error': str(exc), 'current_status': exc.current},
+                status=status.HTTP_409_CONFLICT
+            )
+        except InsufficientStock as exc:
+            return Response(
+                {'error': str(exc), 'shortages': exc.shortages},
+                status=status.HTTP_409_CONFLICT
+            )
+        self.publish_event(
+            OrderEventType.STATUS_CHANGED,
+            order_event_payload(order, previous_status=previous_status)
+        )
         
         response_serializer = OrderSerializer(order)
         return Response(response_serializer.data)
@@ -173,11 +229,61 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = OrderSerializer(queryset, many=True)
         return Response(serializer.data)
 
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Token firmado y de corta duración para abrir el stream SSE con EventSource (solo staff/admin)",
+    )
+    @action(detail=False, methods=['post'], url_path='stream-token', permission_classes=[IsStaffOnly])
+    def stream_token(self, request):
+        """
+        Emite el token para `stream?token=`. RNF-03: se obtiene con el JWT y
+        vence a los ORDER_EVENTS_TOKEN_MAX_AGE segundos.
+        """
+        return Response({'token': create_stream_token(request.user), 'expires_in': stream_token_max_age()})
+
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Stream SSE de eventos de pedidos para pantallas de cocina (solo staff/admin)",
+        manual_parameters=[
+            openapi.Parameter('last_event_id', openapi.IN_QUERY, description="Reanudar desde este id (alternativa al header Last-Event-ID)", type=openapi.TYPE_STRING),
+            openapi.Parameter('token', openapi.IN_QUERY, description="Token de stream-token (EventSource no envía el header Authorization)", type=openapi.TYPE_STRING),
+        ]
+    )
+    @action(
+        detail=False, methods=['get'], permission_classes=[IsStaffOnly],
+        authentication_classes=[*api_settings.DEFAULT_AUTHENTICATION_CLASSES, StreamTokenAuthentication],
+        renderer_classes=[EventStreamRenderer, JSONRenderer]
+    )
+    def stream(self, request):
+        """
+        Server-Sent Events con la creación, cambios de estado y cancelaciones.
+        RF-01: Las pantallas cargan `active` una vez y luego aplican los eventos.
+
+        Autenticación: header Authorization con el JWT o, desde el navegador,
+        `?token=` obtenido con POST stream-token, porque EventSource no puede
+        enviar headers: `new EventSource('/api/orders/stream/?token=...')`.
+        EventSource reconecta con la misma URL; cuando el token vence la
+        conexión responde 401 y la pantalla debe pedir uno nuevo.
+        """
+        last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+        response = StreamingHttpResponse(
+            order_events.stream(
+                last_event_id,
+                timeout=settings.ORDER_EVENTS_STREAM_TIMEOUT,
+                heartbeat=settings.ORDER_EVENTS_HEARTBEAT,
+            ),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
     @swagger_auto_schema(
         method='get',
         operation_description="Obtiene pedidos completados del usuario",
         manual_parameters=[
-            openapi.Parameter('limit', openapi.IN_QUERY, description="Número de pedidos a retornar", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Número de pedidos por página", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Cursor de la página siguiente/anterior", type=openapi.TYPE_STRING),
         ]
     )
     @action(detail=False, methods=['get'])
@@ -189,10 +295,11 @@ class OrderViewSet(viewsets.ModelViewSet):
         completed_statuses = [OrderStatus.DELIVERED, OrderStatus.CANCELLED]
         queryset = self.get_queryset().filter(status__in=completed_statuses)
         
+        # `limit` se mantiene por compatibilidad como tamaño de página del cursor
         limit = request.query_params.get('limit')
-        if limit:
+        if limit and self.paginator is not None:
             try:
-                queryset = queryset[:int(limit)]
+                self.paginator.page_size = max(1, min(int(limit), self.paginator.max_page_size))
             except ValueError:
                 pass
         
@@ -218,27 +325,44 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         order = self.get_object()
         
-        if order.status not in [OrderStatus.PENDING, OrderStatus.CONFIRMED]:
+        if order.status not in CANCELLABLE_STATUSES:
             return Response(
                 {'error': 'Solo se pueden cancelar pedidos pendientes o confirmados.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        order.status = OrderStatus.CANCELLED
-        order.save()
+        previous_status = order.status
+        try:
+            transition_order(order, OrderStatus.CANCELLED, allowed_from=CANCELLABLE_STATUSES)
+        except TransitionConflict as exc:
+            return Response(
+                {'error': str(exc), 'current_status': exc.current},
+                status=status.HTTP_409_CONFLICT
+            )
+        self.publish_event(
+            OrderEventType.CANCELLED,
+            order_event_payload(order, previous_status=previous_status)
+        )
         
         serializer = OrderSerializer(order)
         return Response(serializer.data)
 
     @swagger_auto_schema(
         method='get',
-        operation_description="Obtiene estadísticas de pedidos (solo staff/admin)"
+        operation_description="Obtiene estadísticas de pedidos (solo staff/admin)",
+        manual_parameters=[
+            openapi.Parameter('date_from', openapi.IN_QUERY, description="Fecha inicial (YYYY-MM-DD o ISO 8601)", type=openapi.TYPE_STRING),
+            openapi.Parameter('date_to', openapi.IN_QUERY, description="Fecha final inclusive (YYYY-MM-DD o ISO 8601)", type=openapi.TYPE_STRING),
+            openapi.Parameter('order_type', openapi.IN_QUERY, description="Filtrar por tipo de pedido", type=openapi.TYPE_STRING),
+        ]
     )
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """
         Endpoint para obtener estadísticas de pedidos.
         RF-06: Reportes y analytics.
+
+        Todas las métricas se calculan en una sola consulta de agregación condicional.
         """
         # Solo staff/admin
         if request.user.role not in ['STAFF', 'ADMIN'] and not request.user.is_staff:
@@ -247,23 +371,14 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        queryset = self.get_queryset()
-        
-        stats = {
-            'total_orders': queryset.count(),
-            'by_status': {
-                status_choice[0]: queryset.filter(status=status_choice[0]).count()
-                for status_choice in OrderStatus.choices
-            },
-            'by_priority': {
-                priority_choice[0]: queryset.filter(priority=priority_choice[0]).count()
-                for priority_choice in OrderPriority.choices
-            },
-            'total_revenue': sum(order.total_amount for order in queryset),
-            'average_order_value': (
-                sum(order.total_amount for order in queryset) / queryset.count()
-                if queryset.count() > 0 else 0
+        try:
+            queryset = filter_orders(
+                self.get_queryset(),
+                date_from=request.query_params.get('date_from'),
+                date_to=request.query_params.get('date_to'),
+                order_type=request.query_params.get('order_type'),
             )
-        }
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response(stats)
+        return Response(order_stats(queryset))
@@ -5,6 +5,7 @@ Configuración del Admin para Platos
 
 from django.contrib import admin
 from .models import Dish, RecipeItem
+from .costing import annotate_cost
 
 
 class RecipeItemInline(admin.TabularInline):
@@ -17,7 +18,7 @@ class RecipeItemInline(admin.TabularInline):
 @admin.register(Dish)
 class DishAdmin(admin.ModelAdmin):
     """Admin para Dish con inlines de receta."""
-    list_display = ['name', 'category', 'price', 'preparation_time', 'is_available', 'popularity_score', 'created_at']
+    list_display = ['name', 'category', 'price', 'food_cost', 'margin', 'preparation_time', 'is_available', 'popularity_score', 'created_at']
     list_filter = ['category', 'is_available', 'is_vegetarian', 'is_vegan']
     search_fields = ['name', 'description', 'allergens']
     readonly_fields = ['popularity_score', 'created_at', 'updated_at']
@@ -37,3 +38,15 @@ class DishAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+    def get_queryset(self, request):
+        # Costo de todos los platos del listado en la misma consulta (RF-06)
+        return annotate_cost(super().get_queryset(request))
+
+    @admin.display(description='Costo', ordering='food_cost')
+    def food_cost(self, obj):
+        return obj.food_cost
+
+    @admin.display(description='Margen')
+    def margin(self, obj):
+        return obj.price - obj.food_cost
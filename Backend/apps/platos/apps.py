@@ -5,3 +5,9 @@ class PlatosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.platos'
     verbose_name = 'Gestión de Platos'
+
+    def ready(self):
+        try:
+            import apps.platos.signals  # noqa
+        except Exception:  # pragma: no cover - fallback path if import fails
+            pass
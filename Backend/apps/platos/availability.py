@@ -0,0 +1,90 @@
+"""
+Índice de Disponibilidad de Platos
+==================================
+RF-01, RF-02: Menú según inventario
+
+`Dish.is_in_stock` guarda precalculado si hay stock para una porción de cada
+plato, de modo que el menú lee una columna en lugar de recorrer la receta y
+el stock de cada ingrediente por plato.
+
+El índice ingrediente → platos es la propia tabla `recipe_items` (indexada
+por ingredient_id): cuando cambia el stock de un ingrediente solo se
+recalculan los platos que lo usan, con una consulta para detectar faltantes
+y a lo sumo dos UPDATE que cambian únicamente los flags que se invierten.
+La receta se compara por `base_quantity` (ya convertida a la unidad de stock)
+contra el stock libre: quantity - reserved_quantity, ambos en la misma fila.
+Si algún flag cambia se invalida la caché del menú.
+"""
+
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+
+from .cache import bump_menu_version
+
+
+def dishes_using(ingredient_ids):
+    """Ids de los platos cuya receta usa alguno de los ingredientes."""
+    from .models import RecipeItem
+
+    return set(
+        RecipeItem.objects.filter(ingredient_id__in=ingredient_ids)
+        .values_list('dish_id', flat=True)
+        .distinct()
+    )
+
+
+def recipe_item_availability(dish_id):
+    """
+    {recipe_item_id: hay stock libre para una porción} de un plato, en una
+    consulta. El detalle en caché se completa con esto en cada lectura, porque
+    el stock de un ingrediente cambia sin que cambie la versión del menú.
+    """
+    from .models import RecipeItem
+
+    enough = ExpressionWrapper(
+        Q(ingredient__stock__quantity__gte=F('base_quantity') + F('ingredient__stock__reserved_quantity')),
+        output_field=BooleanField(),
+    )
+    return {
+        item_id: bool(available)
+        for item_id, available in RecipeItem.objects.filter(dish_id=dish_id)
+        .annotate(available=enough).values_list('id', 'available')
+    }
+
+
+def refresh_dish_availability(dish_ids=None, ingredient_ids=None):
+    """
+    Recalcula `is_in_stock` de los platos indicados (o de los que usan los
+    ingredientes indicados; de todos si no se indica ninguno).
+
+    Devuelve el conjunto de ids de platos cuyo flag cambió.
+    """
+    from .models import Dish, RecipeItem
+
+    if dish_ids is None and ingredient_ids is None:
+        dish_ids = set(Dish.objects.values_list('pk', flat=True))
+    else:
+        dish_ids = set(dish_ids or ())
+        if ingredient_ids:
+            dish_ids |= dishes_using(ingredient_ids)
+    if not dish_ids:
+        return set()
+
+    short = set(
+        RecipeItem.objects.filter(dish_id__in=dish_ids)
+        .filter(Q(ingredient__stock__isnull=True) | Q(ingredient__stock__quantity__lt=F('base_quantity') + F('ingredient__stock__reserved_quantity')))
+        .values_list('dish_id', flat=True)
+        .distinct()
+    )
+    went_out = set(
+        Dish.objects.filter(pk__in=short, is_in_stock=True).values_list('pk', flat=True)
+    )
+    came_back = set(
+        Dish.objects.filter(pk__in=dish_ids - short, is_in_stock=False).values_list('pk', flat=True)
+    )
+    if went_out:
+        Dish.objects.filter(pk__in=went_out).update(is_in_stock=False)
+    if came_back:
+        Dish.objects.filter(pk__in=came_back).update(is_in_stock=True)
+    if went_out or came_back:
+        bump_menu_version()
+    return went_out | came_back
@@ -0,0 +1,100 @@
+"""
+Caché del Menú
+==============
+RNF-01: Rendimiento del menú digital
+
+Las lecturas del menú (list, retrieve, popular, categories) se guardan en la
+caché de Django bajo una clave formada por la acción, los parámetros de
+consulta normalizados (ordenados, sin valores vacíos) y un número de
+versión del menú. Invalidar es incrementar la versión: las entradas viejas
+dejan de consultarse y expiran solas (CACHE_TIMEOUT).
+
+La versión se incrementa cuando cambian Dish, RecipeItem o Ingredient, y
+cuando el stock invierte el flag is_in_stock de algún plato. La
+disponibilidad por ingrediente del detalle (recipe_items[].is_available)
+cambia con cualquier movimiento de stock, así que no se toma de la caché:
+retrieve la vuelve a leer con una consulta (availability.recipe_item_availability). Se incrementa
+en el momento y de nuevo al confirmar la transacción, para que una lectura
+concurrente no deje en caché datos anteriores al commit.
+
+Backend: Redis (REDIS_URL, servicio de docker-compose) o memoria local.
+"""
+
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+
+MENU_VERSION_KEY = 'menu:version'
+
+
+def _initial_version():
+    # Si la versión fue desalojada no se reutilizan números anteriores
+    return int(time.time() * 1000)
+
+
+def menu_version():
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        cache.add(MENU_VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(MENU_VERSION_KEY)
+    return version
+
+
+def _bump():
+    try:
+        cache.incr(MENU_VERSION_KEY)
+    except ValueError:
+        cache.add(MENU_VERSION_KEY, _initial_version(), timeout=None)
+
+
+def bump_menu_version():
+    """Invalida todas las respuestas del menú en caché."""
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def menu_cache_key(request, action, **kwargs):
+    """Clave estable para la acción, los kwargs de la URL y los parámetros normalizados."""
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+        if value != ''
+    )
+    raw = '|'.join([
+        request.get_host(),
+        action,
+        urlencode(sorted(kwargs.items())),
+        urlencode(params),
+    ])
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'menu:{menu_version()}:{action}:{digest}'
+
+
+def cached_menu_response(timeout_setting='CACHE_TIMEOUT'):
+    """
+    Decorador para acciones GET de DishViewSet. Guarda `response.data`
+    (ya serializado) de las respuestas 200; los permisos se verifican antes
+    en `initial()`, por lo que solo se sirven a quien puede verlas.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = menu_cache_key(request, view_method.__name__, **kwargs)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, getattr(settings, timeout_setting))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,93 @@
+"""
+Costo de Platos
+===============
+RF-06: Costo de alimentos y márgenes del menú
+
+El costo de un plato es Σ receta.base_quantity × ingrediente.cost_per_unit
+(cantidad ya convertida a la unidad de stock, la del costo unitario). Se
+calcula en la BD con un único `Sum(F() * F())` agrupado por plato, para uno o
+para todos los platos a la vez, y se guarda por plato en la caché
+(`dish-cost:<id>`). Las entradas se invalidan cuando cambia la receta del
+plato o el costo de alguno de sus ingredientes (signals.py) y, además,
+expiran a los CACHE_TIMEOUT segundos: con una caché en memoria por worker la
+invalidación solo alcanza al proceso que atendió el cambio, y el TTL acota
+cuánto tiempo los demás pueden servir un costo viejo.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+COST_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+
+def cost_key(dish_id):
+    return f'dish-cost:{dish_id}'
+
+
+def annotate_cost(queryset):
+    """Anota `food_cost` (Decimal) en un queryset de Dish."""
+    return queryset.annotate(
+        food_cost=Coalesce(
+            Sum(F('recipe_items__base_quantity') * F('recipe_items__ingredient__cost_per_unit'), output_field=COST_FIELD),
+            Value(Decimal('0.00')),
+            output_field=COST_FIELD,
+        )
+    )
+
+
+def cache_costs(dishes):
+    """Guarda en caché el `food_cost` de platos ya anotados."""
+    cache.set_many({cost_key(dish.pk): dish.food_cost for dish in dishes}, timeout=settings.CACHE_TIMEOUT)
+
+
+def dish_costs(dish_ids):
+    """
+    Costo por plato {id: Decimal}: lee la caché y calcula los faltantes con
+    una sola consulta anotada.
+    """
+    from .models import Dish
+
+    dish_ids = list(dish_ids)
+    cached = cache.get_many([cost_key(dish_id) for dish_id in dish_ids])
+    costs = {dish_id: cached[cost_key(dish_id)] for dish_id in dish_ids if cost_key(dish_id) in cached}
+    missing = [dish_id for dish_id in dish_ids if dish_id not in costs]
+    if missing:
+        dishes = list(annotate_cost(Dish.objects.filter(pk__in=missing).order_by()).only('pk'))
+        cache_costs(dishes)
+        costs.update({dish.pk: dish.food_cost for dish in dishes})
+    return costs
+
+
+def dish_cost(dish_id):
+    return dish_costs([dish_id]).get(dish_id, Decimal('0.00'))
+
+
+def invalidate_costs(dish_ids):
+    cache.delete_many([cost_key(dish_id) for dish_id in dish_ids])
+
+
+def margin_report(queryset):
+    """
+    Márgenes del menú en una sola consulta: una fila por plato con precio,
+    costo, margen y porcentaje de margen sobre el precio.
+    """
+    dishes = list(annotate_cost(queryset))
+    cache_costs(dishes)
+    rows = []
+    for dish in dishes:
+        margin = dish.price - dish.food_cost
+        rows.append({
+            'id': dish.pk,
+            'name': dish.name,
+            'category': dish.category,
+            'price': dish.price,
+            'food_cost': dish.food_cost,
+            'margin': margin,
+            'margin_pct': round(float(margin / dish.price * 100), 2) if dish.price else None,
+        })
+    return rows
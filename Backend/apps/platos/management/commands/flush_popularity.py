@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.platos.popularity import flush_popularity
+
+
+class Command(BaseCommand):
+    help = "Apply pending dish popularity increments (RF-03); schedule every minute"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Increments applied per database transaction",
+        )
+
+    def handle(self, *args, **options):
+        count = flush_popularity(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Applied {count} popularity increments"))
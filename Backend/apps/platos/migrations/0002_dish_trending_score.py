@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dish',
+            name='trending_score',
+            field=models.FloatField(default=0, help_text='Time-decayed popularity, forward-decay scaled (RF-03)'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['-trending_score'], name='dishes_trendin_026636_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:01
+
+from django.db import migrations, models
+from django.db.models import F, Q
+
+
+def compute_is_in_stock(apps, schema_editor):
+    Dish = apps.get_model('platos', 'Dish')
+    RecipeItem = apps.get_model('platos', 'RecipeItem')
+    short = (
+        RecipeItem.objects
+        .filter(Q(ingredient__stock__isnull=True) | Q(ingredient__stock__quantity__lt=F('quantity')))
+        .values('dish_id')
+    )
+    Dish.objects.filter(pk__in=short).update(is_in_stock=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platos', '0002_dish_trending_score'),
+        ('inventario', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dish',
+            name='is_in_stock',
+            field=models.BooleanField(default=True, help_text='Precomputed: enough stock for one serving (RF-02)'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['is_in_stock'], name='dishes_is_in_s_e55e66_idx'),
+        ),
+        migrations.RunPython(compute_is_in_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:42
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_base_quantity(apps, schema_editor):
+    # Las recetas existentes están en la unidad del ingrediente
+    RecipeItem = apps.get_model('platos', 'RecipeItem')
+    RecipeItem.objects.update(base_quantity=F('quantity'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platos', '0003_dish_is_in_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipeitem',
+            name='base_quantity',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0.0000'), editable=False, help_text="Precomputed: quantity in the ingredient's stock unit (RF-02)", max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='recipeitem',
+            name='unit',
+            field=models.CharField(blank=True, choices=[('KG', 'Kilogram'), ('G', 'Gram'), ('L', 'Liter'), ('ML', 'Milliliter'), ('PC', 'Piece'), ('DZ', 'Dozen'), ('LB', 'Pound'), ('OZ', 'Ounce')], help_text="Recipe unit; blank means the ingredient's stock unit", max_length=5),
+        ),
+        migrations.RunPython(copy_base_quantity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-17 20:12
+
+import math
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def trending_to_log_scale(apps, schema_editor):
+    # trending_score pasa a guardar log2 de la suma con forward decay (0 = sin demanda)
+    Dish = apps.get_model('platos', 'Dish')
+    dishes = list(Dish.objects.filter(trending_score__gt=0).only('id', 'trending_score'))
+    for dish in dishes:
+        dish.trending_score = max(math.log2(dish.trending_score), 1e-9)
+    Dish.objects.bulk_update(dishes, ['trending_score'])
+
+
+def trending_from_log_scale(apps, schema_editor):
+    Dish = apps.get_model('platos', 'Dish')
+    dishes = list(Dish.objects.filter(trending_score__gt=0).only('id', 'trending_score'))
+    for dish in dishes:
+        dish.trending_score = 2 ** dish.trending_score
+    Dish.objects.bulk_update(dishes, ['trending_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platos', '0004_recipe_units'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dish',
+            name='trending_score',
+            field=models.FloatField(default=0, help_text='Time-decayed popularity, log2 of the forward-decay sum (RF-03)'),
+        ),
+        migrations.RunPython(trending_to_log_scale, trending_from_log_scale),
+        migrations.CreateModel(
+            name='PopularityIncrement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=1, help_text='Order lines for the dish')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the order was placed')),
+                ('dish', models.ForeignKey(help_text='Ordered dish', on_delete=django.db.models.deletion.CASCADE, related_name='popularity_increments', to='platos.dish')),
+            ],
+            options={
+                'verbose_name': 'Popularity Increment',
+                'verbose_name_plural': 'Popularity Increments',
+                'db_table': 'dish_popularity_increments',
+            },
+        ),
+    ]
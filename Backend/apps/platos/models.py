@@ -4,10 +4,13 @@ Modelos de Platos
 """
 
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
+from apps.inventario.models import UnitOfMeasure
+
 
 class DishCategory(models.TextChoices):
     APPETIZER = 'APPETIZER', _('Appetizer')
@@ -32,6 +35,8 @@ class Dish(models.Model):
     is_vegan = models.BooleanField(default=False, help_text=_("Is this dish vegan?"))
     allergens = models.TextField(blank=True, help_text=_("Allergen information (RNF-06 - Safety)"))
     popularity_score = models.IntegerField(default=0, help_text=_("Popularity score for recommendations (RF-03, RF-06)"))
+    trending_score = models.FloatField(default=0, help_text=_("Time-decayed popularity, log2 of the forward-decay sum (RF-03)"))
+    is_in_stock = models.BooleanField(default=True, help_text=_("Precomputed: enough stock for one serving (RF-02)"))
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -43,6 +48,8 @@ class Dish(models.Model):
         indexes = [
             models.Index(fields=['category', 'is_available']),
             models.Index(fields=['-popularity_score']),
+            models.Index(fields=['-trending_score']),
+            models.Index(fields=['is_in_stock']),
         ]
 
     def __str__(self):
@@ -55,17 +62,20 @@ class Dish(models.Model):
         return True
 
     def calculate_cost(self):
+        # base_quantity está en la unidad de stock, que es la de cost_per_unit
         total_cost = sum(
-            item.ingredient.cost_per_unit * item.quantity
+            item.ingredient.cost_per_unit * item.base_quantity
             for item in self.recipe_items.all()
         )
-        return total_cost
+        return Decimal(total_cost).quantize(Decimal('0.01'))
 
 
 class RecipeItem(models.Model):
     dish = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name='recipe_items', help_text=_("Related dish"))
     ingredient = models.ForeignKey('inventario.Ingredient', on_delete=models.PROTECT, related_name='recipe_items', help_text=_("Required ingredient (RF-02)"))
     quantity = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))], help_text=_("Quantity needed per serving (RF-02)"))
+    unit = models.CharField(max_length=5, choices=UnitOfMeasure.choices, blank=True, help_text=_("Recipe unit; blank means the ingredient's stock unit"))
+    base_quantity = models.DecimalField(max_digits=14, decimal_places=4, default=Decimal('0.0000'), editable=False, help_text=_("Precomputed: quantity in the ingredient's stock unit (RF-02)"))
     notes = models.TextField(blank=True, help_text=_("Preparation notes or special instructions"))
 
     class Meta:
@@ -77,8 +87,45 @@ class RecipeItem(models.Model):
     def __str__(self):
         return f"{self.dish.name} - {self.ingredient.name}: {self.quantity}"
 
+    def save(self, *args, **kwargs):
+        RecipeItem.set_base_quantities([self])
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'base_quantity'}
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def set_base_quantities(items):
+        """
+        Calcula `base_quantity` de varios items en una sola conversión en lote
+        (bulk_create/bulk_update no pasan por save). Lanza UnitConversionError.
+        """
+        from apps.inventario.units import convert_many
+
+        items = list(items)
+        values = convert_many(
+            [item.quantity for item in items],
+            [item.unit or item.ingredient.unit for item in items],
+            [item.ingredient.unit for item in items],
+            [item.ingredient.density for item in items],
+        )
+        for item, value in zip(items, values):
+            item.base_quantity = value
+        return items
+
     def check_availability(self):
         try:
-            return self.ingredient.stock.quantity >= self.quantity
+            return self.ingredient.stock.available_quantity >= self.base_quantity
         except AttributeError:
             return False
+
+
+class PopularityIncrement(models.Model):
+    """Pedidos de un plato pendientes de sumar a su popularidad (popularity.py)."""
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name='popularity_increments', help_text=_("Ordered dish"))
+    count = models.PositiveIntegerField(default=1, help_text=_("Order lines for the dish"))
+    created_at = models.DateTimeField(default=timezone.now, help_text=_("When the order was placed"))
+
+    class Meta:
+        db_table = 'dish_popularity_increments'
+        verbose_name = _('Popularity Increment')
+        verbose_name_plural = _('Popularity Increments')
@@ -25,3 +25,17 @@ class IsStaffOrReadOnly(permissions.BasePermission):
         return request.user and request.user.is_authenticated and (
             request.user.role in ['STAFF', 'ADMIN'] or request.user.is_staff
         )
+
+
+class IsStaffOnly(permissions.BasePermission):
+    """
+    Solo staff y admin, también para lectura.
+    RF-02: Información interna de inventario y producción.
+    """
+
+    def has_permission(self, request, view):
+        return bool(
+            request.user and request.user.is_authenticated and (
+                request.user.role in ['STAFF', 'ADMIN'] or request.user.is_staff
+            )
+        )
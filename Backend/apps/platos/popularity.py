@@ -0,0 +1,116 @@
+"""
+Agregador de Popularidad de Platos
+==================================
+RF-03, RF-06: Recomendaciones por popularidad
+
+Los pedidos no escriben directamente sobre las filas de `dishes`: al crear
+un pedido se inserta una fila por plato en `dish_popularity_increments`
+(solo INSERT, sin filas compartidas entre pedidos) dentro de la misma
+transacción, de modo que los incrementos no se pierden si el proceso se
+reinicia. El comando flush_popularity (programado cada minuto) los suma
+por plato y los aplica con un UPDATE en bloque, fuera de las peticiones.
+
+Además de `popularity_score` (conteo histórico) se mantiene
+`trending_score` con decaimiento temporal "forward decay": un incremento
+registrado en t pesa 2^((t - EPOCH) / vida_media). Para que el peso no
+desborde un float con el paso del tiempo se guarda en escala logarítmica:
+trending_score = log2(Σ conteo × peso), y la suma se hace con log_add. Ordenar
+por `trending_score` equivale a ordenar por la demanda reciente decaída,
+cuyo valor al instante t es 2^(trending_score - decay_exponent(t)).
+0 significa "sin demanda": todo incremento posterior a EPOCH da un valor > 0.
+"""
+
+import logging
+import math
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+DECAY_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def half_life_seconds():
+    return float(getattr(settings, 'POPULARITY_HALF_LIFE_DAYS', 7)) * 86400
+
+
+def decay_exponent(moment=None):
+    """log2 del peso de un incremento registrado en `moment` (forward decay)."""
+    moment = moment or timezone.now()
+    return (moment - DECAY_EPOCH).total_seconds() / half_life_seconds()
+
+
+def log_add(current, increment):
+    """log2(2^current + 2^increment) sin calcular las potencias; current <= 0 es vacío."""
+    if current is None or current <= 0:
+        return increment
+    high, low = max(current, increment), min(current, increment)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def increment_score(count, moment=None):
+    """trending_score de `count` pedidos registrados en `moment`."""
+    return math.log2(count) + decay_exponent(moment)
+
+
+def decayed_score(trending_score, moment=None):
+    """Convierte el trending_score almacenado en la demanda decaída al instante dado."""
+    if trending_score <= 0:
+        return 0.0
+    return 2 ** (trending_score - decay_exponent(moment))
+
+
+def record_order(dish_ids):
+    """Registra un incremento por cada id de plato (dentro de la transacción del pedido)."""
+    from .models import PopularityIncrement
+
+    PopularityIncrement.objects.bulk_create([
+        PopularityIncrement(dish_id=dish_id, count=count)
+        for dish_id, count in sorted(Counter(dish_ids).items())
+    ])
+
+
+def flush_popularity(batch_size=5000):
+    """
+    Aplica los incrementos pendientes, por lotes: suma por plato, bloquea
+    los platos en orden de id, los actualiza con un bulk_update y borra los
+    incrementos aplicados. Un error se registra en el log y deja los
+    incrementos para la siguiente ejecución. Devuelve cuántos aplicó.
+    """
+    from .models import Dish, PopularityIncrement
+
+    flushed = 0
+    while True:
+        try:
+            with transaction.atomic():
+                rows = list(
+                    PopularityIncrement.objects.order_by('id')
+                    .values_list('id', 'dish_id', 'count', 'created_at')[:batch_size]
+                )
+                if not rows:
+                    break
+                counts = Counter()
+                scores = {}
+                for _, dish_id, count, created_at in rows:
+                    counts[dish_id] += count
+                    scores[dish_id] = log_add(scores.get(dish_id), increment_score(count, created_at))
+
+                dishes = list(
+                    Dish.objects.select_for_update().filter(pk__in=counts)
+                    .order_by('pk').only('id', 'popularity_score', 'trending_score')
+                )
+                for dish in dishes:
+                    dish.popularity_score += counts[dish.pk]
+                    dish.trending_score = log_add(dish.trending_score, scores[dish.pk])
+                Dish.objects.bulk_update(dishes, ['popularity_score', 'trending_score'])
+                PopularityIncrement.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        except DatabaseError:
+            logger.exception('No se pudo volcar la popularidad de platos; se reintentará')
+            break
+        flushed += len(rows)
+    return flushed
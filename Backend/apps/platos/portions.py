@@ -0,0 +1,160 @@
+"""
+Porciones Servibles
+===================
+RF-02: Capacidad de producción según inventario
+
+Cuántas porciones de cada plato se pueden preparar con el stock actual:
+para cada plato, min(stock_i / cantidad_i) sobre los ingredientes de su
+receta. La matriz de recetas (platos × ingredientes) y el vector de stock se
+cargan con dos consultas para todo el menú y el cálculo se hace en memoria,
+vectorizado con NumPy si está instalado (dependencia opcional) o con un
+recorrido en Python puro si no.
+
+Con una mezcla objetivo (p. ej. 2 pizzas por cada ensalada) los
+ingredientes compartidos se descuentan juntos: se calcula cuántos lotes
+completos de la mezcla alcanzan, min(stock_i / Σ mezcla_d × cantidad_d,i).
+
+Ambos motores reciben los mismos datos normalizados: el stock libre negativo
+(reservado por encima del físico) cuenta como 0 y los ingredientes con
+cantidad 0 en la receta no limitan; un plato sin cantidades positivas se
+trata como un plato sin receta.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy es opcional
+    np = None
+
+
+# Tolerancia para que 0.6 / 0.2 no quede en 2.9999 al redondear hacia abajo
+EPSILON = 1e-9
+
+
+def load_recipe_matrix(dish_ids=None):
+    """
+    Devuelve (quantities, stock): {dish_id: {ingredient_id: cantidad en la
+    unidad de stock}} y
+    {ingredient_id: stock libre (físico - reservado)}, en dos consultas. Los
+    ingredientes sin fila de stock cuentan como 0.
+    """
+    from apps.inventario.models import InventoryStock
+    from .models import RecipeItem
+
+    rows = RecipeItem.objects.order_by()
+    if dish_ids is not None:
+        rows = rows.filter(dish_id__in=dish_ids)
+    quantities = defaultdict(dict)
+    for dish_id, ingredient_id, quantity in rows.values_list('dish_id', 'ingredient_id', 'base_quantity'):
+        quantities[dish_id][ingredient_id] = quantity
+
+    ingredient_ids = {ingredient_id for recipe in quantities.values() for ingredient_id in recipe}
+    stock = {
+        ingredient_id: quantity - reserved
+        for ingredient_id, quantity, reserved in InventoryStock.objects.filter(ingredient_id__in=ingredient_ids)
+        .values_list('ingredient_id', 'quantity', 'reserved_quantity')
+    }
+    return dict(quantities), stock
+
+
+def _required(quantities):
+    """Recetas sin los ingredientes con cantidad <= 0 (ni los platos que quedan vacíos)."""
+    required = {}
+    for dish_id, recipe in quantities.items():
+        recipe = {i: quantity for i, quantity in recipe.items() if quantity > 0}
+        if recipe:
+            required[dish_id] = recipe
+    return required
+
+
+def _free(stock, ingredient_id):
+    return max(stock.get(ingredient_id, Decimal('0')), Decimal('0'))
+
+
+def _index(quantities):
+    dish_ids = sorted(quantities)
+    ingredient_ids = sorted({i for recipe in quantities.values() for i in recipe})
+    return dish_ids, ingredient_ids
+
+
+def _arrays(quantities, stock, dish_ids, ingredient_ids):
+    column = {ingredient_id: n for n, ingredient_id in enumerate(ingredient_ids)}
+    matrix = np.zeros((len(dish_ids), len(ingredient_ids)))
+    for row, dish_id in enumerate(dish_ids):
+        for ingredient_id, quantity in quantities[dish_id].items():
+            matrix[row, column[ingredient_id]] = float(quantity)
+    vector = np.array([float(_free(stock, i)) for i in ingredient_ids])
+    return matrix, vector
+
+
+def max_portions(quantities, stock):
+    """
+    {dish_id: (porciones, ingrediente_limitante)} para cada plato con receta.
+    """
+    quantities = _required(quantities)
+    if not quantities:
+        return {}
+    dish_ids, ingredient_ids = _index(quantities)
+
+    if np is not None:
+        matrix, vector = _arrays(quantities, stock, dish_ids, ingredient_ids)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = np.where(matrix > 0, vector / matrix, np.inf)
+        limiting = ratios.argmin(axis=1)
+        portions = np.floor(ratios.min(axis=1) + EPSILON).astype(int)
+        return {
+            dish_id: (int(portions[row]), ingredient_ids[limiting[row]])
+            for row, dish_id in enumerate(dish_ids)
+        }
+
+    result = {}
+    for dish_id in dish_ids:
+        ratio, ingredient_id = min(
+            (_free(stock, i) / quantity, i)
+            for i, quantity in quantities[dish_id].items()
+        )
+        result[dish_id] = (int(ratio), ingredient_id)
+    return result
+
+
+def mix_batches(quantities, stock, mix):
+    """
+    Lotes completos de la mezcla {dish_id: unidades} que alcanzan con el
+    stock compartido. Devuelve (lotes, ingrediente_limitante); lotes es None
+    si ningún plato de la mezcla tiene receta.
+    """
+    quantities = _required(quantities)
+    recipes = {dish_id: quantities[dish_id] for dish_id in mix if dish_id in quantities}
+    if not recipes:
+        return None, None
+    dish_ids, ingredient_ids = _index(recipes)
+
+    if np is not None:
+        matrix, vector = _arrays(recipes, stock, dish_ids, ingredient_ids)
+        demand = np.array([float(mix[d]) for d in dish_ids]) @ matrix
+        ratios = vector / demand
+        limiting = int(ratios.argmin())
+        return int(np.floor(ratios[limiting] + EPSILON)), ingredient_ids[limiting]
+
+    demand = defaultdict(Decimal)
+    for dish_id in dish_ids:
+        for ingredient_id, quantity in recipes[dish_id].items():
+            demand[ingredient_id] += mix[dish_id] * quantity
+    ratio, ingredient_id = min(
+        (_free(stock, i) / demand[i], i) for i in ingredient_ids
+    )
+    return int(ratio), ingredient_id
+
+
+def parse_mix(value):
+    """Convierte "3:2,7:1" en {3: 2, 7: 1}; ValueError si el formato es inválido."""
+    mix = {}
+    for part in value.split(','):
+        dish, _, units = part.partition(':')
+        dish_id, units = int(dish), int(units or 1)
+        if units <= 0:
+            raise ValueError(f"Cantidad inválida para el plato {dish_id}: {units}.")
+        mix[dish_id] = mix.get(dish_id, 0) + units
+    return mix
@@ -4,9 +4,39 @@ Serializers para Platos
 RF-01: Gestión del menú digital
 """
 
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 from .models import Dish, RecipeItem
+from .availability import refresh_dish_availability
+from .cache import bump_menu_version
+from .costing import dish_cost, invalidate_costs
+from .signals import batched_recipe_changes
 from apps.inventario.models import Ingredient
+from apps.inventario.units import UnitConversionError, conversion_factor
+
+
+def recipe_changed(dish):
+    """bulk_create/bulk_update no disparan señales: recalcular lo derivado de la receta."""
+    refresh_dish_availability(dish_ids=[dish.pk])
+    invalidate_costs([dish.pk])
+    bump_menu_version()
+
+
+class PrefetchedIngredientField(serializers.PrimaryKeyRelatedField):
+    """
+    Resuelve el ingrediente desde el caché precargado por
+    DishCreateUpdateSerializer (context['prefetched_ingredients']).
+    """
+
+    def to_internal_value(self, data):
+        ingredients = self.context.get('prefetched_ingredients')
+        if ingredients is not None:
+            try:
+                return ingredients[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass  # Delegar para obtener el mensaje de error estándar
+        return super().to_internal_value(data)
 
 
 class RecipeItemSerializer(serializers.ModelSerializer):
@@ -14,6 +44,7 @@ class RecipeItemSerializer(serializers.ModelSerializer):
     Serializer para RecipeItem (ingredientes de una receta).
     RF-02: Control de inventario y recetas.
     """
+    ingredient = PrefetchedIngredientField(queryset=Ingredient.objects.all())
     ingredient_name = serializers.CharField(source='ingredient.name', read_only=True)
     ingredient_unit = serializers.CharField(source='ingredient.unit', read_only=True)
     is_available = serializers.SerializerMethodField()
@@ -22,9 +53,18 @@ class RecipeItemSerializer(serializers.ModelSerializer):
         model = RecipeItem
         fields = [
             'id', 'ingredient', 'ingredient_name', 'ingredient_unit',
-            'quantity', 'notes', 'is_available'
+            'quantity', 'unit', 'base_quantity', 'notes', 'is_available'
         ]
-        read_only_fields = ['id']
+        read_only_fields = ['id', 'base_quantity']
+
+    def validate(self, attrs):
+        """La unidad de la receta debe poder convertirse a la del ingrediente."""
+        ingredient = attrs['ingredient']
+        try:
+            conversion_factor(attrs.get('unit') or ingredient.unit, ingredient.unit, ingredient.density)
+        except UnitConversionError as exc:
+            raise serializers.ValidationError({'unit': str(exc)})
+        return attrs
 
     def get_is_available(self, obj):
         """Verifica si hay suficiente stock del ingrediente."""
@@ -37,7 +77,6 @@ class DishListSerializer(serializers.ModelSerializer):
     Optimizado para listados y búsquedas.
     """
     category_display = serializers.CharField(source='get_category_display', read_only=True)
-    is_in_stock = serializers.SerializerMethodField()
 
     class Meta:
         model = Dish
@@ -46,11 +85,8 @@ class DishListSerializer(serializers.ModelSerializer):
             'price', 'preparation_time', 'image', 'is_available',
             'is_vegetarian', 'is_vegan', 'popularity_score', 'is_in_stock'
         ]
-        read_only_fields = ['id', 'popularity_score']
-
-    def get_is_in_stock(self, obj):
-        """Verifica disponibilidad basada en inventario."""
-        return obj.check_availability()
+        # is_in_stock se mantiene precalculado (availability.py)
+        read_only_fields = ['id', 'popularity_score', 'is_in_stock']
 
 
 class DishDetailSerializer(serializers.ModelSerializer):
@@ -60,7 +96,6 @@ class DishDetailSerializer(serializers.ModelSerializer):
     """
     category_display = serializers.CharField(source='get_category_display', read_only=True)
     recipe_items = RecipeItemSerializer(many=True, read_only=True)
-    is_in_stock = serializers.SerializerMethodField()
     estimated_cost = serializers.SerializerMethodField()
 
     class Meta:
@@ -72,15 +107,11 @@ class DishDetailSerializer(serializers.ModelSerializer):
             'recipe_items', 'is_in_stock', 'estimated_cost',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'popularity_score', 'created_at', 'updated_at']
-
-    def get_is_in_stock(self, obj):
-        """Verifica disponibilidad basada en inventario."""
-        return obj.check_availability()
+        read_only_fields = ['id', 'popularity_score', 'is_in_stock', 'created_at', 'updated_at']
 
     def get_estimated_cost(self, obj):
-        """Calcula el costo estimado de producción."""
-        return float(obj.calculate_cost())
+        """Costo estimado de producción (costing.py, cacheado por plato)."""
+        return float(dish_cost(obj.pk))
 
 
 class DishCreateUpdateSerializer(serializers.ModelSerializer):
@@ -100,33 +131,93 @@ class DishCreateUpdateSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
+    def to_internal_value(self, data):
+        """Precarga en una consulta todos los ingredientes de la receta enviada."""
+        items = data.get('recipe_items') if hasattr(data, 'get') else None
+        if isinstance(items, list):
+            ingredient_ids = set()
+            for item in items:
+                try:
+                    ingredient_ids.add(int(item.get('ingredient')))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            self.context['prefetched_ingredients'] = Ingredient.objects.in_bulk(ingredient_ids)
+        return super().to_internal_value(data)
+
+    def to_representation(self, instance):
+        # La receta recién escrita se lee en una pasada (no por item)
+        if 'recipe_items' not in getattr(instance, '_prefetched_objects_cache', {}):
+            prefetch_related_objects([instance], 'recipe_items__ingredient__stock')
+        return super().to_representation(instance)
+
     def create(self, validated_data):
-        """Crea un plato con sus items de receta."""
+        """Crea un plato con sus items de receta (un solo INSERT para la receta)."""
         recipe_items_data = validated_data.pop('recipe_items', [])
-        dish = Dish.objects.create(**validated_data)
-        
-        for item_data in recipe_items_data:
-            RecipeItem.objects.create(dish=dish, **item_data)
-        
+        with transaction.atomic():
+            dish = Dish.objects.create(**validated_data)
+            RecipeItem.objects.bulk_create(RecipeItem.set_base_quantities(
+                RecipeItem(dish=dish, **item_data) for item_data in recipe_items_data
+            ))
+            recipe_changed(dish)
         return dish
 
     def update(self, instance, validated_data):
         """Actualiza un plato y opcionalmente su receta."""
         recipe_items_data = validated_data.pop('recipe_items', None)
-        
-        # Actualizar campos del plato
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        # Si se proveen recipe_items, reemplazar los existentes
-        if recipe_items_data is not None:
-            instance.recipe_items.all().delete()
-            for item_data in recipe_items_data:
-                RecipeItem.objects.create(dish=instance, **item_data)
-        
+
+        with transaction.atomic():
+            # Actualizar campos del plato
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            # Si se proveen recipe_items, la receta queda exactamente como se envía
+            if recipe_items_data is not None:
+                self.sync_recipe(instance, recipe_items_data)
+
         return instance
 
+    def sync_recipe(self, dish, recipe_items_data):
+        """
+        Compara la receta recibida con la existente por ingrediente: un
+        bulk_update de los items modificados, un bulk_create de los nuevos y
+        un DELETE filtrado de los que ya no están. Número constante de
+        consultas sin importar el tamaño de la receta.
+        """
+        existing = {item.ingredient_id: item for item in dish.recipe_items.all()}
+        to_update, to_create = [], []
+        for item_data in recipe_items_data:
+            ingredient = item_data['ingredient']
+            item = existing.get(ingredient.pk)
+            if item is None:
+                to_create.append(RecipeItem(dish=dish, **item_data))
+                continue
+            quantity, unit, notes = item_data['quantity'], item_data.get('unit', ''), item_data.get('notes', '')
+            if item.quantity != quantity or item.unit != unit or item.notes != notes:
+                item.quantity, item.unit, item.notes = quantity, unit, notes
+                item.ingredient = ingredient
+                to_update.append(item)
+
+        keep = [item_data['ingredient'].pk for item_data in recipe_items_data]
+        removed = RecipeItem.objects.filter(dish=dish).exclude(ingredient_id__in=keep)
+        # Las señales por item se silencian; se recalcula una vez abajo
+        with batched_recipe_changes():
+            removed.delete()
+        # Conversión de unidades en lote para todos los items escritos
+        RecipeItem.set_base_quantities(to_update + to_create)
+        if to_update:
+            RecipeItem.objects.bulk_update(to_update, ['quantity', 'unit', 'base_quantity', 'notes'])
+        if to_create:
+            RecipeItem.objects.bulk_create(to_create)
+        recipe_changed(dish)
+
+    def validate_recipe_items(self, value):
+        """Un ingrediente solo puede aparecer una vez por receta."""
+        ingredient_ids = [item['ingredient'].pk for item in value]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError("Cada ingrediente puede aparecer una sola vez en la receta.")
+        return value
+
     def validate_price(self, value):
         """Valida que el precio sea positivo."""
         if value <= 0:
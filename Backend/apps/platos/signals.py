@@ -0,0 +1,83 @@
+"""
+Señales de Platos
+=================
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.inventario.models import Ingredient, InventoryStock
+from apps.inventario.units import rebase_recipe_items
+from .availability import refresh_dish_availability, dishes_using
+from .cache import bump_menu_version
+from .costing import invalidate_costs
+from .models import Dish, RecipeItem
+
+
+_recipe_batch = threading.local()
+
+
+@contextmanager
+def batched_recipe_changes():
+    """
+    Silencia las señales por RecipeItem mientras se sincroniza una receta
+    completa; quien lo usa recalcula lo derivado una sola vez (recipe_changed).
+    """
+    previous = getattr(_recipe_batch, 'active', False)
+    _recipe_batch.active = True
+    try:
+        yield
+    finally:
+        _recipe_batch.active = previous
+
+
+def _in_recipe_batch(sender):
+    return sender is RecipeItem and getattr(_recipe_batch, 'active', False)
+
+
+@receiver([post_save, post_delete], sender=InventoryStock)
+def refresh_availability_on_stock_change(sender, instance, **kwargs):
+    """RF-02: Solo se recalculan los platos que usan el ingrediente."""
+    refresh_dish_availability(ingredient_ids=[instance.ingredient_id])
+
+
+@receiver([post_save, post_delete], sender=RecipeItem)
+def refresh_availability_on_recipe_change(sender, instance, **kwargs):
+    if _in_recipe_batch(sender):
+        return
+    refresh_dish_availability(dish_ids=[instance.dish_id])
+
+
+@receiver([post_save, post_delete], sender=Dish)
+@receiver([post_save, post_delete], sender=RecipeItem)
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_menu_cache(sender, **kwargs):
+    """RNF-01: Nueva versión del menú en caché (receta, costo o nombres cambiaron)."""
+    if _in_recipe_batch(sender):
+        return
+    bump_menu_version()
+
+
+@receiver([post_save, post_delete], sender=RecipeItem)
+def invalidate_cost_on_recipe_change(sender, instance, **kwargs):
+    if _in_recipe_batch(sender):
+        return
+    invalidate_costs([instance.dish_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def invalidate_cost_on_ingredient_change(sender, instance, created, update_fields=None, **kwargs):
+    """RF-06: Solo los platos que usan el ingrediente, si su costo pudo cambiar."""
+    if created or (update_fields is not None and 'cost_per_unit' not in update_fields):
+        return
+    invalidate_costs(dishes_using([instance.pk]))
+
+
+@receiver(post_save, sender=Ingredient)
+def rebase_recipes_on_unit_change(sender, instance, created, update_fields=None, **kwargs):
+    """RF-02: Nueva unidad o densidad: recalcular base_quantity de sus recetas."""
+    if created or (update_fields is not None and not {'unit', 'density'} & set(update_fields)):
+        return
+    rebase_recipe_items([instance.pk])
@@ -0,0 +1,84 @@
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.platos.models import Dish, RecipeItem
+from apps.platos.availability import refresh_dish_availability, dishes_using
+from apps.pedidos.models import Order, OrderItem, OrderStatus
+from apps.pedidos.transitions import transition_order
+from apps.inventario.models import Ingredient, InventoryStock
+
+
+@pytest.fixture
+def customer_user():
+    return User.objects.create_user(username='avail_customer', password='p', role='CUSTOMER')
+
+
+@pytest.fixture
+def menu():
+    rice = Ingredient.objects.create(name='Arroz')
+    fish = Ingredient.objects.create(name='Pescado')
+    rice_stock = InventoryStock.objects.create(ingredient=rice, quantity=Decimal('1.00'))
+    sushi = Dish.objects.create(name='Sushi', description='d', price=Decimal('12.00'))
+    bowl = Dish.objects.create(name='Bowl', description='d', price=Decimal('8.00'))
+    water = Dish.objects.create(name='Agua', description='d', price=Decimal('1.00'))
+    RecipeItem.objects.create(dish=sushi, ingredient=rice, quantity=Decimal('0.30'))
+    RecipeItem.objects.create(dish=sushi, ingredient=fish, quantity=Decimal('0.20'))
+    RecipeItem.objects.create(dish=bowl, ingredient=rice, quantity=Decimal('0.60'))
+    return {'rice': rice, 'fish': fish, 'rice_stock': rice_stock, 'sushi': sushi, 'bowl': bowl, 'water': water}
+
+
+def flags():
+    return dict(Dish.objects.values_list('name', 'is_in_stock'))
+
+
+@pytest.mark.django_db
+def test_flags_follow_stock_and_recipe_changes(menu):
+    # Fish has no stock row yet
+    assert flags() == {'Sushi': False, 'Bowl': True, 'Agua': True}
+    assert dishes_using([menu['rice'].id]) == {menu['sushi'].id, menu['bowl'].id}
+
+    fish_stock = InventoryStock.objects.create(ingredient=menu['fish'], quantity=Decimal('5.00'))
+    assert flags()['Sushi'] is True
+
+    menu['rice_stock'].deduct_stock(Decimal('0.50'))
+    assert flags() == {'Sushi': True, 'Bowl': False, 'Agua': True}
+
+    RecipeItem.objects.filter(dish=menu['bowl']).update(quantity=Decimal('0.10'), base_quantity=Decimal('0.10'))
+    assert refresh_dish_availability(dish_ids=[menu['bowl'].id]) == {menu['bowl'].id}
+    assert refresh_dish_availability() == set()
+
+    fish_stock.delete()
+    RecipeItem.objects.get(dish=menu['bowl']).delete()
+    assert flags() == {'Sushi': False, 'Bowl': True, 'Agua': True}
+    assert refresh_dish_availability(dish_ids=[]) == set()
+
+
+@pytest.mark.django_db
+def test_deduction_updates_only_affected_flags(menu, customer_user):
+    order = Order.objects.create(customer=customer_user, order_type='TAKEOUT')
+    OrderItem.objects.create(order=order, dish=menu['bowl'], quantity=1, unit_price=Decimal('8.00'))
+    transition_order(order, OrderStatus.CONFIRMED)
+    assert flags() == {'Sushi': False, 'Bowl': False, 'Agua': True}
+
+
+@pytest.mark.django_db
+def test_menu_list_reads_flag_without_recipes(menu, customer_user, django_assert_num_queries):
+    api = APIClient()
+    api.force_authenticate(user=customer_user)
+    url = reverse('platos:dish-list')
+    with django_assert_num_queries(2):  # count + page, no recipe or stock lookups
+        resp = api.get(url)
+    assert resp.status_code == status.HTTP_200_OK
+    rows = resp.data['results'] if isinstance(resp.data, dict) else resp.data
+    assert {row['name']: row['is_in_stock'] for row in rows} == flags()
+
+    resp = api.get(url, {'is_in_stock': 'false'})
+    rows = resp.data['results'] if isinstance(resp.data, dict) else resp.data
+    assert [row['name'] for row in rows] == ['Sushi']
+
+    detail = api.get(reverse('platos:dish-detail', args=[menu['sushi'].id]))
+    assert detail.data['is_in_stock'] is False
+    assert {item['is_available'] for item in detail.data['recipe_items']} == {True, False}
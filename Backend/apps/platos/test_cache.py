@@ -0,0 +1,103 @@
+import pytest
+from decimal import Decimal
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.platos.models import Dish, RecipeItem
+from apps.platos.cache import MENU_VERSION_KEY, menu_version, bump_menu_version
+from apps.inventario.models import Ingredient, InventoryStock
+
+
+@pytest.fixture
+def customer_api():
+    api = APIClient()
+    api.force_authenticate(user=User.objects.create_user(username='cache_customer', password='p', role='CUSTOMER'))
+    return api
+
+
+@pytest.fixture
+def dish():
+    return Dish.objects.create(name='Tacos', description='d', category='MAIN_COURSE', price=Decimal('6.00'))
+
+
+def names(resp):
+    rows = resp.data['results'] if isinstance(resp.data, dict) else resp.data
+    return [row['name'] for row in rows]
+
+
+@pytest.mark.django_db
+def test_menu_reads_are_served_from_cache(customer_api, dish, django_assert_num_queries):
+    url = reverse('platos:dish-list')
+    first = customer_api.get(url, {'category': 'MAIN_COURSE', 'search': '', 'ordering': 'name'})
+    assert names(first) == ['Tacos']
+
+    # Same parameters in another order (and empty values dropped) hit the same entry
+    with django_assert_num_queries(0):
+        again = customer_api.get(url, {'ordering': 'name', 'category': 'MAIN_COURSE'})
+        customer_api.get(url, {'ordering': 'name', 'category': 'MAIN_COURSE'})
+    assert again.data == first.data
+
+    detail = reverse('platos:dish-detail', args=[dish.id])
+    # The cached detail only re-reads per-ingredient availability
+    for action_url, queries in [(detail, 1), (reverse('platos:dish-popular'), 0), (reverse('platos:dish-categories'), 0)]:
+        assert customer_api.get(action_url).status_code == status.HTTP_200_OK
+        with django_assert_num_queries(queries):
+            assert customer_api.get(action_url).status_code == status.HTTP_200_OK
+
+    # Errors are not cached
+    missing = reverse('platos:dish-detail', args=[dish.id + 100])
+    assert customer_api.get(missing).status_code == status.HTTP_404_NOT_FOUND
+    assert customer_api.get(missing).status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_menu_version_bumps_on_dish_and_availability_changes(customer_api, dish):
+    url = reverse('platos:dish-list')
+    customer_api.get(url)
+    version = menu_version()
+
+    dish.price = Decimal('7.00')
+    dish.save()
+    assert menu_version() > version
+    resp = customer_api.get(url)
+    assert resp.data['results'][0]['price'] == '7.00'
+
+    corn = Ingredient.objects.create(name='Maíz')
+    stock = InventoryStock.objects.create(ingredient=corn, quantity=Decimal('1.00'))
+    RecipeItem.objects.create(dish=dish, ingredient=corn, quantity=Decimal('0.40'))
+
+    # Stock changes only invalidate the menu when a dish flips availability
+    version = menu_version()
+    stock.deduct_stock(Decimal('0.10'))
+    assert menu_version() == version
+    stock.deduct_stock(Decimal('0.60'))
+    assert menu_version() > version
+    assert customer_api.get(url).data['results'][0]['is_in_stock'] is False
+
+    # An ingredient running out without flipping the dish still shows in the cached detail
+    salt = Ingredient.objects.create(name='Sal')
+    salt_stock = InventoryStock.objects.create(ingredient=salt, quantity=Decimal('1.00'))
+    RecipeItem.objects.create(dish=dish, ingredient=salt, quantity=Decimal('0.50'))
+    detail = reverse('platos:dish-detail', args=[dish.id])
+    items = {item['ingredient_name']: item['is_available'] for item in customer_api.get(detail).data['recipe_items']}
+    assert items == {'Maíz': False, 'Sal': True}
+    version = menu_version()
+    salt_stock.deduct_stock(Decimal('0.80'))
+    assert menu_version() == version
+    items = {item['ingredient_name']: item['is_available'] for item in customer_api.get(detail).data['recipe_items']}
+    assert items == {'Maíz': False, 'Sal': False}
+
+
+@pytest.mark.django_db
+def test_bump_repeats_on_commit_and_survives_eviction(django_capture_on_commit_callbacks):
+    version = menu_version()
+    with django_capture_on_commit_callbacks(execute=True):
+        bump_menu_version()
+        assert menu_version() == version + 1
+    assert menu_version() == version + 2
+
+    cache.delete(MENU_VERSION_KEY)
+    bump_menu_version()
+    assert cache.get(MENU_VERSION_KEY) is not None
@@ -0,0 +1,93 @@
+import pytest
+from decimal import Decimal
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.platos.models import Dish, RecipeItem
+from apps.platos.costing import dish_cost, dish_costs, annotate_cost
+from apps.inventario.models import Ingredient
+
+
+@pytest.fixture
+def recipes():
+    dough = Ingredient.objects.create(name='Masa', cost_per_unit=Decimal('2.00'))
+    tomato = Ingredient.objects.create(name='Tomate', cost_per_unit=Decimal('1.50'))
+    pizza = Dish.objects.create(name='Pizza', description='d', price=Decimal('10.00'))
+    focaccia = Dish.objects.create(name='Focaccia', description='d', price=Decimal('4.00'))
+    salad = Dish.objects.create(name='Ensalada', description='d', price=Decimal('5.00'))
+    RecipeItem.objects.create(dish=pizza, ingredient=dough, quantity=Decimal('1.00'))
+    RecipeItem.objects.create(dish=pizza, ingredient=tomato, quantity=Decimal('0.50'))
+    RecipeItem.objects.create(dish=focaccia, ingredient=dough, quantity=Decimal('1.50'))
+    return {'dough': dough, 'tomato': tomato, 'pizza': pizza, 'focaccia': focaccia, 'salad': salad}
+
+
+@pytest.mark.django_db
+def test_costs_match_python_and_are_cached(recipes, django_assert_num_queries):
+    pizza, focaccia, salad = recipes['pizza'], recipes['focaccia'], recipes['salad']
+    with django_assert_num_queries(1):
+        costs = dish_costs([pizza.id, focaccia.id, salad.id])
+    assert costs == {pizza.id: Decimal('2.75'), focaccia.id: Decimal('3.00'), salad.id: Decimal('0.00')}
+    for dish in [pizza, focaccia, salad]:
+        assert costs[dish.id] == dish.calculate_cost()
+
+    with django_assert_num_queries(0):
+        assert dish_cost(pizza.id) == Decimal('2.75')
+
+
+@pytest.mark.django_db
+def test_cached_costs_expire(recipes, settings, monkeypatch):
+    calls = []
+    monkeypatch.setattr(cache, 'set_many', lambda data, timeout: calls.append(timeout))
+    settings.CACHE_TIMEOUT = 42
+    dish_costs([recipes['pizza'].id])
+    assert calls == [42]
+
+
+@pytest.mark.django_db
+def test_cost_cache_invalidation(recipes):
+    pizza, focaccia, tomato = recipes['pizza'], recipes['focaccia'], recipes['tomato']
+    dish_costs([pizza.id, focaccia.id])
+
+    tomato.cost_per_unit = Decimal('3.00')
+    tomato.save()
+    assert dish_cost(pizza.id) == Decimal('3.50')
+
+    # Saving other fields only does not touch the cache
+    tomato.cost_per_unit = Decimal('9.00')
+    tomato.save(update_fields=['description'])
+    assert dish_cost(pizza.id) == Decimal('3.50')
+
+    RecipeItem.objects.filter(dish=focaccia).get().delete()
+    assert dish_cost(focaccia.id) == Decimal('0.00')
+
+
+@pytest.mark.django_db
+def test_margin_report_and_admin_column(recipes, django_assert_num_queries):
+    staff = User.objects.create_user(username='margin_staff', password='p', role='STAFF')
+    api = APIClient()
+    api.force_authenticate(user=staff)
+    url = reverse('reports:menu-margin-list')
+
+    with django_assert_num_queries(1):
+        resp = api.get(url)
+    assert resp.status_code == status.HTTP_200_OK
+    assert [row['name'] for row in resp.data] == ['Focaccia', 'Pizza', 'Ensalada']
+    assert resp.data[0]['margin'] == Decimal('1.00') and resp.data[0]['margin_pct'] == 25.0
+
+    resp = api.get(url, {'ordering': '-food_cost', 'category': 'MAIN_COURSE', 'is_available': 'true'})
+    assert [row['name'] for row in resp.data] == ['Focaccia', 'Pizza', 'Ensalada']
+    assert api.get(url, {'ordering': 'cost'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    api.force_authenticate(user=User.objects.create_user(username='margin_cust', password='p', role='CUSTOMER'))
+    assert api.get(url).status_code == status.HTTP_403_FORBIDDEN
+
+    dish_admin = site._registry[Dish]
+    request = RequestFactory().get('/admin/platos/dish/')
+    pizza = dish_admin.get_queryset(request).get(pk=recipes['pizza'].pk)
+    assert dish_admin.food_cost(pizza) == Decimal('2.75')
+    assert dish_admin.margin(pizza) == Decimal('7.25')
+    assert annotate_cost(Dish.objects.filter(pk=recipes['salad'].pk)).get().food_cost == Decimal('0.00')
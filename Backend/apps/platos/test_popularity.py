@@ -0,0 +1,97 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.platos.models import Dish, PopularityIncrement
+from apps.platos.popularity import (
+    DECAY_EPOCH, decay_exponent, decayed_score, flush_popularity, increment_score, log_add, record_order,
+)
+from apps.pedidos.serializers import OrderCreateSerializer
+
+
+@pytest.fixture
+def dishes():
+    return [Dish.objects.create(name=f'Pop {i}', description='d', price=Decimal('3.00')) for i in range(3)]
+
+
+@pytest.mark.django_db
+def test_increments_are_flushed_in_bulk_per_dish(dishes, django_assert_num_queries):
+    a, b, _ = dishes
+    record_order([a.id, a.id, b.id])
+    record_order([a.id])
+    assert PopularityIncrement.objects.count() == 3
+    a.refresh_from_db()
+    assert a.popularity_score == 0
+
+    # savepoint, pending increments, locked dishes, bulk update, delete, release,
+    # then savepoint, empty read and release
+    with django_assert_num_queries(9):
+        assert flush_popularity() == 3
+    assert not PopularityIncrement.objects.exists()
+    a.refresh_from_db()
+    b.refresh_from_db()
+    assert (a.popularity_score, b.popularity_score) == (3, 1)
+    assert a.trending_score > b.trending_score > 0
+
+    out = StringIO()
+    call_command('flush_popularity', stdout=out)
+    assert 'Applied 0' in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_flush_keeps_increments_when_the_database_fails(dishes, monkeypatch):
+    record_order([dishes[0].id])
+
+    def fail(*args, **kwargs):
+        raise DatabaseError('boom')
+
+    monkeypatch.setattr(Dish.objects, 'bulk_update', fail)
+    assert flush_popularity() == 0
+    assert PopularityIncrement.objects.count() == 1
+
+
+def test_forward_decay_halves_per_half_life_without_overflow(settings):
+    settings.POPULARITY_HALF_LIFE_DAYS = 7
+    now = timezone.now()
+    stored = increment_score(1, now - timedelta(days=7))
+    assert decayed_score(stored, now) == pytest.approx(0.5)
+    assert decayed_score(log_add(stored, stored), now) == pytest.approx(1.0)
+    assert decayed_score(0) == 0.0
+
+    # A one-day half-life stays finite centuries after the epoch
+    settings.POPULARITY_HALF_LIFE_DAYS = 1
+    far = DECAY_EPOCH + timedelta(days=365 * 300)
+    score = log_add(increment_score(3, far), increment_score(1, far - timedelta(days=1)))
+    assert decay_exponent(far) > 1024
+    assert decayed_score(score, far) == pytest.approx(3.5)
+
+
+@pytest.mark.django_db
+def test_order_placement_feeds_increments_and_trending_endpoint(dishes):
+    user = User.objects.create_user(username='popc', password='p', role='CUSTOMER')
+    old, recent, _ = dishes
+    # Old demand: many orders two half-lives ago
+    Dish.objects.filter(pk=old.pk).update(
+        popularity_score=10, trending_score=increment_score(10, timezone.now() - timedelta(days=14))
+    )
+
+    ser = OrderCreateSerializer(data={'customer': user.id, 'order_type': 'TAKEOUT',
+                                      'items': [{'dish': recent.id, 'quantity': 1}] * 4})
+    ser.is_valid(raise_exception=True)
+    ser.save()
+    assert PopularityIncrement.objects.get(dish=recent).count == 4
+    flush_popularity()
+    recent.refresh_from_db()
+    assert recent.popularity_score == 4
+
+    api = APIClient()
+    api.force_authenticate(user=user)
+    url = reverse('platos:dish-popular')
+    assert api.get(url).data[0]['id'] == old.id
+    assert api.get(url, {'trending': 'true'}).data[0]['id'] == recent.id
@@ -0,0 +1,99 @@
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.platos import portions
+from apps.platos.models import Dish, RecipeItem
+from apps.platos.portions import load_recipe_matrix, max_portions, mix_batches, parse_mix
+from apps.inventario.models import Ingredient, InventoryStock
+
+
+@pytest.fixture
+def menu():
+    flour = Ingredient.objects.create(name='Harina')
+    cheese = Ingredient.objects.create(name='Queso')
+    basil = Ingredient.objects.create(name='Albahaca')
+    InventoryStock.objects.create(ingredient=flour, quantity=Decimal('3.00'))
+    InventoryStock.objects.create(ingredient=cheese, quantity=Decimal('0.60'))
+    pizza = Dish.objects.create(name='Pizza', description='d', price=Decimal('9.00'))
+    bread = Dish.objects.create(name='Pan', description='d', price=Decimal('2.00'))
+    pesto = Dish.objects.create(name='Pesto', description='d', price=Decimal('7.00'))
+    water = Dish.objects.create(name='Agua', description='d', price=Decimal('1.00'))
+    RecipeItem.objects.create(dish=pizza, ingredient=flour, quantity=Decimal('0.50'))
+    RecipeItem.objects.create(dish=pizza, ingredient=cheese, quantity=Decimal('0.20'))
+    RecipeItem.objects.create(dish=bread, ingredient=flour, quantity=Decimal('0.25'))
+    RecipeItem.objects.create(dish=pesto, ingredient=basil, quantity=Decimal('0.10'))
+    return {'flour': flour, 'cheese': cheese, 'basil': basil, 'pizza': pizza, 'bread': bread, 'pesto': pesto, 'water': water}
+
+
+@pytest.mark.django_db
+def test_max_portions_and_mix(menu, engine):
+    quantities, stock = load_recipe_matrix()
+    result = max_portions(quantities, stock)
+    # 0.60 / 0.20 must floor to exactly 3 despite float rounding
+    assert result[menu['pizza'].id] == (3, menu['cheese'].id)
+    assert result[menu['bread'].id] == (12, menu['flour'].id)
+    assert result[menu['pesto'].id] == (0, menu['basil'].id)
+    assert menu['water'].id not in result
+    assert max_portions({}, {}) == {}
+
+    # 2 pizzas + 6 breads per batch need 2.5 flour: shared flour limits to 1 batch
+    assert mix_batches(quantities, stock, {menu['pizza'].id: 2, menu['bread'].id: 6}) == (1, menu['flour'].id)
+    assert mix_batches(quantities, stock, {menu['water'].id: 1}) == (None, None)
+
+
+def test_engines_agree_on_negative_stock_and_zero_quantities(monkeypatch):
+    pytest.importorskip('numpy')
+    quantities = {
+        1: {10: Decimal('0.20'), 11: Decimal('0')},
+        2: {11: Decimal('0.50'), 12: Decimal('0.30')},
+        3: {12: Decimal('0')},
+        4: {13: Decimal('0.10')},
+    }
+    # 11: more reserved than on hand; 13: no stock row
+    stock = {10: Decimal('0.60'), 11: Decimal('-1.25'), 12: Decimal('1.00')}
+    mixes = [{1: 2, 2: 1}, {1: 1, 3: 4}, {3: 1}]
+
+    def run():
+        return max_portions(quantities, stock), [mix_batches(quantities, stock, mix) for mix in mixes]
+
+    with_numpy = run()
+    monkeypatch.setattr(portions, 'np', None)
+    assert run() == with_numpy
+    assert with_numpy == (
+        {1: (3, 10), 2: (0, 11), 4: (0, 13)},
+        [(0, 11), (3, 10), (None, None)],
+    )
+
+
+def test_parse_mix():
+    assert parse_mix('3:2,7,3:1') == {3: 3, 7: 1}
+    with pytest.raises(ValueError):
+        parse_mix('3:0')
+    with pytest.raises(ValueError):
+        parse_mix('pizza:1')
+
+
+@pytest.mark.django_db
+def test_portions_endpoint(menu, django_assert_num_queries):
+    api = APIClient()
+    url = reverse('platos:dish-portions')
+    api.force_authenticate(user=User.objects.create_user(username='por_customer', password='p', role='CUSTOMER'))
+    assert api.get(url).status_code == status.HTTP_403_FORBIDDEN
+
+    api.force_authenticate(user=User.objects.create_user(username='por_staff', password='p', role='STAFF'))
+    with django_assert_num_queries(3):
+        resp = api.get(url, {'mix': f"{menu['pizza'].id}:1,{menu['water'].id}:2"})
+    assert resp.status_code == status.HTTP_200_OK
+    rows = {row['name']: row for row in resp.data['dishes']}
+    assert list(rows) == ['Agua', 'Pan', 'Pesto', 'Pizza']
+    assert rows['Pizza']['max_portions'] == 3 and rows['Pizza']['limiting_ingredient'] == menu['cheese'].id
+    assert rows['Agua']['max_portions'] is None
+    assert resp.data['mix']['batches'] == 3
+    assert resp.data['mix']['portions'] == {menu['pizza'].id: 3, menu['water'].id: 6}
+
+    assert api.get(url, {'mix': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+    assert api.get(url, {'mix': '999999:1'}).status_code == status.HTTP_400_BAD_REQUEST
+    assert api.get(url, {'mix': f"{menu['water'].id}:1"}).data['mix']['portions'] == {menu['water'].id: None}
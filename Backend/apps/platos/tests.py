@@ -310,6 +310,27 @@ class TestDishViewSetCustomActions:
         salad_cat = next((c for c in response.data if c['code'] == DishCategory.SALAD), None)
         assert salad_cat is not None
         assert salad_cat['count'] == 2
+
+    def test_categories_single_grouped_query_with_details(self, api_client, customer_user, django_assert_num_queries):
+        """Categorías en un solo GROUP BY, con detalles opcionales y caché."""
+        Dish.objects.create(name='Sopa 1', description='Test', price=Decimal('4.00'), category=DishCategory.SOUP)
+        Dish.objects.create(name='Sopa 2', description='Test', price=Decimal('9.50'), category=DishCategory.SOUP, is_in_stock=False)
+        Dish.objects.create(name='Sopa 3', description='Test', price=Decimal('1.00'), category=DishCategory.SOUP, is_available=False)
+
+        api_client.force_authenticate(user=customer_user)
+        url = reverse('platos:dish-categories')
+        with django_assert_num_queries(1):
+            response = api_client.get(url, {'details': 'true'})
+        assert len(response.data) == len(DishCategory.choices)
+        soup = next(c for c in response.data if c['code'] == DishCategory.SOUP)
+        assert soup['count'] == 2 and soup['in_stock'] == 1
+        assert soup['min_price'] == Decimal('4.00') and soup['max_price'] == Decimal('9.50')
+        dessert = next(c for c in response.data if c['code'] == DishCategory.DESSERT)
+        assert dessert == {'code': 'DESSERT', 'name': 'Dessert', 'count': 0, 'min_price': None, 'max_price': None, 'in_stock': 0}
+
+        with django_assert_num_queries(0):
+            assert api_client.get(url, {'details': 'true'}).data == response.data
+        assert 'min_price' not in api_client.get(url).data[0]
     
     def test_mark_unavailable(self, api_client, staff_user, sample_dish):
         """Marcar plato como no disponible."""
@@ -358,6 +379,65 @@ class TestDishSerializers:
         dish = Dish.objects.get(name='Bread')
         assert dish.recipe_items.count() == 1
     
+    def test_recipe_update_diffs_by_ingredient(self, api_client, staff_user):
+        """La receta se actualiza por diferencia: conserva ids y recalcula derivados."""
+        a, b, c, d = [Ingredient.objects.create(name=f'Ing {n}', cost_per_unit=Decimal('1.00')) for n in 'ABCD']
+        for ingredient in (a, b, c):
+            InventoryStock.objects.create(ingredient=ingredient, quantity=Decimal('10.00'))
+        dish = Dish.objects.create(name='Guiso', description='Test', price=Decimal('8.00'))
+        item_a = RecipeItem.objects.create(dish=dish, ingredient=a, quantity=Decimal('1.00'))
+        item_b = RecipeItem.objects.create(dish=dish, ingredient=b, quantity=Decimal('1.00'), notes='picado')
+        RecipeItem.objects.create(dish=dish, ingredient=c, quantity=Decimal('1.00'))
+
+        api_client.force_authenticate(user=staff_user)
+        url = reverse('platos:dish-detail', args=[dish.id])
+        response = api_client.patch(url, {'recipe_items': [
+            {'ingredient': a.id, 'quantity': '2.00'},
+            {'ingredient': b.id, 'quantity': '1.00', 'notes': 'picado'},
+            {'ingredient': d.id, 'quantity': '0.50'},
+        ]}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        items = {item.ingredient_id: item for item in dish.recipe_items.all()}
+        assert set(items) == {a.id, b.id, d.id}
+        assert items[a.id].pk == item_a.pk and items[a.id].quantity == Decimal('2.00')
+        assert items[b.id].pk == item_b.pk
+        assert len(response.data['recipe_items']) == 3
+
+        # Derivados: sin stock de D el plato queda agotado y el costo se recalcula
+        detail = api_client.get(url)
+        assert detail.data['is_in_stock'] is False
+        assert detail.data['estimated_cost'] == 3.5
+
+        duplicated = api_client.patch(url, {'recipe_items': [
+            {'ingredient': a.id, 'quantity': '1.00'}, {'ingredient': a.id, 'quantity': '2.00'},
+        ]}, format='json')
+        assert duplicated.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_recipe_update_constant_queries(self, api_client, staff_user):
+        """El número de consultas no depende del tamaño de la receta."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        api_client.force_authenticate(user=staff_user)
+        counts = []
+        for size in (3, 12):
+            ingredients = [Ingredient.objects.create(name=f'R{size}-{n}') for n in range(size * 2)]
+            dish = Dish.objects.create(name=f'Receta {size}', description='Test', price=Decimal('8.00'))
+            RecipeItem.objects.bulk_create([
+                RecipeItem(dish=dish, ingredient=ingredient, quantity=Decimal('1.00'))
+                for ingredient in ingredients[:size]
+            ])
+            # La mitad se modifica, la otra mitad se elimina y se agregan nuevos
+            payload = [{'ingredient': i.id, 'quantity': '2.00'} for i in ingredients[:size // 2]]
+            payload += [{'ingredient': i.id, 'quantity': '1.00'} for i in ingredients[size:]]
+            url = reverse('platos:dish-detail', args=[dish.id])
+            with CaptureQueriesContext(connection) as ctx:
+                response = api_client.patch(url, {'recipe_items': payload}, format='json')
+            assert response.status_code == status.HTTP_200_OK
+            assert dish.recipe_items.count() == len(payload)
+            counts.append(len(ctx.captured_queries))
+        assert counts[0] == counts[1]
+    
     def test_vegan_automatically_vegetarian(self, api_client, staff_user):
         """Platos veganos se marcan automáticamente como vegetarianos."""
         api_client.force_authenticate(user=staff_user)
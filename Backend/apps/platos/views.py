@@ -4,6 +4,7 @@ Views (ViewSets) para Platos
 RF-01: Gestión del menú digital
 """
 
+from django.db.models import Count, Max, Min, Q
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -17,7 +18,10 @@ from .serializers import (
     DishDetailSerializer,
     DishCreateUpdateSerializer
 )
-from .permissions import IsStaffOrReadOnly
+from .permissions import IsStaffOrReadOnly, IsStaffOnly
+from .availability import recipe_item_availability
+from .cache import cached_menu_response
+from .portions import load_recipe_matrix, max_portions, mix_batches, parse_mix
 
 
 class DishViewSet(viewsets.ModelViewSet):
@@ -34,19 +38,27 @@ class DishViewSet(viewsets.ModelViewSet):
     Filtros disponibles:
     - category: Filtrar por categoría
     - is_available: Filtrar por disponibilidad
+    - is_in_stock: Filtrar por stock de ingredientes (precalculado)
     - is_vegetarian: Filtrar vegetarianos
     - is_vegan: Filtrar veganos
     - search: Buscar por nombre o descripción
     - ordering: Ordenar por precio, popularidad, nombre
     """
-    queryset = Dish.objects.all().prefetch_related('recipe_items__ingredient')
+    queryset = Dish.objects.all()
     permission_classes = [IsStaffOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'is_available', 'is_vegetarian', 'is_vegan']
+    filterset_fields = ['category', 'is_available', 'is_in_stock', 'is_vegetarian', 'is_vegan']
     search_fields = ['name', 'description', 'allergens']
     ordering_fields = ['name', 'price', 'popularity_score', 'preparation_time', 'created_at']
     ordering = ['category', 'name']
 
+    def get_queryset(self):
+        """El listado lee is_in_stock precalculado; solo el detalle carga la receta."""
+        queryset = super().get_queryset()
+        if self.action not in ['list', 'popular', 'categories', 'portions']:
+            queryset = queryset.prefetch_related('recipe_items__ingredient__stock')
+        return queryset
+
     def get_serializer_class(self):
         """Devuelve el serializer apropiado según la acción."""
         if self.action == 'list':
@@ -66,6 +78,7 @@ class DishViewSet(viewsets.ModelViewSet):
             openapi.Parameter('ordering', openapi.IN_QUERY, description="Ordenar por: name, price, popularity_score, -price, etc.", type=openapi.TYPE_STRING),
         ]
     )
+    @cached_menu_response()
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
@@ -73,6 +86,16 @@ class DishViewSet(viewsets.ModelViewSet):
         operation_description="Obtiene el detalle completo de un plato incluyendo su receta"
     )
     def retrieve(self, request, *args, **kwargs):
+        response = self._cached_detail(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            # La disponibilidad por ingrediente no invalida el menú: se lee fresca
+            available = recipe_item_availability(response.data['id'])
+            for item in response.data['recipe_items']:
+                item['is_available'] = available.get(item['id'], False)
+        return response
+
+    @cached_menu_response()
+    def _cached_detail(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
     @swagger_auto_schema(
@@ -107,38 +130,122 @@ class DishViewSet(viewsets.ModelViewSet):
         operation_description="Obtiene platos populares (RF-06: Recomendaciones)",
         manual_parameters=[
             openapi.Parameter('limit', openapi.IN_QUERY, description="Número de platos a retornar (default: 10)", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('trending', openapi.IN_QUERY, description="Ordenar por demanda reciente (popularidad con decaimiento temporal)", type=openapi.TYPE_BOOLEAN),
         ]
     )
     @action(detail=False, methods=['get'])
+    @cached_menu_response(timeout_setting='POPULARITY_FLUSH_INTERVAL')
     def popular(self, request):
         """
         Endpoint personalizado para obtener platos populares.
         RF-06: Sistema de recomendaciones.
         """
         limit = int(request.query_params.get('limit', 10))
-        popular_dishes = self.queryset.filter(is_available=True).order_by('-popularity_score')[:limit]
+        trending = request.query_params.get('trending', '').lower() in ['1', 'true', 'yes']
+        order_field = '-trending_score' if trending else '-popularity_score'
+        popular_dishes = self.queryset.filter(is_available=True).order_by(order_field)[:limit]
         serializer = DishListSerializer(popular_dishes, many=True)
         return Response(serializer.data)
 
     @swagger_auto_schema(
         method='get',
-        operation_description="Obtiene las categorías disponibles con conteo de platos"
+        operation_description="Obtiene las categorías disponibles con conteo de platos",
+        manual_parameters=[
+            openapi.Parameter('details', openapi.IN_QUERY, description="Incluir precio mínimo/máximo y platos con stock por categoría", type=openapi.TYPE_BOOLEAN),
+        ]
     )
     @action(detail=False, methods=['get'])
+    @cached_menu_response()
     def categories(self, request):
         """
         Endpoint para obtener todas las categorías con conteo de platos.
+        Un solo GROUP BY sobre los platos disponibles (RNF-01).
         """
+        details = request.query_params.get('details', '').lower() in ['1', 'true', 'yes']
+        aggregates = {'count': Count('id')}
+        if details:
+            aggregates.update(
+                min_price=Min('price'),
+                max_price=Max('price'),
+                in_stock=Count('id', filter=Q(is_in_stock=True)),
+            )
+        # order_by() elimina el ordenamiento por defecto (category, name) del GROUP BY
+        rows = {
+            row.pop('category'): row
+            for row in Dish.objects.filter(is_available=True)
+            .order_by()
+            .values('category')
+            .annotate(**aggregates)
+        }
+
+        empty = {'count': 0}
+        if details:
+            empty.update(min_price=None, max_price=None, in_stock=0)
         categories_data = []
         for category_code, category_name in DishCategory.choices:
-            count = self.queryset.filter(category=category_code, is_available=True).count()
             categories_data.append({
                 'code': category_code,
                 'name': category_name,
-                'count': count
+                **rows.get(category_code, empty)
             })
         return Response(categories_data)
 
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Porciones que se pueden preparar de cada plato con el stock actual (solo staff/admin)",
+        manual_parameters=[
+            openapi.Parameter('mix', openapi.IN_QUERY, description="Mezcla objetivo 'plato:unidades,...' (p. ej. 3:2,7:1) para descontar ingredientes compartidos", type=openapi.TYPE_STRING),
+        ]
+    )
+    @action(detail=False, methods=['get'], permission_classes=[IsStaffOnly])
+    def portions(self, request):
+        """
+        Máximo de porciones servibles por plato: min(stock / cantidad) sobre
+        su receta, para todo el menú con tres consultas.
+        RF-02: Capacidad de producción.
+        """
+        mix = None
+        if request.query_params.get('mix'):
+            try:
+                mix = parse_mix(request.query_params['mix'])
+            except ValueError:
+                return Response(
+                    {'error': "Formato de mezcla inválido. Use 'plato:unidades,plato:unidades'."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        names = dict(Dish.objects.order_by('name').values_list('id', 'name'))
+        if mix:
+            unknown = sorted(set(mix) - set(names))
+            if unknown:
+                return Response(
+                    {'error': f"Platos inexistentes en la mezcla: {unknown}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        quantities, stock = load_recipe_matrix()
+        portions = max_portions(quantities, stock)
+        data = {
+            'dishes': [
+                {
+                    'id': dish_id,
+                    'name': name,
+                    # Platos sin receta no dependen del inventario
+                    'max_portions': portions.get(dish_id, (None, None))[0],
+                    'limiting_ingredient': portions.get(dish_id, (None, None))[1],
+                }
+                for dish_id, name in names.items()
+            ]
+        }
+        if mix:
+            batches, limiting = mix_batches(quantities, stock, mix)
+            data['mix'] = {
+                'batches': batches,
+                'portions': {dish_id: (batches * units if batches is not None else None) for dish_id, units in mix.items()},
+                'limiting_ingredient': limiting,
+            }
+        return Response(data)
+
     @swagger_auto_schema(
         method='post',
         operation_description="Marca un plato como no disponible (solo staff/admin)"
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.pedidos.stats import parse_date_bound
+from apps.reports.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the hourly/daily order rollup tables (RF-06) from the orders table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=str,
+            default=None,
+            help="Only rebuild buckets from this date on (YYYY-MM-DD or ISO 8601)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per bulk insert",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = parse_date_bound(options["since"])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+
+        created = rebuild_rollups(since=since, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} order rollup rows"))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:42
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('HOUR', 'Hour'), ('DAY', 'Day')], help_text='Bucket size (RF-06)', max_length=4)),
+                ('bucket_start', models.DateTimeField(help_text='Start of the hour/day bucket (UTC)')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('IN_PROGRESS', 'In Progress'), ('READY', 'Ready'), ('DELIVERED', 'Delivered'), ('CANCELLED', 'Cancelled')], help_text='Order status dimension', max_length=20)),
+                ('order_type', models.CharField(choices=[('DINE_IN', 'Dine In'), ('TAKEOUT', 'Takeout'), ('DELIVERY', 'Delivery')], help_text='Order type dimension', max_length=10)),
+                ('priority', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High'), ('URGENT', 'Urgent')], help_text='Order priority dimension', max_length=10)),
+                ('order_count', models.IntegerField(default=0, help_text='Number of orders in the bucket')),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of total_amount', max_digits=14)),
+                ('prep_time_total', models.BigIntegerField(default=0, help_text='Sum of actual_time in minutes')),
+                ('prep_time_count', models.IntegerField(default=0, help_text='Orders with a recorded actual_time')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Order Rollup',
+                'verbose_name_plural': 'Order Rollups',
+                'db_table': 'order_rollups',
+                'ordering': ['granularity', 'bucket_start'],
+                'indexes': [models.Index(fields=['granularity', 'bucket_start'], name='order_rollu_granula_fd67ec_idx')],
+                'unique_together': {('granularity', 'bucket_start', 'status', 'order_type', 'priority')},
+            },
+        ),
+    ]
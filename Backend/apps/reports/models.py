@@ -0,0 +1,58 @@
+"""
+Modelos de Reportes
+===================
+RF-06: Reportes y dashboards
+
+Tablas de agregados (rollups) mantenidas incrementalmente a partir de los
+guardados de Order. Los dashboards históricos leen unos cientos de filas
+en lugar de recorrer `orders` y `order_items`.
+"""
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from decimal import Decimal
+
+from apps.pedidos.models import Order, OrderStatus, OrderPriority
+
+
+class RollupGranularity(models.TextChoices):
+    HOUR = 'HOUR', _('Hour')
+    DAY = 'DAY', _('Day')
+
+
+class OrderRollup(models.Model):
+    granularity = models.CharField(max_length=4, choices=RollupGranularity.choices, help_text=_("Bucket size (RF-06)"))
+    bucket_start = models.DateTimeField(help_text=_("Start of the hour/day bucket (UTC)"))
+    status = models.CharField(max_length=20, choices=OrderStatus.choices, help_text=_("Order status dimension"))
+    order_type = models.CharField(max_length=10, choices=Order.ORDER_TYPE_CHOICES, help_text=_("Order type dimension"))
+    priority = models.CharField(max_length=10, choices=OrderPriority.choices, help_text=_("Order priority dimension"))
+    order_count = models.IntegerField(default=0, help_text=_("Number of orders in the bucket"))
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), help_text=_("Sum of total_amount"))
+    prep_time_total = models.BigIntegerField(default=0, help_text=_("Sum of actual_time in minutes"))
+    prep_time_count = models.IntegerField(default=0, help_text=_("Orders with a recorded actual_time"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'order_rollups'
+        verbose_name = _('Order Rollup')
+        verbose_name_plural = _('Order Rollups')
+        ordering = ['granularity', 'bucket_start']
+        unique_together = ['granularity', 'bucket_start', 'status', 'order_type', 'priority']
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket_start:%Y-%m-%d %H:%M} {self.status}/{self.order_type}/{self.priority}: {self.order_count}"
+
+    @property
+    def average_ticket(self):
+        if self.order_count <= 0:
+            return Decimal('0.00')
+        return (self.revenue / self.order_count).quantize(Decimal('0.01'))
+
+    @property
+    def average_prep_time(self):
+        if self.prep_time_count <= 0:
+            return None
+        return round(self.prep_time_total / self.prep_time_count, 2)
@@ -0,0 +1,11 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsStaffOnly(BasePermission):
+    """Reports expose business figures; restrict to staff/admin (RNF-03)."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user and user.is_authenticated and (getattr(user, 'role', None) in ['STAFF', 'ADMIN'] or user.is_staff)
+        )
@@ -0,0 +1,177 @@
+"""
+Mantenimiento de Rollups de Pedidos
+===================================
+RF-06: Reportes y dashboards
+
+Cada pedido aporta (1 pedido, total_amount, actual_time) a un bucket por
+hora y otro por día, según (status, order_type, priority). Cuando un pedido
+cambia se resta su aporte anterior y se suma el nuevo con UPDATEs basados
+en F(), de modo que los rollups nunca requieren recorrer la tabla completa.
+`rebuild_rollups` reconstruye desde cero (comando rebuild_order_rollups).
+
+Los buckets de la hora y el día en curso los comparten todos los pedidos,
+así que los cambios no se escriben dentro de la transacción del pedido:
+`schedule_change` los aplica en on_commit, en una transacción corta y en un
+orden fijo de buckets. Un error al actualizar un rollup se registra en el
+log sin afectar al pedido ya confirmado (rebuild_order_rollups lo corrige).
+"""
+
+from decimal import Decimal
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncHour
+
+from apps.pedidos.models import Order
+from .models import OrderRollup, RollupGranularity
+
+
+# Campos de Order que determinan el aporte a los rollups
+TRACKED_FIELDS = ('status', 'order_type', 'priority', 'created_at', 'total_amount', 'actual_time')
+
+TRUNCATORS = {
+    RollupGranularity.HOUR: TruncHour,
+    RollupGranularity.DAY: TruncDay,
+}
+
+
+def bucket_start(moment, granularity):
+    """Trunca un datetime al inicio de su hora o día."""
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == RollupGranularity.DAY:
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def order_state(order):
+    """
+    Devuelve el estado relevante del pedido como tupla, o None si no es conocido
+    (pedido sin guardar o con campos diferidos que no se deben cargar).
+    """
+    if order.pk is None or order.created_at is None:
+        return None
+    if order.get_deferred_fields() & set(TRACKED_FIELDS):
+        return None
+    return tuple(getattr(order, field) for field in TRACKED_FIELDS)
+
+
+def load_state(pk):
+    """Lee el estado persistido de un pedido (fallback cuando no hay snapshot)."""
+    row = Order.objects.filter(pk=pk).values_list(*TRACKED_FIELDS).first()
+    return tuple(row) if row else None
+
+
+def contributions(state, sign):
+    """Aporte de un estado de pedido a cada bucket, con signo (+1 alta, -1 baja)."""
+    if state is None:
+        return {}
+    status, order_type, priority, created_at, total_amount, actual_time = state
+    result = {}
+    for granularity in TRUNCATORS:
+        key = (granularity, bucket_start(created_at, granularity), status, order_type, priority)
+        result[key] = [
+            sign,
+            sign * Decimal(total_amount or 0),
+            sign * (actual_time or 0),
+            sign if actual_time is not None else 0,
+        ]
+    return result
+
+
+def apply_change(old_state, new_state):
+    """Aplica la diferencia entre el estado anterior y el nuevo de un pedido."""
+    deltas = contributions(old_state, -1)
+    for key, values in contributions(new_state, 1).items():
+        current = deltas.setdefault(key, [0, Decimal('0'), 0, 0])
+        for index, value in enumerate(values):
+            current[index] += value
+
+    with transaction.atomic():
+        # Orden fijo de buckets: escritores concurrentes bloquean en el mismo orden
+        for key, (count, revenue, prep_total, prep_count) in sorted(deltas.items()):
+            if not (count or revenue or prep_total or prep_count):
+                continue
+            _apply_delta(key, count, revenue, prep_total, prep_count)
+
+
+def schedule_change(old_state, new_state):
+    """Aplica el cambio cuando la transacción del pedido confirma (robust: solo se registra si falla)."""
+    if old_state != new_state:
+        transaction.on_commit(partial(apply_change, old_state, new_state), robust=True)
+
+
+def _apply_delta(key, count, revenue, prep_total, prep_count):
+    granularity, start, status, order_type, priority = key
+    lookup = {
+        'granularity': granularity,
+        'bucket_start': start,
+        'status': status,
+        'order_type': order_type,
+        'priority': priority,
+    }
+    changes = {
+        'order_count': F('order_count') + count,
+        'revenue': F('revenue') + revenue,
+        'prep_time_total': F('prep_time_total') + prep_total,
+        'prep_time_count': F('prep_time_count') + prep_count,
+    }
+    if OrderRollup.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            OrderRollup.objects.create(
+                order_count=count, revenue=revenue,
+                prep_time_total=prep_total, prep_time_count=prep_count,
+                **lookup
+            )
+    except IntegrityError:
+        # Otro proceso creó el bucket entre el UPDATE y el INSERT
+        OrderRollup.objects.filter(**lookup).update(**changes)
+
+
+@transaction.atomic
+def rebuild_rollups(since=None, batch_size=1000):
+    """
+    Recalcula los rollups desde la tabla de pedidos con un GROUP BY por granularidad.
+
+    Si se indica `since`, solo se reconstruyen los buckets desde el inicio del día de `since`.
+    Devuelve el número de filas de rollup generadas.
+    """
+    orders = Order.objects.order_by()
+    rollups = OrderRollup.objects.all()
+    if since is not None:
+        since = bucket_start(since, RollupGranularity.DAY)
+        orders = orders.filter(created_at__gte=since)
+        rollups = rollups.filter(bucket_start__gte=since)
+    rollups.delete()
+
+    created = 0
+    for granularity, trunc in TRUNCATORS.items():
+        rows = (
+            orders.annotate(bucket=trunc('created_at'))
+            .values('bucket', 'status', 'order_type', 'priority')
+            .annotate(
+                order_count=Count('id'),
+                revenue=Coalesce(Sum('total_amount'), Decimal('0.00')),
+                prep_time_total=Coalesce(Sum('actual_time'), 0),
+                prep_time_count=Count('actual_time'),
+            )
+        )
+        objs = [
+            OrderRollup(
+                granularity=granularity,
+                bucket_start=row['bucket'],
+                status=row['status'],
+                order_type=row['order_type'],
+                priority=row['priority'],
+                order_count=row['order_count'],
+                revenue=row['revenue'],
+                prep_time_total=row['prep_time_total'],
+                prep_time_count=row['prep_time_count'],
+            )
+            for row in rows
+        ]
+        OrderRollup.objects.bulk_create(objs, batch_size=batch_size)
+        created += len(objs)
+    return created
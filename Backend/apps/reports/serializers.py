@@ -0,0 +1,21 @@
+"""
+Serializadores de Reportes
+==========================
+"""
+
+from rest_framework import serializers
+from .models import OrderRollup
+
+
+class OrderRollupSerializer(serializers.ModelSerializer):
+    average_ticket = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    average_prep_time = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = OrderRollup
+        fields = [
+            'id', 'granularity', 'bucket_start', 'status', 'order_type', 'priority',
+            'order_count', 'revenue', 'average_ticket', 'prep_time_total',
+            'prep_time_count', 'average_prep_time',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,55 @@
+"""
+Señales de Reportes
+===================
+Mantienen los rollups de pedidos sincronizados con cada guardado de Order.
+Los cambios se aplican al confirmar la transacción (rollups.schedule_change).
+"""
+
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from apps.pedidos.models import Order
+from apps.pedidos.signals import order_status_changed
+from .rollups import TRACKED_FIELDS, order_state, load_state, schedule_change
+
+
+@receiver(post_init, sender=Order)
+def remember_rollup_state(sender, instance, **kwargs):
+    instance._rollup_state = order_state(instance)
+
+
+@receiver(pre_save, sender=Order)
+def load_missing_rollup_state(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    if getattr(instance, '_rollup_state', None) is None:
+        instance._rollup_state = load_state(instance.pk)
+
+
+@receiver(post_save, sender=Order)
+def update_order_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_state = None if created else getattr(instance, '_rollup_state', None)
+    # Pedidos con campos diferidos: leer el estado persistido tras el guardado
+    new_state = order_state(instance) or load_state(instance.pk)
+    schedule_change(old_state, new_state)
+    instance._rollup_state = new_state
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    schedule_change(getattr(instance, '_rollup_state', None), None)
+    instance._rollup_state = None
+
+
+@receiver(order_status_changed, sender=Order)
+def update_rollups_on_transition(sender, instance, previous, **kwargs):
+    # Las transiciones usan UPDATE condicional (sin post_save): el estado
+    # anterior se reconstruye con los valores previos de los campos escritos
+    new_state = order_state(instance) or load_state(instance.pk)
+    old_state = tuple(
+        previous.get(field, value) for field, value in zip(TRACKED_FIELDS, new_state)
+    )
+    schedule_change(old_state, new_state)
+    instance._rollup_state = new_state
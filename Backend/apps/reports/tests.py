@@ -0,0 +1,128 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.usuarios.models import User
+from apps.pedidos.models import Order, OrderStatus, OrderPriority
+from apps.reports.models import OrderRollup, RollupGranularity
+from apps.reports.rollups import rebuild_rollups
+
+
+@pytest.fixture
+def customer_user():
+    return User.objects.create_user(username='rep_customer', password='p', role='CUSTOMER')
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(username='rep_staff', password='p', role='STAFF')
+
+
+def rollup_snapshot():
+    return sorted(
+        OrderRollup.objects.values_list(
+            'granularity', 'bucket_start', 'status', 'order_type', 'priority',
+            'order_count', 'revenue', 'prep_time_total', 'prep_time_count'
+        )
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rollups_follow_order_lifecycle(customer_user):
+    order = Order.objects.create(customer=customer_user, order_type='TAKEOUT', total_amount=Decimal('12.00'))
+    day = OrderRollup.objects.get(granularity=RollupGranularity.DAY, status=OrderStatus.PENDING)
+    assert day.order_count == 1 and day.revenue == Decimal('12.00')
+    assert OrderRollup.objects.filter(granularity=RollupGranularity.HOUR).count() == 1
+
+    # Status change moves the contribution to another bucket
+    order.status = OrderStatus.DELIVERED
+    order.actual_time = 18
+    order.save()
+    day.refresh_from_db()
+    assert day.order_count == 0 and day.revenue == Decimal('0.00')
+    delivered = OrderRollup.objects.get(granularity=RollupGranularity.DAY, status=OrderStatus.DELIVERED)
+    assert delivered.order_count == 1
+    assert delivered.average_ticket == Decimal('12.00')
+    assert delivered.average_prep_time == 18
+
+    # Instance loaded from DB (snapshot via post_init) and deferred instance (fallback load)
+    again = Order.objects.get(pk=order.pk)
+    again.total_amount = Decimal('15.00')
+    again.save()
+    deferred = Order.objects.only('id', 'notes').get(pk=order.pk)
+    deferred.notes = 'x'
+    deferred.save()
+    delivered.refresh_from_db()
+    assert delivered.revenue == Decimal('15.00')
+
+    again.delete()
+    delivered.refresh_from_db()
+    assert delivered.order_count == 0 and delivered.revenue == Decimal('0.00')
+    assert day.average_ticket == Decimal('0.00') and day.average_prep_time is None
+    assert 'DAY' in str(day)
+
+
+@pytest.mark.django_db
+def test_rollups_are_written_after_the_order_commits(customer_user, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks:
+        Order.objects.create(customer=customer_user, order_type='TAKEOUT', total_amount=Decimal('5.00'))
+        assert not OrderRollup.objects.exists()
+    assert len(callbacks) == 1
+    callbacks[0]()
+    assert OrderRollup.objects.get(granularity=RollupGranularity.DAY).order_count == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rebuild_matches_incremental_rollups(customer_user):
+    for priority in [OrderPriority.LOW, OrderPriority.HIGH, OrderPriority.HIGH]:
+        Order.objects.create(customer=customer_user, order_type='DELIVERY', priority=priority,
+                             total_amount=Decimal('7.25'), actual_time=10)
+    incremental = rollup_snapshot()
+    out = StringIO()
+    call_command('rebuild_order_rollups', stdout=out)
+    assert 'Rebuilt' in out.getvalue()
+    assert rollup_snapshot() == incremental
+
+    # Partial rebuild only touches recent buckets
+    assert rebuild_rollups(since=timezone.now() - timedelta(days=1)) == 4
+    call_command('rebuild_order_rollups', '--since', '2020-01-01', stdout=StringIO())
+    with pytest.raises(CommandError):
+        call_command('rebuild_order_rollups', '--since', 'nunca')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reports_endpoints(customer_user, staff_user):
+    Order.objects.create(customer=customer_user, order_type='TAKEOUT', total_amount=Decimal('10.00'), actual_time=20)
+    Order.objects.create(customer=customer_user, order_type='DINE_IN', table_number='2', total_amount=Decimal('30.00'))
+    api = APIClient()
+
+    api.force_authenticate(user=customer_user)
+    assert api.get(reverse('reports:order-rollup-list')).status_code == status.HTTP_403_FORBIDDEN
+
+    api.force_authenticate(user=staff_user)
+    resp = api.get(reverse('reports:order-rollup-list'), {'granularity': 'hour', 'order_type': 'TAKEOUT'})
+    assert resp.status_code == status.HTTP_200_OK
+    assert len(resp.data['results']) == 1
+
+    url = reverse('reports:order-rollup-summary')
+    today = timezone.now().date().isoformat()
+    resp = api.get(url, {'date_from': today, 'date_to': today})
+    assert resp.status_code == status.HTTP_200_OK
+    assert len(resp.data) == 1
+    assert resp.data[0]['orders'] == 2
+    assert resp.data[0]['revenue'] == Decimal('40.00')
+    assert resp.data[0]['average_ticket'] == Decimal('20.00')
+    assert resp.data[0]['average_prep_time'] == 20
+
+    by_type = api.get(url, {'group_by': 'order_type'})
+    assert {row['order_type'] for row in by_type.data} == {'TAKEOUT', 'DINE_IN'}
+
+    assert api.get(url, {'group_by': 'customer'}).status_code == status.HTTP_400_BAD_REQUEST
+    assert api.get(url, {'granularity': 'week'}).status_code == status.HTTP_400_BAD_REQUEST
+    assert api.get(url, {'date_from': 'ayer'}).status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,19 @@
+"""
+URLs para el módulo de Reportes
+===============================
+RF-06: Reportes y dashboards
+"""
+
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import OrderRollupViewSet, MenuMarginViewSet
+
+app_name = 'reports'
+
+router = DefaultRouter()
+router.register(r'orders', OrderRollupViewSet, basename='order-rollup')
+router.register(r'menu-margins', MenuMarginViewSet, basename='menu-margin')
+
+urlpatterns = [
+    path('reports/', include(router.urls)),
+]
@@ -0,0 +1,155 @@
+"""
+Views (ViewSets) para Reportes
+==============================
+RF-06: Reportes y dashboards a partir de rollups de pedidos
+"""
+
+from decimal import Decimal
+
+from django.db.models import Sum
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from apps.pedidos.stats import parse_date_bound
+from apps.platos.costing import margin_report
+from apps.platos.models import Dish
+from .models import OrderRollup, RollupGranularity
+from .serializers import OrderRollupSerializer
+from .permissions import IsStaffOnly
+
+
+DIMENSIONS = ['status', 'order_type', 'priority']
+
+date_parameters = [
+    openapi.Parameter('granularity', openapi.IN_QUERY, description="HOUR o DAY (default: DAY)", type=openapi.TYPE_STRING),
+    openapi.Parameter('date_from', openapi.IN_QUERY, description="Fecha inicial (YYYY-MM-DD o ISO 8601)", type=openapi.TYPE_STRING),
+    openapi.Parameter('date_to', openapi.IN_QUERY, description="Fecha final inclusive (YYYY-MM-DD o ISO 8601)", type=openapi.TYPE_STRING),
+]
+
+
+class OrderRollupViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Consulta de rollups de pedidos por hora/día × estado × tipo × prioridad.
+
+    RF-06: Los dashboards históricos leen esta tabla en lugar de `orders`.
+    """
+    queryset = OrderRollup.objects.all()
+    serializer_class = OrderRollupSerializer
+    permission_classes = [IsStaffOnly]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status', 'order_type', 'priority']
+
+    def get_queryset(self):
+        params = self.request.query_params
+        granularity = params.get('granularity', RollupGranularity.DAY).upper()
+        if granularity not in RollupGranularity.values:
+            raise ValidationError({'granularity': f"Granularidad inválida: '{granularity}'."})
+        queryset = self.queryset.filter(granularity=granularity)
+        try:
+            if params.get('date_from'):
+                queryset = queryset.filter(bucket_start__gte=parse_date_bound(params['date_from']))
+            if params.get('date_to'):
+                queryset = queryset.filter(bucket_start__lte=parse_date_bound(params['date_to'], end=True))
+        except ValueError as exc:
+            raise ValidationError({'date': str(exc)})
+        return queryset
+
+    @swagger_auto_schema(
+        operation_description="Lista las filas de rollup de pedidos (solo staff/admin)",
+        manual_parameters=date_parameters
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Serie temporal agregada: pedidos, ingresos, ticket y tiempo de preparación promedio",
+        manual_parameters=date_parameters + [
+            openapi.Parameter('group_by', openapi.IN_QUERY, description="Dimensiones separadas por coma: status, order_type, priority", type=openapi.TYPE_STRING),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Agrega los rollups por bucket y las dimensiones pedidas en `group_by`.
+        RF-06: Series para el dashboard de gerencia.
+        """
+        group_by = [d for d in request.query_params.get('group_by', '').split(',') if d]
+        invalid = [d for d in group_by if d not in DIMENSIONS]
+        if invalid:
+            return Response(
+                {'error': f"Dimensiones inválidas: {', '.join(invalid)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fields = ['bucket_start'] + group_by
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .order_by(*fields)
+            .values(*fields)
+            .annotate(
+                orders=Sum('order_count'),
+                revenue=Sum('revenue'),
+                prep_time_total=Sum('prep_time_total'),
+                prep_time_count=Sum('prep_time_count'),
+            )
+        )
+
+        data = []
+        for row in rows:
+            orders = row['orders'] or 0
+            revenue = Decimal(row['revenue'] or 0).quantize(Decimal('0.01'))
+            prep_count = row.pop('prep_time_count') or 0
+            prep_total = row.pop('prep_time_total') or 0
+            row['revenue'] = revenue
+            row['average_ticket'] = (revenue / orders).quantize(Decimal('0.01')) if orders > 0 else Decimal('0.00')
+            row['average_prep_time'] = round(prep_total / prep_count, 2) if prep_count > 0 else None
+            data.append(row)
+        return Response(data)
+
+
+MARGIN_ORDERING = ['name', 'price', 'food_cost', 'margin', 'margin_pct']
+
+
+class MenuMarginViewSet(viewsets.ViewSet):
+    """
+    Márgenes de costo de alimentos de todo el menú.
+
+    RF-06: Una sola consulta anotada (costing.margin_report) para todos los platos.
+    """
+    permission_classes = [IsStaffOnly]
+
+    @swagger_auto_schema(
+        operation_description="Precio, costo de receta y margen por plato (solo staff/admin)",
+        manual_parameters=[
+            openapi.Parameter('category', openapi.IN_QUERY, description="Filtrar por categoría", type=openapi.TYPE_STRING),
+            openapi.Parameter('is_available', openapi.IN_QUERY, description="Filtrar por disponibilidad", type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('ordering', openapi.IN_QUERY, description="name, price, food_cost, margin o margin_pct; prefijo '-' para descendente (default: margin_pct)", type=openapi.TYPE_STRING),
+        ]
+    )
+    def list(self, request):
+        params = request.query_params
+        ordering = params.get('ordering', 'margin_pct')
+        field = ordering.lstrip('-')
+        if field not in MARGIN_ORDERING:
+            return Response(
+                {'error': f"Ordenamiento inválido: '{ordering}'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = Dish.objects.order_by()
+        if params.get('category'):
+            queryset = queryset.filter(category=params['category'])
+        if params.get('is_available'):
+            queryset = queryset.filter(is_available=params['is_available'].lower() in ['1', 'true', 'yes'])
+
+        rows = margin_report(queryset)
+        # Platos con precio 0 (margin_pct nulo) siempre al final
+        present = [row for row in rows if row[field] is not None]
+        present.sort(key=lambda row: row[field], reverse=ordering.startswith('-'))
+        return Response(present + [row for row in rows if row[field] is None])
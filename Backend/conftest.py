@@ -0,0 +1,24 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # La caché local (menú versionado) persiste entre tests del mismo proceso
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def engine(request, monkeypatch):
+    """Corre el test con NumPy y sin él (dependencia opcional de los cálculos vectorizados)."""
+    from apps.inventario import forecasting
+    from apps.platos import portions
+
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        for module in (forecasting, portions):
+            monkeypatch.setattr(module, 'np', None)
+    return request.param
@@ -0,0 +1,25 @@
+"""
+Paginación compartida
+=====================
+RNF-01: Rendimiento de listados históricos
+
+Paginación por cursor (keyset) sobre created_at. A diferencia de
+PageNumberPagination no ejecuta COUNT(*) ni recorre las páginas anteriores:
+cada página filtra `created_at <= cursor` sobre el índice (created_at, id),
+por lo que la página N cuesta lo mismo que la primera.
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Orden `-created_at, -id`. El cursor de DRF codifica solo el primer campo
+    (created_at) más un offset para los registros que comparten esa marca de
+    tiempo; `-id` hace ese orden determinista, así que ninguna fila se repite
+    ni se salta. El OFFSET solo recorre los empates de un mismo instante y el
+    índice (created_at, id) de cada tabla cubre el orden.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
     'apps.pedidos',  # Gestión de pedidos (RF-01, RF-04)
     'apps.platos',  # Gestión de platos (RF-02)
     'apps.inventario',  # Gestión de inventario (RF-02)
+    'apps.reports',  # Reportes y dashboards (RF-06)
+    'apps.analytics',  # Recomendaciones (RF-03)
 ]
 
 MIDDLEWARE = [
@@ -150,6 +152,62 @@ SIMPLE_JWT = {
 }
 
 
+# Caché (RNF-01): Redis si REDIS_URL está definido (docker-compose), memoria local si no
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'smartkitchen',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'smartkitchen',
+        }
+    }
+CACHE_TIMEOUT = int(os.getenv('CACHE_TIMEOUT', '300'))  # segundos; respuestas del menú versionadas
+
+
+# Popularidad de platos (RF-03): el comando flush_popularity vuelca los incrementos;
+# el ranking de populares se cachea POPULARITY_FLUSH_INTERVAL segundos
+POPULARITY_FLUSH_INTERVAL = float(os.getenv('POPULARITY_FLUSH_INTERVAL', '60'))  # segundos
+POPULARITY_HALF_LIFE_DAYS = float(os.getenv('POPULARITY_HALF_LIFE_DAYS', '7'))
+
+
+# Recomendaciones item-a-item (RF-03): platos similares guardados por plato
+RECOMMENDATIONS_TOP_K = int(os.getenv('RECOMMENDATIONS_TOP_K', '10'))
+
+
+# Retención del ledger de inventario (RF-02, RNF-01): días que quedan en la tabla caliente
+# antes de que compact_inventory_ledger los archive y resuma por día
+INVENTORY_LEDGER_RETENTION_DAYS = int(os.getenv('INVENTORY_LEDGER_RETENTION_DAYS', '90'))
+
+
+# Reservas de stock (RF-02): los pedidos pendientes retienen ingredientes hasta confirmarse
+STOCK_RESERVATION_TTL_MINUTES = int(os.getenv('STOCK_RESERVATION_TTL_MINUTES', '30'))
+
+
+# Pronóstico de consumo y reposición (RF-02): suavizado exponencial con estacionalidad semanal
+FORECAST_HISTORY_DAYS = int(os.getenv('FORECAST_HISTORY_DAYS', '365'))
+FORECAST_SMOOTHING = float(os.getenv('FORECAST_SMOOTHING', '0.3'))  # alfa del suavizado
+FORECAST_LEAD_TIME_DAYS = int(os.getenv('FORECAST_LEAD_TIME_DAYS', '2'))  # días hasta recibir un pedido
+FORECAST_REVIEW_DAYS = int(os.getenv('FORECAST_REVIEW_DAYS', '7'))  # días que debe cubrir cada pedido
+FORECAST_SERVICE_Z = float(os.getenv('FORECAST_SERVICE_Z', '1.65'))  # ~95% de nivel de servicio
+
+
+# Eventos de pedidos en tiempo real (RF-01, RF-04): stream SSE para pantallas de cocina
+ORDER_EVENTS_BUFFER_SIZE = int(os.getenv('ORDER_EVENTS_BUFFER_SIZE', '1000'))  # eventos para reanudar
+# Segundos por conexión: debe quedar por debajo del --timeout de gunicorn (120)
+ORDER_EVENTS_STREAM_TIMEOUT = int(os.getenv('ORDER_EVENTS_STREAM_TIMEOUT', '25'))
+ORDER_EVENTS_HEARTBEAT = int(os.getenv('ORDER_EVENTS_HEARTBEAT', '15'))  # segundos
+# Vigencia del token ?token= del stream (EventSource no envía Authorization)
+ORDER_EVENTS_TOKEN_MAX_AGE = int(os.getenv('ORDER_EVENTS_TOKEN_MAX_AGE', '300'))  # segundos
+
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',